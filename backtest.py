@@ -0,0 +1,51 @@
+# backtest.py - replays the built-in technical scoring rule over long histories to validate its score thresholds.
+# Usage:  python backtest.py --symbols watchlist.txt --years 10
+#         python backtest.py --symbols universe.txt --workers 8 --json results.json
+# Histories are cached under FN_DATA_DIR/history, so only the first run for a universe downloads data.
+import json
+import logging
+import argparse
+from src.backtest import run_backtest, HORIZONS
+from src.rate_limit import set_default_lane, BACKGROUND
+
+def _pct(value) -> str:
+    return "   n/a" if value is None else f"{value * 100:6.2f}%"
+
+def print_report(summary: dict):
+    print(f"Tested {summary['tested']}/{summary['symbols']} symbols over {summary['years']} years "
+          f"(entry score >= {summary['entry_score']}, {summary['cost_bps']} bps per trade) "
+          f"in {summary['compute_seconds']}s (+{summary['fetch_seconds']}s fetching)")
+    if summary["failed"]: print(f"No usable history: {', '.join(summary['failed'])}")
+    if not summary["tested"]: return
+    for horizon, result in summary["horizons"].items():
+        print(f"\n{horizon} forward returns - signal hit rate {_pct(result['hit_rate'])}")
+        print(f"  {'bucket':<18}{'obs':>10}{'mean':>10}{'hit rate':>10}")
+        for name, bucket in result["buckets"].items():
+            print(f"  {name:<18}{bucket['observations']:>10}{_pct(bucket['mean_forward_return']):>10}{_pct(bucket['hit_rate']):>10}")
+    median = summary["strategy_median"]
+    print(f"\nLong/flat strategy (median per symbol): return {_pct(median['total_return'])}, max drawdown {_pct(median['max_drawdown'])}, "
+          f"exposure {_pct(median['exposure'])}, turnover {median['turnover_per_year']:.1f} trades/year")
+    print(f"Buy and hold (median per symbol):       return {_pct(median['buy_hold_return'])}, max drawdown {_pct(median['buy_hold_max_drawdown'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the built-in technical scoring rule.")
+    parser.add_argument("--symbols", default="watchlist.txt", help="File with one ticker per line.")
+    parser.add_argument("--years", type=int, default=10, help="Length of the test window.")
+    parser.add_argument("--horizons", default=",".join(map(str, HORIZONS)), help="Comma-separated forward-return horizons in trading days.")
+    parser.add_argument("--entry-score", type=int, default=3, help="Minimum score to be long in the strategy simulation.")
+    parser.add_argument("--cost-bps", type=float, default=10, help="Cost per position change in basis points.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--json", help="Also write the full results, including per-symbol statistics, to this file.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    set_default_lane(BACKGROUND)
+
+    from precompute import load_watchlist  # Imported here so spawned worker processes skip the app/LLM imports.
+    horizons = tuple(int(h) for h in args.horizons.split(",") if h.strip())
+    results = run_backtest(load_watchlist(args.symbols), args.years, horizons, args.entry_score, args.cost_bps, args.workers)
+    print_report(results["summary"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
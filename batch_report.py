@@ -0,0 +1,38 @@
+# batch_report.py - writes a technical + fundamental HTML report per watchlist symbol (the morning pack), plus an index page.
+# Usage:  python batch_report.py --watchlist watchlist.txt                      (into reports/<today>/)
+#         python batch_report.py --watchlist universe.txt --out reports/am --fetch-workers 16 --compute-workers 4
+# Re-running into the same directory resumes: symbols that already have a report are skipped (use --fresh to redo them).
+import logging
+import argparse
+from datetime import date
+from src.rate_limit import set_default_lane, BACKGROUND
+
+def print_summary(summary: dict, out_dir: str):
+    print(f"Wrote {summary['written']} reports to {out_dir} in {summary['wall_seconds']}s ({summary['reports_per_second']} reports/s); "
+          f"{summary['skipped']} already done, {summary['from_snapshot']} served from snapshots, {len(summary['failed'])} failed")
+    for stage in ("fetch", "compute"):
+        s = summary[stage]
+        print(f"  {stage:<8}{s['count']:>5} x  total {s['total_seconds']:>8.2f}s  p50 {s['p50']:>7.3f}s  p95 {s['p95']:>7.3f}s  max {s['max']:>7.3f}s")
+    for symbol, reason in summary["failed"].items(): print(f"  failed  {symbol}: {reason}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate HTML technical/fundamental reports for a watchlist.")
+    parser.add_argument("--watchlist", default="watchlist.txt", help="File with one ticker per line.")
+    parser.add_argument("--out", default=None, help="Output directory (default: reports/<today>).")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="Concurrent Yahoo fetches.")
+    parser.add_argument("--compute-workers", type=int, default=None, help="Worker processes for scoring and rendering (default: CPU count).")
+    parser.add_argument("--fresh", action="store_true", help="Regenerate reports that already exist instead of resuming.")
+    parser.add_argument("--no-snapshots", action="store_true", help="Always fetch live, even when precomputed snapshots are fresh.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    set_default_lane(BACKGROUND)
+
+    from precompute import load_watchlist
+    from src.batch_report import run_batch_report
+    out_dir = args.out or f"reports/{date.today():%Y-%m-%d}"
+    summary = run_batch_report(load_watchlist(args.watchlist), out_dir, args.fetch_workers, args.compute_workers,
+                               resume=not args.fresh, use_snapshots=not args.no_snapshots)
+    print_summary(summary, out_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# benchmarks/app_load.py - drives N concurrent simulated Streamlit sessions through app.py with Streamlit's AppTest API.
+# Usage:  python -m benchmarks.app_load --sessions 1,5,10,20 --rounds 2
+#         python -m benchmarks.app_load --sessions 25 --yahoo-latency 0.3 --news-latency 0.5 --llm-latency 1.0 --json app_load.json
+# Fully offline: yfinance, Google News / article pages and the LLM are replaced by in-process stand-ins with configurable
+# latency, and chat/snapshot state goes to a throwaway FN_DATA_DIR. Every session runs in this one process, sharing its
+# module-level caches, pools and event loop the way browser sessions share one `streamlit run app.py` server.
+import os
+import re
+import asyncio
+import gc
+import sys
+import json
+import time
+import zlib
+import tempfile
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PERIOD_BARS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "max": 5000}
+CHAT_PROMPTS = [("chat:technical", "technical analysis of {symbol}"), ("chat:fundamental", "fundamentals of {symbol}"),
+                ("chat:news", "latest news on {symbol}"), ("chat:agent", "How should I think about diversification?")]
+REACT_TEMPLATE = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+def _rss() -> int:
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+def install_stand_ins(yahoo_latency: float, news_latency: float):
+    """Replaces every outbound dependency of the chat and SIP flows; must run before the app's modules are imported."""
+    import numpy as np
+    import pandas as pd
+    import requests
+    import yfinance
+    import langchain.hub
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatResult, ChatGeneration, ChatGenerationChunk
+    import src.llm_utils as llm_utils
+
+    histories, lock = {}, threading.Lock()
+    def daily(symbol: str) -> pd.DataFrame:
+        with lock:
+            if symbol not in histories:
+                rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+                index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=PERIOD_BARS["max"], tz="Asia/Kolkata")
+                close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(index)))); spread = np.abs(rng.normal(0, 0.01, len(index))) * close
+                histories[symbol] = pd.DataFrame({"Open": close, "High": close + spread, "Low": close - spread, "Close": close,
+                                                  "Volume": rng.integers(1e5, 5e7, len(index)), "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+            return histories[symbol]
+
+    class StandInTicker:
+        def __init__(self, symbol: str): self.ticker = symbol.upper()
+        def history(self, period: str = "1mo", **kwargs) -> pd.DataFrame:
+            time.sleep(yahoo_latency); return daily(self.ticker).tail(PERIOD_BARS.get(period, 252)).copy()
+        @property
+        def info(self) -> dict:
+            time.sleep(yahoo_latency)
+            return {"longName": f"{self.ticker} Limited", "sector": "Technology", "marketCap": 10**12, "trailingPE": 22.5, "pegRatio": 0.9,
+                    "returnOnEquity": 0.21, "debtToEquity": 0.4, "priceToBook": 2.5, "priceToSalesTrailing12Months": 1.8, "profitMargins": 0.14}
+
+    for statement in ("income_stmt", "balance_sheet", "quarterly_income_stmt", "quarterly_balance_sheet"):
+        setattr(StandInTicker, statement, property(lambda self: pd.DataFrame()))  # No statements: trends are skipped, as for an ETF.
+
+    def download(symbols, period: str = "1mo", group_by: str = "ticker", **kwargs) -> pd.DataFrame:
+        time.sleep(yahoo_latency); symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        return pd.concat({s.upper(): daily(s.upper()).tail(PERIOD_BARS.get(period, 252)) for s in symbols}, axis=1)
+
+    class StandInResponse:
+        status_code = 200
+        def __init__(self, text: str): self.text = text
+        def raise_for_status(self): pass
+
+    def get(url: str, **kwargs) -> StandInResponse:
+        time.sleep(news_latency)
+        if "news.google.com/search" in url:
+            return StandInResponse('<html><body><a class="JtKRv" href="./articles/stand-in">Stand-in headline</a></body></html>')
+        return StandInResponse("<html><body>" + "<p>The company reported steady quarterly growth and reiterated its guidance.</p>" * 40 + "</body></html>")
+
+    class ScriptedStubModel(llm_utils.StubChatModel):
+        """The offline stub, answering SIP prompts with a plan that covers the asked horizon and everything else as a ReAct final answer."""
+        def _reply(self, messages) -> str:
+            prompt = str(messages[-1].content) if messages else ""
+            if "JSON Schema" not in prompt: return "Thought: I now know the final answer\nFinal Answer: A stand-in answer from the load-test model."
+            horizon = int((re.search(r"Investment Horizon: (\d+) years", prompt) or [None, 10])[1]); split = max(1, horizon // 2)
+            spans = [(1, split), (split + 1, horizon)] if horizon > 1 else [(1, 1)]
+            return json.dumps({"strategy_summary": "Grow first, then protect the corpus.", "phases": [
+                {"phase_name": f"Phase {i + 1}", "phase_duration": f"Years {a}-{b}", "phase_description": "Stand-in phase.",
+                 "recommended_funds": [{"fund_category": "Equity Flexi Cap Fund" if i == 0 else "Short Duration Debt Fund", "fund_examples": ["Example Fund"]}]}
+                for i, (a, b) in enumerate(spans)]})
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            time.sleep(self.first_token_latency)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            await asyncio.sleep(self.first_token_latency)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            await asyncio.sleep(self.first_token_latency)
+            for i, word in enumerate(self._reply(messages).split(" ")):
+                if i: await asyncio.sleep(self.chunk_delay)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+    yfinance.Ticker = StandInTicker; yfinance.download = download; requests.get = get
+    langchain.hub.pull = lambda *args, **kwargs: PromptTemplate.from_template(REACT_TEMPLATE)
+    llm_utils.StubChatModel = ScriptedStubModel
+
+class Session:
+    """One simulated browser session: intro -> login with the stub provider -> chat prompts and the SIP planner, timed per rerun."""
+    def __init__(self, number: int, llm_latency: float, timeout: float):
+        from streamlit.testing.v1 import AppTest
+        self.app = AppTest.from_file(APP, default_timeout=timeout)
+        # The stub's key is its latency; the trailing digits only make each session a distinct user with its own chat history.
+        self.api_key = f"{llm_latency:.3f}{number:06d}"
+        self.timings = []; self.errors = []
+
+    def _step(self, route: str, action):
+        started = time.perf_counter()
+        try:
+            action(); ok = not self.app.exception
+            if not ok: self.errors.append(f"{route}: {self.app.exception[0].message}")
+        except Exception as e:
+            ok = False; self.errors.append(f"{route}: {type(e).__name__}: {e}")
+        self.timings.append((route, time.perf_counter() - started, ok))
+        return ok
+
+    def _button(self, label: str):
+        return next(button for button in self.app.button if button.label == label)
+
+    def _login(self):
+        self.app.text_input[0].input(self.api_key); self.app.radio[0].set_value("Stub"); self._button("Proceed").click().run()
+
+    def run(self, symbols: list, rounds: int):
+        app = self.app
+        if not self._step("intro", app.run): return self
+        if not self._step("intro:get_started", lambda: self._button("Get Started").click().run()): return self
+        if not self._step("login", self._login): return self
+        for r in range(rounds):
+            symbol = symbols[r % len(symbols)]
+            if r: self._step("stocks:open", lambda: app.button(key="stocks_tab_button").click().run())
+            for route, prompt in CHAT_PROMPTS:
+                self._step(route, lambda: app.chat_input[0].set_value(prompt.format(symbol=symbol)).run())
+            self._step("sip:open", lambda: app.button(key="sip_tab_button").click().run())
+            self._step("sip:plan", lambda: self._button("Generate My Investment Plan").click().run())
+        return self
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run_stage(sessions: int, symbols: list, rounds: int, llm_latency: float, timeout: float, offset: int) -> dict:
+    gc.collect(); rss_before = _rss()
+    held = [Session(offset + i, llm_latency, timeout) for i in range(sessions)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="load-session") as pool:
+        list(pool.map(lambda s: s[1].run(symbols[s[0] % len(symbols):] + symbols[:s[0] % len(symbols)], rounds), enumerate(held)))
+    wall = time.perf_counter() - started
+    gc.collect(); rss_after = _rss()  # Sessions are still referenced, so their state counts.
+
+    by_route = {}
+    for session in held:
+        for route, seconds, ok in session.timings: by_route.setdefault(route, []).append((seconds, ok))
+    reruns = sum(len(session.timings) for session in held); completed = sum(1 for session in held if not session.errors)
+    return {"sessions": sessions, "wall_seconds": round(wall, 2), "reruns": reruns, "reruns_per_second": round(reruns / wall, 2),
+            "sessions_completed": completed, "errors": [e for session in held for e in session.errors][:20],
+            "rss_per_session_mib": round((rss_after - rss_before) / sessions / 2**20, 2),
+            "routes": {route: {"count": len(samples), "errors": sum(1 for _, ok in samples if not ok),
+                               "p50_ms": round(_percentile([s for s, _ in samples], 0.50) * 1000, 1),
+                               "p99_ms": round(_percentile([s for s, _ in samples], 0.99) * 1000, 1),
+                               "mean_ms": round(statistics.mean(s for s, _ in samples) * 1000, 1)} for route, samples in by_route.items()}}
+
+def print_stage(stage: dict):
+    print(f"\n{stage['sessions']} concurrent sessions: {stage['reruns']} reruns in {stage['wall_seconds']}s "
+          f"({stage['reruns_per_second']} reruns/s), {stage['sessions_completed']}/{stage['sessions']} sessions error-free, "
+          f"~{stage['rss_per_session_mib']} MiB RSS per session")
+    print(f"  {'route':<20}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for route, r in stage["routes"].items():
+        print(f"  {route:<20}{r['count']:>7}{r['errors']:>8}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['mean_ms']:>10.1f}")
+    for error in stage["errors"][:5]: print(f"  error: {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline concurrent-session load test for the Streamlit app.")
+    parser.add_argument("--sessions", default="1,5,10", help="Comma-separated concurrency levels, each run as its own stage.")
+    parser.add_argument("--rounds", type=int, default=1, help="Chat + SIP rounds per session after logging in.")
+    parser.add_argument("--symbols", default="TCS.NS,INFY.NS,RELIANCE.NS,HDFCBANK.NS", help="Tickers the chat prompts rotate through.")
+    parser.add_argument("--yahoo-latency", type=float, default=0.2, help="Seconds per stand-in Yahoo call.")
+    parser.add_argument("--news-latency", type=float, default=0.3, help="Seconds per stand-in Google News / article request.")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="First-token latency of the stand-in LLM.")
+    parser.add_argument("--analysis-cache-ttl", type=float, default=None, help="Override FN_ANALYSIS_CACHE_TTL (0 makes every prompt recompute).")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-rerun timeout in seconds.")
+    parser.add_argument("--json", help="Also write every stage's results to this file.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("FN_DATA_DIR", tempfile.mkdtemp(prefix="fn-app-load-"))
+    os.environ["FN_ENABLE_STUB_LLM"] = "1"; os.environ.setdefault("FN_LOG_LEVEL", "WARNING")
+    if args.analysis_cache_ttl is not None: os.environ["FN_ANALYSIS_CACHE_TTL"] = str(args.analysis_cache_ttl)
+    install_stand_ins(args.yahoo_latency, args.news_latency)
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+
+    print(f"Stand-ins: Yahoo {args.yahoo_latency}s, news {args.news_latency}s, LLM first token {args.llm_latency}s; data in {os.environ['FN_DATA_DIR']}")
+    Session(0, args.llm_latency, args.timeout).run(symbols, 1)  # Warm-up: module imports and process-wide pools are not per-session costs.
+    stages, offset = [], 1
+    for sessions in (int(n) for n in args.sessions.split(",") if n.strip()):
+        stage = run_stage(sessions, symbols, args.rounds, args.llm_latency, args.timeout, offset); offset += sessions
+        print_stage(stage); stages.append(stage)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(stages, f, indent=2)
+
+if __name__ == "__main__":
+    main()
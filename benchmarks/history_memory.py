@@ -0,0 +1,68 @@
+# benchmarks/history_memory.py - memory of cached price histories: yfinance-style frames vs CompactHistory.
+# Usage:  python -m benchmarks.history_memory --symbols 500 --years 10
+# Synthetic random-walk histories are used, so no network access is needed; every symbol shares one trading calendar
+# as listings on the same exchange do.
+import gc
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from src.compact_history import CompactHistory, histories_memory
+from src.indicators import score_frame
+
+def yfinance_frame(index: pd.DatetimeIndex, rng: np.random.Generator) -> pd.DataFrame:
+    """The shape yf.Ticker.history returns: float64 OHLC, int64 volume, dividends and splits, a tz-aware index."""
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(index))))
+    spread = np.abs(rng.normal(0, 0.01, len(index))) * close
+    return pd.DataFrame({"Open": close + rng.normal(0, 0.3, len(index)), "High": close + spread, "Low": close - spread, "Close": close,
+                         "Volume": rng.integers(1e5, 5e7, len(index)), "Dividends": 0.0, "Stock Splits": 0.0},
+                        index=index.tz_localize("Asia/Kolkata"))
+
+def measure(build) -> tuple:
+    gc.collect(); tracemalloc.start()
+    started = time.perf_counter(); held = build(); elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory(); tracemalloc.stop()
+    return held, current, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark for cached price histories.")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--score-sample", type=int, default=20, help="Symbols to run the technical rule on for a timing comparison.")
+    args = parser.parse_args()
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252 * args.years)
+    rng = np.random.default_rng(7)
+    frames = {f"SYM{i:04d}.NS": yfinance_frame(index, rng) for i in range(args.symbols)}
+
+    # Before: the Yahoo frame as returned plus the full copy the scoring step made of it.
+    def frame_cache():
+        return {symbol: (frame.copy(), frame.copy()) for symbol, frame in frames.items()}
+    def compact_cache():
+        return {symbol: CompactHistory.from_frame(symbol, frame) for symbol, frame in frames.items()}
+
+    held_frames, frame_bytes, frame_seconds = measure(frame_cache)
+    raw_bytes = sum(frame.memory_usage(deep=True).sum() for frame, _ in held_frames.values())
+    del held_frames
+    compact, compact_bytes, compact_seconds = measure(compact_cache)
+    report = histories_memory(compact.values())
+
+    bars = len(index)
+    print(f"{args.symbols} symbols x {args.years} years ({bars} bars each)")
+    print(f"yfinance frames: {raw_bytes / 2**20:8.1f} MiB as returned; {frame_bytes / 2**20:8.1f} MiB traced with the analysis copy ({frame_seconds:.2f}s)")
+    print(f"CompactHistory:  {report['total_bytes'] / 2**20:8.1f} MiB owned + shared index; {compact_bytes / 2**20:8.1f} MiB traced ({compact_seconds:.2f}s)")
+    print(f"                 {report['distinct_indexes']} distinct date index(es), {report['index_bytes'] / 2**10:.1f} KiB")
+    print(f"reduction:       {frame_bytes / compact_bytes:.1f}x (traced)")
+
+    sample = list(frames)[:args.score_sample]
+    started = time.perf_counter()
+    for symbol in sample: score_frame(frames[symbol])
+    frame_score = (time.perf_counter() - started) / len(sample)
+    started = time.perf_counter()
+    for symbol in sample: score_frame(compact[symbol])
+    compact_score = (time.perf_counter() - started) / len(sample)
+    agree = all((score_frame(frames[s])["score"].to_numpy() == score_frame(compact[s])["score"].to_numpy()).mean() > 0.99 for s in sample[:5])
+    print(f"score_frame:     {frame_score * 1000:.1f} ms/symbol on frames, {compact_score * 1000:.1f} ms/symbol on CompactHistory (scores agree: {agree})")
+
+if __name__ == "__main__":
+    main()
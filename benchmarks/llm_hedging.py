@@ -0,0 +1,39 @@
+# benchmarks/llm_hedging.py - exercises the LLM router's hedging and failover offline, using stub providers.
+# Usage:  python -m benchmarks.llm_hedging --primary-latency 3 --secondary-latency 0.2 --requests 40
+# The stub's "API key" is its first-token latency, so ("Stub", "3") is a provider that takes 3s to start streaming.
+import time
+import asyncio
+import argparse
+import statistics
+from langchain_core.messages import HumanMessage
+from src.llm_utils import LLMRouter, llm_latency_stats
+
+async def run(primary_latency: float, secondary_latency: float, slow_every: int, requests: int, budget: float):
+    fast_primary = LLMRouter([("Stub", "0.05"), ("Stub", str(secondary_latency))], latency_budget=budget)
+    slow_primary = LLMRouter([("Stub", str(primary_latency)), ("Stub", str(secondary_latency))], latency_budget=budget)
+    latencies, winners = [], {}
+    for i in range(requests):
+        # Mostly-healthy primary with a periodic slow minute, like a provider under load.
+        router = slow_primary if slow_every and i % slow_every == 0 else fast_primary
+        started = time.perf_counter()
+        reply = await router.ainvoke([HumanMessage(content="ping")])
+        latencies.append(time.perf_counter() - started)
+        winner = f"{reply.response_metadata['provider']} ({'slow' if router is slow_primary else 'fast'} primary)"
+        winners[winner] = winners.get(winner, 0) + 1
+    latencies.sort()
+    print(f"requests={requests} p50={statistics.median(latencies):.3f}s p95={latencies[int(len(latencies) * 0.95) - 1]:.3f}s max={latencies[-1]:.3f}s")
+    print(f"winners: {winners}")
+    for name, stats in llm_latency_stats().items(): print(f"{name}: {stats}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline LLM hedging benchmark with stub providers.")
+    parser.add_argument("--primary-latency", type=float, default=3.0, help="First-token latency of the primary during a slow spell.")
+    parser.add_argument("--secondary-latency", type=float, default=0.2, help="First-token latency of the fallback provider.")
+    parser.add_argument("--slow-every", type=int, default=5, help="Every Nth request hits the slow primary (0 = never).")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--budget", type=float, default=1.0, help="Latency budget (max hedge delay) in seconds.")
+    args = parser.parse_args()
+    asyncio.run(run(args.primary_latency, args.secondary_latency, args.slow_every, args.requests, args.budget))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# benchmarks/service_load.py - closed-loop load generator for the headless API (service.py).
+# Usage:  python service.py &   then   python benchmarks/service_load.py --concurrency 50 --duration 30 --path /technical/TCS.NS
+import time
+import asyncio
+import argparse
+import statistics
+import httpx
+
+async def _worker(client: httpx.AsyncClient, paths: list, deadline: float, latencies: list, errors: list):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]; i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500: errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__); continue
+        latencies.append(time.perf_counter() - start)
+
+async def run(base_url: str, paths: list, concurrency: int, duration: float):
+    latencies, errors = [], []
+    # One pooled client with keep-alive, sized to the number of concurrent virtual users.
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(_worker(client, paths, deadline, latencies, errors) for _ in range(concurrency)))
+
+    if not latencies: print("No successful requests."); return
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"requests: {len(latencies)}  errors: {len(errors)}  throughput: {len(latencies) / duration:,.1f} req/s")
+    print(f"latency ms  p50: {pct(0.50):.1f}  p90: {pct(0.90):.1f}  p99: {pct(0.99):.1f}  mean: {statistics.mean(latencies) * 1000:.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Financial Navigator API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", dest="paths", help="Endpoint path to hit (repeatable). Defaults to /technical/TCS.NS.")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.paths or ["/technical/TCS.NS"], args.concurrency, args.duration))
@@ -0,0 +1,70 @@
+# precompute.py - materializes technical and fundamental snapshots for a watchlist into the local snapshot store.
+# Usage:  python precompute.py --watchlist watchlist.txt            (runs on the schedule below until stopped)
+#         python precompute.py --watchlist watchlist.txt --once     (single pass, e.g. from cron)
+# Schedule: every --interval minutes while the market is open, plus one pass --close-delay minutes after the close.
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from src.tools import compute_technical, compute_fundamental, canonical_symbol
+from src.rate_limit import set_default_lane, BACKGROUND
+from src.snapshot_store import save_snapshot, is_market_open, MARKET_TZ, MARKET_OPEN, MARKET_CLOSE
+
+logger = logging.getLogger("precompute")
+
+def load_watchlist(path: str) -> list:
+    """One symbol per line; blank lines and '#' comments are ignored."""
+    with open(path, encoding="utf-8") as f:
+        symbols = [line.split("#", 1)[0].strip().upper() for line in f]
+    return list(dict.fromkeys(symbol for symbol in symbols if symbol))
+
+def _precompute_symbol(symbol: str) -> int:
+    saved = 0
+    for tool, compute in (("technical", compute_technical), ("fundamental", compute_fundamental)):
+        result = compute(symbol, allow_snapshot=False)
+        if result.get("status") == "success":
+            save_snapshot(tool, canonical_symbol(symbol), result); saved += 1  # Keyed like the tools' caches, so "TCS" and "TCS.NS" share it.
+        else:
+            logger.warning("%s snapshot for %s failed: %s", tool, symbol, result.get("message"))
+    return saved
+
+def run_cycle(symbols: list, workers: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="precompute") as pool:
+        saved = sum(pool.map(_precompute_symbol, symbols))
+    logger.info("Precomputed %d snapshots for %d symbols in %.1fs", saved, len(symbols), time.perf_counter() - started)
+
+def next_run(now: datetime, interval: timedelta, close_delay: timedelta) -> datetime:
+    """Next intraday tick while the market is open, otherwise the next post-close pass or the next open."""
+    close_run = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TZ) + close_delay
+    if is_market_open(now):
+        return min(now + interval, close_run)
+    if now.weekday() < 5 and now < close_run and now.time() >= MARKET_CLOSE:
+        return close_run
+    day = now.date() + timedelta(days=0 if now.time() < MARKET_OPEN else 1)
+    while day.weekday() >= 5: day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TZ)
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute technical/fundamental snapshots for a watchlist.")
+    parser.add_argument("--watchlist", default="watchlist.txt", help="File with one ticker per line.")
+    parser.add_argument("--interval", type=float, default=30, help="Intraday refresh cadence in minutes.")
+    parser.add_argument("--close-delay", type=float, default=15, help="Minutes after the market close for the end-of-day pass.")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent symbol fetches.")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    set_default_lane(BACKGROUND)  # Yield Yahoo capacity to interactive sessions sharing this host's limits.
+
+    symbols = load_watchlist(args.watchlist)
+    run_cycle(symbols, args.workers)
+    while not args.once:
+        wake_at = next_run(datetime.now(MARKET_TZ), timedelta(minutes=args.interval), timedelta(minutes=args.close_delay))
+        logger.info("Next precompute pass at %s", wake_at.isoformat(timespec="minutes"))
+        time.sleep(max(0.0, (wake_at - datetime.now(MARKET_TZ)).total_seconds()))
+        symbols = load_watchlist(args.watchlist)  # Pick up watchlist edits without a restart.
+        run_cycle(symbols, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# service.py - headless HTTP API over the same analysis tools the Streamlit app uses.
+# Run with:  python service.py   (or: uvicorn service:app --port 8000)
+# Keep it to a single worker process so every request shares the in-process symbol and analysis caches.
+import os
+import asyncio
+from typing import Optional
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from src.tools import compute_technical, compute_multi_timeframe, compute_fundamental, fetch_news
+from src.peers import compute_peer_relative
+from src.singleflight import analysis_flight
+from src.rate_limit import lane, outbound_stats, BACKGROUND
+from src.sip_simulation import calculate_sip_future_value, simulate_glide_path
+
+MAX_CONCURRENCY = int(os.environ.get("FN_SERVICE_MAX_CONCURRENCY", 16))
+MAX_QUEUE = int(os.environ.get("FN_SERVICE_MAX_QUEUE", 256))
+KEEP_ALIVE_SECONDS = int(os.environ.get("FN_SERVICE_KEEP_ALIVE", 30))
+MAX_SCREENER_SYMBOLS = 100
+
+app = FastAPI(title="Financial Navigator API", description="Technical, fundamental, news, screener and SIP projection endpoints.")
+_limiter = asyncio.Semaphore(MAX_CONCURRENCY)
+_pending = 0
+
+class ScreenerRequest(BaseModel):
+    symbols: list[str] = Field(description="Ticker symbols to screen, e.g. ['TCS.NS', 'INFY.NS'].", min_length=1, max_length=MAX_SCREENER_SYMBOLS)
+    min_score: Optional[int] = Field(default=None, description="Only return symbols whose technical score is at least this value.")
+
+class SIPProjectionRequest(BaseModel):
+    monthly_investment: float = Field(gt=0, description="Monthly SIP amount.")
+    years: int = Field(gt=0, le=50, description="Investment horizon in years.")
+    annual_rate: float = Field(default=12.0, description="Flat expected annual return (%) for the simple projection.")
+    plan: Optional[dict] = Field(default=None, description="Optional multi-phase plan (strategy_summary/phases) for a phase-aware projection.")
+
+async def _run_tool(fn, *args):
+    """Runs a blocking tool in a worker thread under the service-wide concurrency limit, shedding load when the queue is full."""
+    global _pending
+    if _pending >= MAX_CONCURRENCY + MAX_QUEUE: raise HTTPException(status_code=503, detail="Server is busy, please retry shortly.")
+    _pending += 1
+    try:
+        async with _limiter:
+            return await asyncio.to_thread(fn, *args)
+    finally:
+        _pending -= 1
+
+def _respond(result: dict):
+    return result if result.get("status") == "success" else JSONResponse(result, status_code=422)
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "in_flight": _pending}
+
+@app.get("/metrics")
+async def metrics():
+    """Request-coalescing counters per tool, and outbound queue depth, wait times and retries per provider."""
+    return {"singleflight": analysis_flight.stats(), "outbound": outbound_stats(), "in_flight": _pending}
+
+@app.get("/technical/{symbol}")
+async def technical(symbol: str):
+    return _respond(await _run_tool(compute_technical, symbol))
+
+@app.get("/technical/{symbol}/multi-timeframe")
+async def multi_timeframe(symbol: str):
+    """Daily/weekly/monthly signals and their alignment score (-100 to +100)."""
+    return _respond(await _run_tool(compute_multi_timeframe, symbol))
+
+@app.get("/fundamental/{symbol}")
+async def fundamental(symbol: str):
+    return _respond(await _run_tool(compute_fundamental, symbol))
+
+@app.get("/fundamental/{symbol}/peers")
+async def fundamental_peers(symbol: str):
+    """Fundamentals ranked as percentiles of the company's sector peers."""
+    return _respond(await _run_tool(compute_peer_relative, symbol))
+
+@app.get("/news/{symbol}")
+async def news(symbol: str):
+    return _respond(await _run_tool(fetch_news, symbol))
+
+@app.post("/screener")
+async def screener(request: ScreenerRequest):
+    """Technical scores for many symbols at once, best score first. Symbols that fail are listed under `errors`."""
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.symbols))
+    with lane(BACKGROUND):  # Bulk screens queue behind interactive lookups for Yahoo capacity.
+        results = await asyncio.gather(*(_run_tool(compute_technical, symbol) for symbol in symbols))
+    rows, errors = [], []
+    for symbol, result in zip(symbols, results):
+        if result.get("status") != "success": errors.append({"symbol": symbol, "message": result.get("message")}); continue
+        if request.min_score is not None and result["score"] < request.min_score: continue
+        rows.append({"symbol": symbol, "score": result["score"], "recommendation_percent": result["recommendation_percent"], "price_targets": result["price_targets"]})
+    rows.sort(key=lambda row: row["score"], reverse=True)
+    return {"status": "success", "results": rows, "errors": errors}
+
+@app.post("/sip/projection")
+async def sip_projection(request: SIPProjectionRequest):
+    """Flat-rate SIP projection, plus the phase-aware glide path (sampled yearly) when a plan is supplied."""
+    projected_corpus = calculate_sip_future_value(request.monthly_investment, request.annual_rate, request.years)
+    total_invested = request.monthly_investment * 12 * request.years
+    response = {"status": "success", "flat": {"projected_corpus": projected_corpus, "total_invested": total_invested, "wealth_gained": projected_corpus - total_invested}}
+    if request.plan:
+        simulation = await _run_tool(simulate_glide_path, request.plan, request.monthly_investment, request.years)
+        if simulation is not None:
+            yearly = slice(11, None, 12)
+            response["glide_path"] = {
+                "expected_corpus": float(simulation["expected"][-1]), "p10_corpus": float(simulation["p10"][-1]), "p90_corpus": float(simulation["p90"][-1]),
+                "yearly": {key: simulation[key][yearly].tolist() for key in ("expected", "p10", "p50", "p90", "invested")},
+                "phases": simulation["phases"],
+            }
+    return response
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=os.environ.get("FN_SERVICE_HOST", "127.0.0.1"), port=int(os.environ.get("FN_SERVICE_PORT", 8000)),
+                timeout_keep_alive=KEEP_ALIVE_SECONDS)
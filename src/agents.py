@@ -1,31 +1,118 @@
+import os
+import time
+import logging
+import contextvars
+from functools import lru_cache
 from langchain import hub
 from langchain.agents import create_react_agent, AgentExecutor
-from langchain_community.chat_message_histories import StreamlitChatMessageHistory
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.tools import StructuredTool
 from src.llm_utils import get_llm_client
-from src.tools import get_technical_recommendation, get_fundamental_analysis, get_latest_news_for_summary
+from src.peers import get_peer_relative_fundamentals
+from src.chat_store import AGENT_HISTORY_LIMIT
+from src.tools import get_technical_recommendation, get_multi_timeframe_analysis, get_fundamental_analysis, get_latest_news_for_summary
+
+logger = logging.getLogger(__name__)
+
+# Per-run caps, so one query's worst-case latency and LLM spend are bounded.
+AGENT_MAX_ITERATIONS = int(os.environ.get("FN_AGENT_MAX_ITERATIONS", 6))
+AGENT_MAX_SECONDS = float(os.environ.get("FN_AGENT_MAX_SECONDS", 60))
+AGENT_MAX_TOKENS = int(os.environ.get("FN_AGENT_MAX_TOKENS", 12000))
+_run_budget = contextvars.ContextVar("agent_run_budget", default=None)
+
+class AgentRunBudget(BaseCallbackHandler):
+    """Per-run state: the tool result memo, estimated token spend (~4 characters per token) and why the run stopped."""
+    run_inline = True
+
+    def __init__(self, max_tokens: int = AGENT_MAX_TOKENS):
+        self.max_tokens = max_tokens; self.tokens = 0; self.iterations = 0
+        self.memo = {}; self.memo_hits = 0; self.stop_reason = None; self.started = time.monotonic()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.tokens += sum(len(str(message.content)) for batch in messages for message in batch) // 4
+
+    def on_llm_end(self, response, **kwargs):
+        self.tokens += sum(len(generation.text) for generations in response.generations for generation in generations) // 4
+
+class BudgetedAgentExecutor(AgentExecutor):
+    """AgentExecutor that also stops once the current run's token budget is spent, recording which cap was hit."""
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        budget = _run_budget.get()
+        if budget is None: return super()._should_continue(iterations, time_elapsed)
+        budget.iterations = iterations
+        if not super()._should_continue(iterations, time_elapsed):
+            budget.stop_reason = "step" if self.max_iterations is not None and iterations >= self.max_iterations else "time"
+            return False
+        if budget.tokens >= budget.max_tokens:
+            budget.stop_reason = "token"
+            return False
+        return True
+
+def _memo_key(name: str, kwargs: dict) -> tuple:
+    # ReAct inputs arrive as free text ("tcs.ns", "'TCS.NS'"), so normalise before comparing.
+    return name, tuple(sorted((k, str(v).strip().strip("'\"").upper()) for k, v in kwargs.items()))
+
+def _memoized(tool) -> StructuredTool:
+    """Wraps a tool so an identical call later in the same agent run returns the first result instantly."""
+    async def call(**kwargs):
+        budget = _run_budget.get(); key = _memo_key(tool.name, kwargs)
+        if budget is not None and key in budget.memo:
+            budget.memo_hits += 1
+            return budget.memo[key]
+        result = await tool.ainvoke(kwargs)
+        if budget is not None: budget.memo[key] = result
+        return result
+    return StructuredTool.from_function(coroutine=call, name=tool.name, description=tool.description, args_schema=tool.args_schema)
+
+def _partial_answer(steps: list, reason: str) -> str:
+    """Whatever the tools returned before a cap was hit, rather than LangChain's bare "Agent stopped" message."""
+    findings = list(dict.fromkeys(str(observation) for action, observation in steps if action.tool != "_Exception" and str(observation).strip()))
+    if not findings:
+        return f"⏱️ I reached my {reason} limit before I could gather anything useful. Please try a more specific question, e.g. *technical analysis of TCS.NS*."
+    return f"⏱️ I reached my {reason} limit before finishing, so here is what I found so far:\n\n" + "\n\n---\n\n".join(findings)
+
+@lru_cache(maxsize=1)
+def _react_prompt():
+    """Pulled from the LangChain hub once per process rather than once per session's agent."""
+    return hub.pull("hwchase17/react")
 
 class LangchainStockAgent:
-    def __init__(self, provider: str, api_key: str):
+    def __init__(self, provider: str, api_key: str, history: BaseChatMessageHistory):
         self.provider = provider
         self.api_key = api_key
         self.llm = get_llm_client(provider, api_key)
         if not self.llm: raise ValueError(f"Failed to initialize LLM for provider: {provider}")
 
         # The final, complete tool list
-        self.tools = [get_technical_recommendation, get_fundamental_analysis, get_latest_news_for_summary]
-        
-        prompt = hub.pull("hwchase17/react")
-        
+        self.tools = [_memoized(t) for t in (get_technical_recommendation, get_multi_timeframe_analysis, get_fundamental_analysis, get_peer_relative_fundamentals, get_latest_news_for_summary)]
+
+        prompt = _react_prompt()
+
         agent = create_react_agent(self.llm, self.tools, prompt)
-        
-        self.msgs = StreamlitChatMessageHistory(key="stock_chat_messages")
-        
-        self.agent_executor = AgentExecutor(
-            agent=agent, tools=self.tools, verbose=True, handle_parsing_errors=True
-        )
 
-    async def run_agent_with_history(self, user_query: str):
-        """Runs the ReAct agent."""
-        return await self.agent_executor.ainvoke(
-            {"input": user_query, "chat_history": self.msgs.messages},
+        self.msgs = history
+
+        self.agent_executor = BudgetedAgentExecutor(
+            agent=agent, tools=self.tools, verbose=True, handle_parsing_errors=True,
+            max_iterations=AGENT_MAX_ITERATIONS, max_execution_time=AGENT_MAX_SECONDS, early_stopping_method="force", return_intermediate_steps=True,
         )
+
+    def run_agent_with_history(self, user_query: str):
+        """
+        Returns the coroutine that runs the ReAct agent. Chat history is read here, on the calling
+        Streamlit thread, so the coroutine itself can run on the shared background event loop.
+        Only the last AGENT_HISTORY_LIMIT messages are sent, keeping the prompt size bounded.
+        """
+        return self._run({"input": user_query, "chat_history": self.msgs.recent(AGENT_HISTORY_LIMIT)})
+
+    async def _run(self, inputs: dict) -> dict:
+        budget = AgentRunBudget(); _run_budget.set(budget)  # Runs in its own task, so the budget is scoped to this run.
+        result = await self.agent_executor.ainvoke(inputs, config={"callbacks": [budget]})
+        stopped = str(result.get("output", "")).startswith("Agent stopped due to")  # LangChain's "force" early-stop message.
+        if stopped:
+            budget.stop_reason = budget.stop_reason or "time"
+            result["output"] = _partial_answer(result.get("intermediate_steps", []), budget.stop_reason)
+        logger.info("Agent run: %d iterations, ~%d tokens, %d memo hits, %.1fs%s", budget.iterations, budget.tokens, budget.memo_hits,
+                    time.monotonic() - budget.started, f", stopped at the {budget.stop_reason} limit" if stopped else "")
+        return result
@@ -0,0 +1,44 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Future
+
+ASYNC_TIMEOUT = float(os.environ.get("FN_ASYNC_TIMEOUT", 180))
+
+_loop = None
+_thread = None
+_lock = threading.Lock()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the process-wide event loop, starting it on a daemon thread on first use.
+    All sessions share it, so async LLM/HTTP clients keep their connection pools warm across reruns.
+    """
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="fn-event-loop", daemon=True)
+            _thread.start()
+        return _loop
+
+def run_sync(coro, timeout: float = ASYNC_TIMEOUT):
+    """
+    Runs a coroutine on the shared loop and blocks the calling Streamlit script thread until it finishes.
+    The coroutine runs on the loop thread, so it must not call `st.*` or read `st.session_state`;
+    read session data before building the coroutine and render its result afterwards.
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the event loop thread; await the coroutine instead.")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()  # Timed out, or the script run was stopped/rerun while waiting.
+        raise
+
+def submit(coro) -> Future:
+    """Schedules a coroutine on the shared loop without waiting; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
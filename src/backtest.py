@@ -0,0 +1,103 @@
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.indicators import score_frame, SCORE_TIERS
+from src.history_store import load_history, prefetch_histories
+
+logger = logging.getLogger(__name__)
+
+HORIZONS = (5, 20, 60)  # Forward-return horizons in trading days (~1 week, 1 month, 1 quarter).
+TRADING_DAYS = 252
+# One bucket per recommendation tier of the live rule, highest first, then the Hold tier (score <= 0).
+BUCKET_FLOORS = [floor for floor, _ in SCORE_TIERS]
+BUCKETS = [f"{floor}+ ({dist['Buy']}% Buy)" if i == 0 else f"{floor}-{BUCKET_FLOORS[i - 1] - 1} ({dist['Buy']}% Buy)"
+           for i, (floor, dist) in enumerate(SCORE_TIERS)] + [f"<={BUCKET_FLOORS[-1] - 1} (Hold)"]
+
+def _forward_returns(close: np.ndarray, horizon: int) -> np.ndarray:
+    fwd = np.full(close.shape, np.nan)
+    if len(close) > horizon: fwd[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return fwd
+
+def _max_drawdown(returns: np.ndarray) -> float:
+    equity = np.cumprod(1 + returns)
+    return float((equity / np.maximum.accumulate(equity) - 1).min()) if len(equity) else 0.0
+
+def backtest_frame(hist, years: int = 10, horizons: tuple = HORIZONS, entry_score: int = 3, cost_bps: float = 10) -> dict:
+    """
+    Replays the daily rule over one symbol's history (CompactHistory or frame) with whole-array operations. Returns additive per-bucket sums
+    (so results can be pooled across symbols) and a long/flat strategy that holds while score >= entry_score.
+    """
+    df = score_frame(hist)  # Scored on the full history so the 200-day warm-up falls before the test window.
+    if years and not df.empty: df = df[df.index >= df.index[-1] - pd.DateOffset(years=years)]
+    if len(df) < max(horizons) + 2: return None
+
+    close = df["Close"].to_numpy(dtype=float); score = df["score"].to_numpy()
+    bucket = np.select([score >= floor for floor in BUCKET_FLOORS], list(range(len(BUCKET_FLOORS))), len(BUCKET_FLOORS))
+    stats = {}
+    for h in horizons:
+        fwd = _forward_returns(close, h); valid = ~np.isnan(fwd)
+        b, r = bucket[valid], fwd[valid]
+        stats[h] = {"count": np.bincount(b, minlength=len(BUCKETS)).tolist(),
+                    "sum": np.bincount(b, weights=r, minlength=len(BUCKETS)).tolist(),
+                    "wins": np.bincount(b, weights=(r > 0), minlength=len(BUCKETS)).tolist(),
+                    "signal_count": int((score[valid] >= entry_score).sum()), "signal_wins": int(((score[valid] >= entry_score) & (r > 0)).sum())}
+
+    position = (score >= entry_score).astype(float)
+    daily = close[1:] / close[:-1] - 1
+    trades = np.abs(np.diff(position, prepend=0.0))[:-1]
+    strategy = position[:-1] * daily - trades * cost_bps / 10_000  # Signal at today's close, return earned tomorrow.
+    span_years = len(daily) / TRADING_DAYS
+    return {"bars": len(df), "start": df.index[0].strftime("%Y-%m-%d"), "end": df.index[-1].strftime("%Y-%m-%d"), "horizons": stats,
+            "strategy": {"total_return": float(np.prod(1 + strategy) - 1), "max_drawdown": _max_drawdown(strategy),
+                         "buy_hold_return": float(close[-1] / close[0] - 1), "buy_hold_max_drawdown": _max_drawdown(daily),
+                         "exposure": float(position.mean()), "trades": int(trades.sum()), "turnover_per_year": float(trades.sum() / span_years) if span_years else 0.0}}
+
+def _backtest_symbol(args: tuple):
+    symbol, years, horizons, entry_score, cost_bps = args
+    try:
+        return symbol, backtest_frame(load_history(symbol), years, horizons, entry_score, cost_bps)
+    except Exception as e:
+        logger.warning("Backtest failed for %s: %s", symbol, e)
+        return symbol, None
+
+def _summarize(per_symbol: dict, horizons: tuple) -> dict:
+    results = [r for r in per_symbol.values() if r is not None]
+    summary = {"symbols": len(per_symbol), "tested": len(results), "failed": sorted(s for s, r in per_symbol.items() if r is None)}
+    if not results: return summary
+    buckets = {}
+    for h in horizons:
+        count = np.sum([r["horizons"][h]["count"] for r in results], axis=0)
+        total = np.sum([r["horizons"][h]["sum"] for r in results], axis=0)
+        wins = np.sum([r["horizons"][h]["wins"] for r in results], axis=0)
+        signal_count = sum(r["horizons"][h]["signal_count"] for r in results); signal_wins = sum(r["horizons"][h]["signal_wins"] for r in results)
+        buckets[f"{h}d"] = {
+            "hit_rate": signal_wins / signal_count if signal_count else None,
+            "buckets": {name: {"observations": int(n), "mean_forward_return": float(s / n) if n else None, "hit_rate": float(w / n) if n else None}
+                        for name, n, s, w in zip(BUCKETS, count, total, wins)},
+        }
+    strategy = pd.DataFrame([r["strategy"] for r in results])
+    summary.update({"horizons": buckets, "strategy_median": strategy.median().to_dict(), "strategy_mean": strategy.mean().to_dict()})
+    return summary
+
+def run_backtest(symbols: list, years: int = 10, horizons: tuple = HORIZONS, entry_score: int = 3, cost_bps: float = 10, workers: int = None) -> dict:
+    """
+    Backtests the built-in rule on many symbols. Histories are bulk-downloaded into the disk cache first,
+    then each worker process loads its symbols from disk, so repeated runs never touch the network.
+    """
+    started = time.perf_counter()
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    available = prefetch_histories(symbols)
+    fetched = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    jobs = [(symbol, years, tuple(horizons), entry_score, cost_bps) for symbol in available]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        per_symbol = dict(pool.map(_backtest_symbol, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    per_symbol.update({symbol: None for symbol in symbols if symbol not in per_symbol})
+    summary = _summarize(per_symbol, tuple(horizons))
+    summary.update({"years": years, "entry_score": entry_score, "cost_bps": cost_bps,
+                    "fetch_seconds": round(fetched - started, 2), "compute_seconds": round(time.perf_counter() - fetched, 2)})
+    logger.info("Backtested %d/%d symbols in %.1fs (fetch %.1fs)", summary["tested"], len(symbols), time.perf_counter() - started, fetched - started)
+    return {"summary": summary, "per_symbol": per_symbol}
@@ -0,0 +1,135 @@
+import os
+import html
+import json
+import time
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from src.tools import _get_ticker, _technical_from_history, _fundamental_from_info, canonical_symbol
+from src.rate_limit import outbound, RateLimitedError
+from src.snapshot_store import load_snapshot
+from src.rendering import technical_card, fundamental_card, _minify, ANALYSIS_CARD_CSS
+from src.compact_history import CompactHistory
+from src.fundamental_trends import compute_trends, trends_for
+
+logger = logging.getLogger(__name__)
+
+REPORT_CSS = _minify(ANALYSIS_CARD_CSS + """
+body { font-family: -apple-system, "Segoe UI", Roboto, sans-serif; background-color: #f8f9fa; color: #212529; max-width: 920px; margin: 2em auto; padding: 0 1em; }
+.report-meta { color: #6c757d; font-size: 0.9em; }
+.report-error { border: 1px solid #f8d7da; border-radius: 12px; padding: 15px 25px; margin-top: 1em; background-color: #fff5f5; color: #842029; }
+.report-index td { padding: 4px 12px 4px 0; }
+""")
+
+def report_path(out_dir: str, symbol: str) -> str:
+    return os.path.join(out_dir, f"{symbol.upper()}.html")
+
+def _page(title: str, body: str) -> str:
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f"<style>{REPORT_CSS}</style></head><body>{body}</body></html>")
+
+def render_report(symbol: str, technical: dict, fundamental: dict) -> str:
+    """One standalone HTML page with the same technical and fundamental cards the chat shows."""
+    body = f'<p class="report-meta">{html.escape(symbol)} · generated {datetime.now():%Y-%m-%d %H:%M}</p>'
+    body += technical_card(symbol, technical) if technical["status"] == "success" else f'<div class="report-error">Technical: {html.escape(technical["message"])}</div>'
+    body += fundamental_card(fundamental) if fundamental["status"] == "success" else f'<div class="report-error">Fundamental: {html.escape(fundamental["message"])}</div>'
+    return _page(f"{symbol} report", body)
+
+def _write_atomic(path: str, text: str):
+    # A crash mid-write leaves only the .tmp file behind, so a resumed run never mistakes a partial report for a finished one.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: f.write(text)
+    os.replace(tmp, path)
+
+def _fetch(symbol: str, watchlist_trends: dict) -> dict:
+    """Network half of the technical and fundamental tools: Yahoo info, one year of daily bars and statement trends."""
+    started = time.perf_counter()
+    try:
+        ticker, info = _get_ticker(symbol)
+        if ticker is None: return {"symbol": symbol, "error": f"Invalid symbol: '{symbol}'.", "seconds": time.perf_counter() - started}
+        hist = CompactHistory.from_frame(ticker.ticker, outbound("yahoo", ticker.history, period="1y"))
+        # Trends come from the watchlist-wide pass; only a listing found by probing (not in the symbol master) is looked up here.
+        trends = watchlist_trends[ticker.ticker] if ticker.ticker in watchlist_trends else trends_for(ticker.ticker)
+    except RateLimitedError as e: return {"symbol": symbol, "error": str(e), "seconds": time.perf_counter() - started}
+    except Exception as e: return {"symbol": symbol, "error": f"An unexpected error occurred: {e}", "seconds": time.perf_counter() - started}
+    return {"symbol": symbol, "listing": ticker.ticker, "hist": hist, "info": info, "trends": trends, "seconds": time.perf_counter() - started}
+
+def _compute(symbol: str, listing: str, hist: CompactHistory, info: dict, trends: dict) -> tuple:
+    """CPU half, run in a worker process: scores both rules on the fetched data and renders the page."""
+    started = time.perf_counter()
+    technical = _technical_from_history(listing, hist); fundamental = _fundamental_from_info(listing, info, trends)
+    return render_report(symbol, technical, fundamental), time.perf_counter() - started
+
+def _from_snapshots(symbol: str):
+    """Both results from the precomputed snapshot store when they are fresh, so the symbol needs no fetch at all."""
+    key = canonical_symbol(symbol)
+    technical, fundamental = load_snapshot("technical", key), load_snapshot("fundamental", key)
+    return (technical, fundamental) if technical is not None and fundamental is not None else None
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+def write_index(out_dir: str, symbols: list, failed: dict):
+    rows = "".join(f'<tr><td><a href="{html.escape(os.path.basename(report_path(out_dir, s)))}">{html.escape(s)}</a></td></tr>' if s not in failed
+                   else f"<tr><td>{html.escape(s)}</td><td>{html.escape(failed[s])}</td></tr>" for s in symbols)
+    _write_atomic(os.path.join(out_dir, "index.html"),
+                  _page("Watchlist reports", f'<p class="report-meta">{len(symbols) - len(failed)} of {len(symbols)} reports · {datetime.now():%Y-%m-%d %H:%M}</p>'
+                                             f'<table class="report-index">{rows}</table>'))
+
+def run_batch_report(symbols: list, out_dir: str, fetch_workers: int = 8, compute_workers: int = None, resume: bool = True, use_snapshots: bool = True) -> dict:
+    """
+    Writes one HTML report per symbol into `out_dir`. Statement trends are computed for the whole watchlist in one
+    pass first. Fetches run on a bounded thread pool (and through the Yahoo rate limiter); each finished fetch is
+    handed straight to a process pool for scoring and rendering, and each finished report is written as soon as it completes. With `resume`, symbols that already have a report are skipped.
+    """
+    started = time.perf_counter(); os.makedirs(out_dir, exist_ok=True)
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    todo = [s for s in symbols if not (resume and os.path.exists(report_path(out_dir, s)))]
+    skipped = len(symbols) - len(todo)
+    if skipped: logger.info("Resuming: %d of %d reports already written", skipped, len(symbols))
+    fetch_seconds, compute_seconds, failed, written, from_snapshot = [], [], {}, 0, 0
+
+    def done(symbol: str, page: str):
+        nonlocal written
+        _write_atomic(report_path(out_dir, symbol), page); written += 1
+        logger.info("[%d/%d] Wrote %s", skipped + written + len(failed), len(symbols), report_path(out_dir, symbol))
+
+    pending = []
+    for symbol in todo:
+        cached = _from_snapshots(symbol) if use_snapshots else None
+        if cached is None: pending.append(symbol)
+        else: done(symbol, render_report(symbol, *cached)); from_snapshot += 1
+
+    with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="report-fetch") as fetch_pool, \
+         ProcessPoolExecutor(max_workers=compute_workers or os.cpu_count() or 1) as compute_pool:
+        # One vectorized trends pass for the whole watchlist; the statements behind it load on the fetch pool.
+        listings = [canonical_symbol(symbol) for symbol in pending]
+        known = compute_trends(listings, fetch_pool)
+        watchlist_trends = {listing: known.get(listing) for listing in listings}
+        in_flight = {fetch_pool.submit(_fetch, symbol, watchlist_trends): ("fetch", symbol) for symbol in pending}
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, symbol = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed[symbol] = f"{stage} failed: {e}"; logger.warning("Report for %s failed during %s: %s", symbol, stage, e); continue
+                if stage == "fetch":
+                    fetch_seconds.append(result["seconds"])
+                    if "error" in result: failed[symbol] = result["error"]; logger.warning("No report for %s: %s", symbol, result["error"]); continue
+                    in_flight[compute_pool.submit(_compute, symbol, result["listing"], result["hist"], result["info"], result["trends"])] = ("compute", symbol)
+                else:
+                    page, seconds = result; compute_seconds.append(seconds); done(symbol, page)
+
+    write_index(out_dir, symbols, failed)
+    wall = time.perf_counter() - started
+    summary = {"symbols": len(symbols), "written": written, "skipped": skipped, "from_snapshot": from_snapshot, "failed": failed,
+               "wall_seconds": round(wall, 2), "reports_per_second": round(written / wall, 2) if wall else None,
+               "fetch": {"count": len(fetch_seconds), "total_seconds": round(sum(fetch_seconds), 2),
+                         "p50": round(_percentile(fetch_seconds, 0.5), 3), "p95": round(_percentile(fetch_seconds, 0.95), 3), "max": round(max(fetch_seconds, default=0.0), 3)},
+               "compute": {"count": len(compute_seconds), "total_seconds": round(sum(compute_seconds), 2),
+                           "p50": round(_percentile(compute_seconds, 0.5), 3), "p95": round(_percentile(compute_seconds, 0.95), 3), "max": round(max(compute_seconds, default=0.0), 3)}}
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f: json.dump(summary, f, indent=2)
+    return summary
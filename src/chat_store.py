@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from src.storage import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+CHAT_DB = "chat.db"
+PAGE_SIZE = int(os.environ.get("FN_CHAT_PAGE_SIZE", 20))                   # Messages rendered per "load earlier" step.
+AGENT_HISTORY_LIMIT = int(os.environ.get("FN_AGENT_HISTORY_LIMIT", 20))    # Most recent messages handed to the agent.
+RESUME_WINDOW = float(os.environ.get("FN_CHAT_RESUME_HOURS", 12)) * 3600   # A returning user picks up a session this recent.
+RETENTION = float(os.environ.get("FN_CHAT_RETENTION_DAYS", 30)) * 86400    # Idle sessions older than this are deleted.
+MAX_SESSION_MESSAGES = int(os.environ.get("FN_CHAT_MAX_MESSAGES", 500))    # Older messages beyond this are trimmed.
+COMPACT_EVERY = 3600
+
+_compact_lock = threading.Lock()
+_last_compaction = 0.0
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def _ensure_schema(conn):
+    """Creates the tables once per process; every later call is a flag check."""
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready: return
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chat_sessions (session_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, updated_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS chat_sessions_user ON chat_sessions (user_id, updated_at);
+            CREATE TABLE IF NOT EXISTS chat_messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, message TEXT NOT NULL, created_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS chat_messages_session ON chat_messages (session_id, id);
+        """)
+        _schema_ready = True
+
+def _connect():
+    conn = connect_sqlite(CHAT_DB)
+    if not _schema_ready: _ensure_schema(conn)
+    return conn
+
+def new_browser_id() -> str:
+    """A random per-browser id; the caller keeps it client-side (e.g. in the URL) so only that browser resumes its chats."""
+    return uuid.uuid4().hex
+
+def user_id_for(browser_id: str, provider: str, api_key: str) -> str:
+    """
+    A stable, non-reversible history key. The browser id is the identity, so people sharing an API key never see
+    each other's chats; the key is only an extra scope and is never stored raw.
+    """
+    return hashlib.sha256(f"{browser_id}:{provider}:{api_key}".encode()).hexdigest()[:24]
+
+def resolve_session_id(user_id: str) -> str:
+    """The user's most recent session if it was active within RESUME_WINDOW, otherwise a new one."""
+    row = _connect().execute("SELECT session_id FROM chat_sessions WHERE user_id = ? AND updated_at >= ? ORDER BY updated_at DESC LIMIT 1",
+                             (user_id, time.time() - RESUME_WINDOW)).fetchone()
+    return row[0] if row else uuid.uuid4().hex
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history persisted in DATA_DIR/chat.db instead of session memory.
+    Pages are read newest-first by (session_id, id), so a rerun costs the same however long the chat is.
+    """
+    def __init__(self, session_id: str, user_id: str):
+        self.session_id = session_id
+        self.user_id = user_id
+
+    @property
+    def messages(self) -> list:
+        rows = _connect().execute("SELECT message FROM chat_messages WHERE session_id = ? ORDER BY id", (self.session_id,)).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def recent(self, limit: int) -> list:
+        """The last `limit` messages, oldest first."""
+        return self.page(limit)[0]
+
+    def page(self, limit: int) -> tuple:
+        """Returns (last `limit` messages oldest first, whether earlier messages exist)."""
+        rows = _connect().execute("SELECT message FROM chat_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?", (self.session_id, limit + 1)).fetchall()
+        has_earlier = len(rows) > limit
+        return messages_from_dict([json.loads(row[0]) for row in reversed(rows[:limit])]), has_earlier
+
+    def add_messages(self, messages: list[BaseMessage]) -> None:
+        now = time.time(); conn = _connect()
+        with conn:
+            conn.executemany("INSERT INTO chat_messages (session_id, message, created_at) VALUES (?, ?, ?)",
+                             [(self.session_id, json.dumps(message_to_dict(message)), now) for message in messages])
+            conn.execute("INSERT OR REPLACE INTO chat_sessions (session_id, user_id, updated_at) VALUES (?, ?, ?)", (self.session_id, self.user_id, now))
+
+    def clear(self) -> None:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (self.session_id,))
+            conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (self.session_id,))
+
+def compact_chat_store(retention: float = RETENTION, max_messages: int = MAX_SESSION_MESSAGES) -> dict:
+    """Deletes sessions idle for longer than `retention` seconds and trims the rest to their last `max_messages` messages."""
+    conn = _connect(); cutoff = time.time() - retention
+    with conn:
+        expired = conn.execute("DELETE FROM chat_messages WHERE session_id IN (SELECT session_id FROM chat_sessions WHERE updated_at < ?)", (cutoff,)).rowcount
+        sessions = conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (cutoff,)).rowcount
+        oversized = [row[0] for row in conn.execute("SELECT session_id FROM chat_messages GROUP BY session_id HAVING COUNT(*) > ?", (max_messages,))]
+        trimmed = 0
+        for session_id in oversized:
+            trimmed += conn.execute("""DELETE FROM chat_messages WHERE session_id = ? AND id <= (
+                SELECT id FROM chat_messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)""", (session_id, session_id, max_messages)).rowcount
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    stats = {"expired_sessions": sessions, "expired_messages": expired, "trimmed_messages": trimmed}
+    logger.info("Chat store compacted: %s", stats)
+    return stats
+
+def maybe_compact_chat_store():
+    """Runs compact_chat_store at most once per COMPACT_EVERY seconds per process."""
+    global _last_compaction
+    with _compact_lock:
+        if time.time() - _last_compaction < COMPACT_EVERY: return
+        _last_compaction = time.time()
+    try:
+        compact_chat_store()
+    except Exception as e:
+        logger.warning("Chat store compaction failed: %s", e)
@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ("Open", "High", "Low", "Close")
+MAX_SHARED_INDEXES = 256
+_shared_indexes = OrderedDict()
+_shared_lock = threading.Lock()
+
+def shared_index(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """
+    Returns one canonical object per distinct trading calendar, so every symbol listed on the same exchange
+    over the same window points at the same DatetimeIndex instead of holding its own copy.
+    """
+    if len(index) == 0: return index
+    key = (len(index), index[0].value, index[-1].value)
+    with _shared_lock:
+        for candidate in _shared_indexes.get(key, ()):
+            if candidate.equals(index):
+                _shared_indexes.move_to_end(key)
+                return candidate
+        _shared_indexes.setdefault(key, []).append(index)
+        if len(_shared_indexes) > MAX_SHARED_INDEXES: _shared_indexes.popitem(last=False)
+    return index
+
+class CompactHistory:
+    """
+    Daily OHLCV for one symbol: float32 prices in one column-major block, integer volumes and a shared date index.
+    Dividends, splits and indicator columns are never stored; indicators are computed on demand from the views.
+    """
+    __slots__ = ("symbol", "index", "prices", "volume")
+
+    def __init__(self, symbol: str, index: pd.DatetimeIndex, prices: np.ndarray, volume: np.ndarray):
+        self.symbol, self.index, self.prices, self.volume = symbol, index, prices, volume
+
+    @classmethod
+    def from_frame(cls, symbol: str, frame: pd.DataFrame) -> "CompactHistory":
+        frame = frame.reindex(columns=[*PRICE_COLUMNS, "Volume"]).dropna(subset=["Close"])  # Yahoo returns no columns at all for unknown symbols.
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None: index = index.tz_localize(None)
+        prices = np.ascontiguousarray(frame[list(PRICE_COLUMNS)].to_numpy(dtype=np.float32).T)  # Row i is one price column.
+        volume = frame["Volume"].fillna(0).to_numpy()
+        volume = volume.astype(np.int32 if len(volume) == 0 or volume.max() < np.iinfo(np.int32).max else np.int64)
+        return cls(symbol, shared_index(index), prices, volume)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.index) == 0
+
+    def column(self, name: str) -> np.ndarray:
+        return self.volume if name == "Volume" else self.prices[PRICE_COLUMNS.index(name)]
+
+    def __getitem__(self, name: str) -> pd.Series:
+        return pd.Series(self.column(name), index=self.index, name=name, copy=False)
+
+    def _slice(self, rows: slice) -> "CompactHistory":
+        # Views into the same buffers; only a trimmed window needs a new (shared) index.
+        return CompactHistory(self.symbol, shared_index(self.index[rows]), self.prices[:, rows], self.volume[rows])
+
+    def tail(self, n: int) -> "CompactHistory":
+        return self._slice(slice(max(len(self) - n, 0), None))
+
+    def since(self, start) -> "CompactHistory":
+        return self._slice(slice(self.index.searchsorted(pd.Timestamp(start)), None))
+
+    def to_frame(self, columns=PRICE_COLUMNS + ("Volume",)) -> pd.DataFrame:
+        """A transient pandas frame for code that needs one (resampling, pandas_ta); it is never cached."""
+        return pd.DataFrame({name: self.column(name) for name in columns}, index=self.index)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes owned by this history; the shared index is reported separately by memory_usage()."""
+        return self.prices.nbytes + self.volume.nbytes
+
+    def memory_usage(self) -> dict:
+        return {"prices": self.prices.nbytes, "volume": self.volume.nbytes, "index": self.index.nbytes}
+
+    def __repr__(self) -> str:
+        span = f"{self.index[0]:%Y-%m-%d}..{self.index[-1]:%Y-%m-%d}" if len(self) else "empty"
+        return f"CompactHistory({self.symbol!r}, {len(self)} bars, {span}, {self.nbytes / 1024:.1f} KiB)"
+
+def histories_memory(histories) -> dict:
+    """Total bytes for a collection of histories, counting each shared date index once."""
+    histories = list(histories)
+    indexes = {id(h.index): h.index.nbytes for h in histories}
+    owned = sum(h.nbytes for h in histories)
+    return {"histories": len(histories), "owned_bytes": owned, "index_bytes": sum(indexes.values()), "distinct_indexes": len(indexes),
+            "total_bytes": owned + sum(indexes.values())}
+
+def as_frame(hist) -> pd.DataFrame:
+    """Lets indicator code accept either a CompactHistory or a plain OHLCV frame."""
+    return hist.to_frame() if isinstance(hist, CompactHistory) else hist
@@ -0,0 +1,143 @@
+import logging
+import numpy as np
+import pandas as pd
+from src.statement_store import load_statements
+from src.rate_limit import RateLimitedError
+
+logger = logging.getLogger(__name__)
+
+ANNUAL_PERIODS = 4     # Yahoo returns up to four fiscal years...
+QUARTERLY_PERIODS = 5  # ...and five quarters: enough for the latest quarter's year-on-year change.
+MIN_GROWTH_YEARS = 2   # Year-on-year changes needed before growth consistency is scored.
+YEAR_AGO_TOLERANCE_DAYS = 20  # A quarter ending within this many days of a year before the latest one is its year-ago quarter.
+
+def _period_columns(statements: dict, frequency: str, periods: int) -> list:
+    """Per company, its latest `periods` period ends across every item of `frequency`, oldest to newest."""
+    return [sorted({period for series in payload.get(frequency, {}).values() for period in series})[-periods:] for payload in statements.values()]
+
+def _panel(statements: dict, frequency: str, item: str, columns: list, periods: int) -> np.ndarray:
+    """
+    (companies x periods) values placed on each company's shared period columns, right-aligned and NaN-padded,
+    so every item of a row lines up on the same period ends and a period one item lacks stays NaN.
+    """
+    panel = np.full((len(statements), periods), np.nan)
+    for row, (payload, dates) in enumerate(zip(statements.values(), columns)):
+        series = payload.get(frequency, {}).get(item, {})
+        if dates: panel[row, periods - len(dates):] = [series.get(date, np.nan) for date in dates]
+    return panel
+
+def _year_ago(columns: list, periods: int) -> np.ndarray:
+    """Column of the period ending about a year before each company's latest one, or -1 when that period is not reported."""
+    index = np.full(len(columns), -1)
+    for row, dates in enumerate(columns):
+        if not dates: continue
+        ends = pd.to_datetime(dates); gap = np.abs((ends[-1] - ends).days.to_numpy() - 365)
+        best = int(gap.argmin())
+        if gap[best] <= YEAR_AGO_TOLERANCE_DAYS: index[row] = periods - len(dates) + best
+    return index
+
+def _first_last(panel: np.ndarray) -> tuple:
+    """Earliest and latest non-NaN value per row and the number of periods between them."""
+    valid = ~np.isnan(panel)
+    first_idx = np.where(valid.any(axis=1), valid.argmax(axis=1), panel.shape[1] - 1)
+    last_idx = panel.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+    rows = np.arange(panel.shape[0])
+    return panel[rows, first_idx], panel[rows, last_idx], last_idx - first_idx
+
+def _cagr(panel: np.ndarray) -> np.ndarray:
+    first, last, spans = _first_last(panel)
+    ok = (spans >= 1) & (first > 0) & (last > 0)
+    ratio = np.where(ok, last / np.where(ok, first, 1.0), 1.0)
+    return np.where(ok, ratio ** (1 / np.maximum(spans, 1)) - 1, np.nan)
+
+def trend_metrics(statements: dict) -> pd.DataFrame:
+    """
+    Multi-period growth and consistency metrics for many companies at once ({symbol: statements} -> one row per symbol).
+    Every metric is a whole-panel array operation on period-aligned columns; missing periods and items come out as NaN.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        years = _period_columns(statements, "annual", ANNUAL_PERIODS)
+        revenue = _panel(statements, "annual", "revenue", years, ANNUAL_PERIODS)
+        income = _panel(statements, "annual", "net_income", years, ANNUAL_PERIODS)
+        eps = _panel(statements, "annual", "eps", years, ANNUAL_PERIODS)
+        equity = _panel(statements, "annual", "equity", years, ANNUAL_PERIODS)
+        debt = _panel(statements, "annual", "total_debt", years, ANNUAL_PERIODS)
+        quarters = _period_columns(statements, "quarterly", QUARTERLY_PERIODS)
+        quarterly = _panel(statements, "quarterly", "revenue", quarters, QUARTERLY_PERIODS)
+        year_ago = _year_ago(quarters, QUARTERLY_PERIODS)
+        year_ago_revenue = np.where(year_ago >= 0, quarterly[np.arange(len(quarterly)), np.maximum(year_ago, 0)], np.nan)
+
+        growth = revenue[:, 1:] / revenue[:, :-1] - 1; growth_years = (~np.isnan(growth)).sum(axis=1)
+        margin = np.where(np.abs(revenue) > 0, income / revenue, np.nan)
+        first_margin, last_margin, margin_span = _first_last(margin)
+        leverage = np.where(equity > 0, np.nan_to_num(debt, nan=0.0) / equity, np.nan)  # No debt row means no reported debt.
+        first_leverage, last_leverage, leverage_span = _first_last(leverage)
+        return pd.DataFrame({
+            "revenue_cagr": _cagr(revenue), "revenue_years": growth_years,
+            "revenue_consistency": np.where(growth_years >= MIN_GROWTH_YEARS, (growth > 0).sum(axis=1) / np.maximum(growth_years, 1), np.nan),
+            "eps_cagr": _cagr(eps),
+            "net_margin": last_margin, "margin_change": np.where(margin_span >= 1, last_margin - first_margin, np.nan),
+            "debt_to_equity": last_leverage, "debt_to_equity_change": np.where(leverage_span >= 1, last_leverage - first_leverage, np.nan),
+            "quarterly_revenue_yoy": np.where(year_ago_revenue > 0, quarterly[:, -1] / year_ago_revenue - 1, np.nan),
+        }, index=list(statements))
+
+def _pct(value: float) -> str:
+    return f"{value:+.1%}"
+
+def trend_points(trends: dict) -> tuple:
+    """(score change, positive points, caution points) for one company's trend metrics; each scored signal is worth one point."""
+    score, positive, caution = 0, [], []
+    cagr, years = trends.get("revenue_cagr"), trends.get("revenue_years") or 0
+    if cagr is not None and cagr >= 0.10: positive.append(f"• **Revenue Growth ({years}y CAGR of {_pct(cagr)}):** The top line is compounding at a healthy pace."); score += 1
+    elif cagr is not None and cagr < 0: caution.append(f"• **Revenue Growth ({years}y CAGR of {_pct(cagr)}):** Revenue has shrunk over the period."); score -= 1
+    consistency = trends.get("revenue_consistency")
+    if consistency is not None and consistency == 1: positive.append(f"• **Consistency:** Revenue grew in each of the last {years} years."); score += 1
+    elif consistency is not None and consistency < 0.5: caution.append(f"• **Consistency:** Revenue grew in only {round(consistency * years)} of the last {years} years."); score -= 1
+    eps = trends.get("eps_cagr")
+    if eps is not None and eps >= 0.10: positive.append(f"• **Earnings Growth (EPS CAGR of {_pct(eps)}):** Per-share earnings are rising."); score += 1
+    elif eps is not None and eps < 0: caution.append(f"• **Earnings Growth (EPS CAGR of {_pct(eps)}):** Per-share earnings are falling."); score -= 1
+    margin = trends.get("margin_change")
+    if margin is not None and margin >= 0.02: positive.append(f"• **Margin Expansion ({margin * 100:+.1f} pp):** Net margin has widened to {trends['net_margin']:.1%}."); score += 1
+    elif margin is not None and margin <= -0.02: caution.append(f"• **Margin Compression ({margin * 100:+.1f} pp):** Net margin has narrowed to {trends['net_margin']:.1%}."); score -= 1
+    leverage = trends.get("debt_to_equity_change")
+    if leverage is not None and leverage <= -0.2: positive.append(f"• **Deleveraging:** Debt/equity fell by {-leverage:.2f} to {trends['debt_to_equity']:.2f}."); score += 1
+    elif leverage is not None and leverage >= 0.3: caution.append(f"• **Rising Leverage:** Debt/equity rose by {leverage:.2f} to {trends['debt_to_equity']:.2f}."); score -= 1
+    quarter = trends.get("quarterly_revenue_yoy")
+    if quarter is not None: (positive if quarter >= 0 else caution).append(f"• **Latest Quarter:** Revenue {_pct(quarter)} year on year.")
+    return score, positive, caution
+
+def trend_verdict(score: int) -> str:
+    """Verdict for a trend score (-5 to +5); reported beside the ratio verdict rather than added to it."""
+    if score >= 2: return "Improving"
+    if score <= -2: return "Deteriorating"
+    return "Stable"
+
+def _load(symbol: str):
+    try:
+        return load_statements(symbol)
+    except RateLimitedError as e:
+        logger.warning("Statements for %s are rate limited: %s", symbol, e)
+    except Exception as e:
+        logger.warning("No statements for %s: %s", symbol, e)
+    return None
+
+def _usable(trends: dict) -> bool:
+    return any(v is not None for k, v in trends.items() if k != "revenue_years")
+
+def compute_trends(symbols: list, executor=None) -> dict:
+    """
+    {symbol: trend metrics} for every symbol with usable statements (ETFs and unavailable ones are left out), in one
+    vectorized pass. Statements come from the local store and are loaded concurrently on `executor` when one is given.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols))
+    loaded = (executor.map if executor is not None else map)(_load, symbols)
+    statements = {symbol: payload for symbol, payload in zip(symbols, loaded) if payload is not None}
+    if not statements: return {}
+    frame = trend_metrics(statements).astype(object)
+    frame = frame.where(frame.notna(), None)
+    trends = {symbol: {k: None if v is None else int(v) if k == "revenue_years" else round(float(v), 4) for k, v in row.items()} for symbol, row in frame.iterrows()}
+    return {symbol: row for symbol, row in trends.items() if _usable(row)}
+
+def trends_for(symbol: str):
+    """One company's trend metrics, or None when it has no usable statements (e.g. an ETF) or they cannot be fetched."""
+    return compute_trends([symbol]).get(symbol.strip().upper())
@@ -0,0 +1,83 @@
+import os
+import time
+import logging
+import pandas as pd
+import yfinance as yf
+from src.storage import data_path
+from src.cache import TTLCache
+from src.rate_limit import outbound
+from src.compact_history import CompactHistory
+
+logger = logging.getLogger(__name__)
+
+# Daily OHLCV cached on disk per symbol, for batch jobs (backtests, reports) that replay long histories.
+HISTORY_MAX_AGE = float(os.environ.get("FN_HISTORY_MAX_AGE", 18 * 3600))
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Decoded histories are kept in memory in compact form (float32 prices, shared date index), keyed by symbol.
+HISTORY_MEMORY_SYMBOLS = int(os.environ.get("FN_HISTORY_MEMORY_SYMBOLS", 1000))
+_memory = TTLCache(ttl=HISTORY_MAX_AGE, maxsize=HISTORY_MEMORY_SYMBOLS)
+
+def _history_path(symbol: str, period: str = "max") -> str:
+    # Full histories live directly under history/; shorter windows (interactive views) in history/<period>/.
+    return data_path("history", f"{symbol.upper()}.pkl") if period == "max" else data_path("history", period, f"{symbol.upper()}.pkl")
+
+def _periods(period: str) -> tuple:
+    """Cached windows that satisfy a request for `period`: its own, then the full history."""
+    return (period,) if period == "max" else (period, "max")
+
+def is_cached(symbol: str, max_age: float = HISTORY_MAX_AGE, period: str = "max") -> bool:
+    for held in _periods(period):
+        try:
+            if time.time() - os.path.getmtime(_history_path(symbol, held)) <= max_age: return True
+        except OSError:
+            continue
+    return False
+
+def cached_history(symbol: str, max_age: float = HISTORY_MAX_AGE, period: str = "max"):
+    """The cached daily CompactHistory covering `period` if one is younger than `max_age` seconds, otherwise None."""
+    for held in _periods(period):
+        path = _history_path(symbol, held)
+        try:
+            mtime = os.path.getmtime(path)
+            if time.time() - mtime > max_age: continue
+            cached = _memory.get((symbol.upper(), held))
+            if cached is not None and cached[0] == mtime: return cached[1]
+            hist = CompactHistory.from_frame(symbol.upper(), pd.read_pickle(path))
+        except (OSError, ValueError, EOFError):
+            continue
+        _memory.set((symbol.upper(), held), (mtime, hist))
+        return hist
+    return None
+
+def _store(symbol: str, hist: pd.DataFrame, period: str = "max") -> CompactHistory:
+    hist = hist[OHLCV_COLUMNS].dropna(subset=["Close"])
+    if hist.index.tz is not None: hist.index = hist.index.tz_localize(None)
+    path = _history_path(symbol, period); hist.to_pickle(path)
+    compact = CompactHistory.from_frame(symbol.upper(), hist)
+    _memory.set((symbol.upper(), period), (os.path.getmtime(path), compact))
+    return compact
+
+def load_history(symbol: str, years: int = None, max_age: float = HISTORY_MAX_AGE, period: str = "max") -> CompactHistory:
+    """
+    Daily history for a symbol (memory, then disk cache, then Yahoo), optionally trimmed to the last `years`.
+    Only batch replays need the default full history; interactive callers pass a short Yahoo `period` such as "2y".
+    """
+    hist = cached_history(symbol, max_age, period)
+    if hist is None:
+        hist = _store(symbol, outbound("yahoo", yf.Ticker(symbol).history, period=period, auto_adjust=True), period)
+    if years and not hist.empty: hist = hist.since(hist.index[-1] - pd.DateOffset(years=years))
+    return hist
+
+def prefetch_histories(symbols: list, max_age: float = HISTORY_MAX_AGE, chunk: int = 100, period: str = "max") -> list:
+    """Bulk-downloads `period` of daily history for every symbol missing from the disk cache; returns the symbols that have data."""
+    missing = [s for s in symbols if not is_cached(s, max_age, period)]
+    for start in range(0, len(missing), chunk):
+        batch = missing[start:start + chunk]
+        frames = outbound("yahoo", yf.download, batch, period=period, group_by="ticker", auto_adjust=True, threads=True, progress=False)
+        for symbol in batch:
+            try:
+                hist = frames[symbol] if isinstance(frames.columns, pd.MultiIndex) else frames
+                if hist["Close"].notna().any(): _store(symbol, hist, period)
+            except KeyError:
+                logger.warning("No history downloaded for %s", symbol)
+    return [s for s in symbols if is_cached(s, max_age, period)]
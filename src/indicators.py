@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+from src.compact_history import as_frame
+
+# timeframe -> (resample rule, fast SMA, slow SMA, weight in the alignment score). Weekly and monthly bars use
+# the usual swing-trading equivalents of the daily 50/200 cross; higher timeframes carry more weight.
+TIMEFRAMES = {
+    "daily": (None, 50, 200, 1.0),
+    "weekly": ("W-FRI", 10, 40, 1.5),
+    "monthly": ("ME", 6, 12, 2.0),
+}
+MAX_TIMEFRAME_SCORE = 6  # Cross ±2, price vs fast SMA ±1, RSI ±2, MACD ±1.
+MIN_MACD_BARS = 35
+OHLCV_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+# Score tiers of the built-in daily rule -> recommendation split. Shared by the live tool and the backtester.
+SCORE_TIERS = [(5, {"Buy": 80, "Hold": 15, "Sell": 5}), (3, {"Buy": 70, "Hold": 25, "Sell": 5}), (1, {"Buy": 60, "Hold": 30, "Sell": 10})]
+HOLD_DISTRIBUTION = {"Buy": 20, "Hold": 60, "Sell": 20}
+
+def score_distribution(score: int) -> dict:
+    return next((dict(dist) for floor, dist in SCORE_TIERS if score >= floor), dict(HOLD_DISTRIBUTION))
+
+def score_frame(hist) -> pd.DataFrame:
+    """
+    The daily technical rule evaluated for every bar at once: indicator columns plus `score`
+    (SMA50/200 cross ±2, close vs SMA50 ±1, RSI14 <30/>70 ±2, MACD vs signal ±1). Warm-up rows are dropped.
+    Accepts a CompactHistory or an OHLCV frame; only the columns the rule and its explanation use are built.
+    """
+    df = as_frame(hist)[list(OHLCV_AGG)].copy()
+    close = df["Close"].astype(np.float64)
+    df["SMA50"] = ta.sma(close, length=50)
+    df["SMA200"] = ta.sma(close, length=200)
+    df["RSI14"] = ta.rsi(close, length=14)
+    macd = ta.macd(close)
+    if macd is None: return df.iloc[0:0]  # Too short for MACD's warm-up.
+    df["MACD"], df["MACDs"] = macd.iloc[:, 0], macd.iloc[:, 2]  # MACD line and signal; the histogram is not used.
+    df.dropna(inplace=True)
+    df["score"] = (np.where(df["SMA50"] > df["SMA200"], 2, -2) + np.where(df["Close"] > df["SMA50"], 1, -1)
+                   + np.select([df["RSI14"] < 30, df["RSI14"] > 70], [2, -2], 0) + np.where(df["MACD"] > df["MACDs"], 1, -1)).astype(np.int8)
+    return df
+
+def _advance(state: dict, close: float, prev_close: float) -> dict:
+    """One daily step of the EMA12/26, MACD signal and Wilder RSI recurrences (the ones pandas_ta converges to)."""
+    ema12 = state["ema12"] + 2 / 13 * (close - state["ema12"]); ema26 = state["ema26"] + 2 / 27 * (close - state["ema26"])
+    change = close - prev_close
+    return {"ema12": ema12, "ema26": ema26, "signal": state["signal"] + 0.2 * (ema12 - ema26 - state["signal"]),
+            "avg_gain": state["avg_gain"] + (max(change, 0.0) - state["avg_gain"]) / 14,
+            "avg_loss": state["avg_loss"] + (max(-change, 0.0) - state["avg_loss"]) / 14}
+
+def live_state(hist, levels_window: int = 90) -> dict:
+    """
+    What the daily rule needs to re-score the last bar from a live price in O(1): the last 200 closes, the
+    recurrence state as of the bar before the last one, and the recent support/resistance levels.
+    Returns None when the history is too short for the 200-day average.
+    """
+    df = as_frame(hist)
+    if len(df) < 201: return None
+    close = df["Close"].astype(np.float64)
+    ema12 = close.ewm(span=12, adjust=False).mean(); ema26 = close.ewm(span=26, adjust=False).mean()
+    signal = (ema12 - ema26).ewm(span=9, adjust=False).mean(); change = close.diff()
+    avg_gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean(); avg_loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    recent = df.iloc[-levels_window:]
+    return {"bar_date": df.index[-1].strftime("%Y-%m-%d"), "closes": close.iloc[-200:].tolist(),
+            "state": {"ema12": float(ema12.iloc[-2]), "ema26": float(ema26.iloc[-2]), "signal": float(signal.iloc[-2]),
+                      "avg_gain": float(avg_gain.iloc[-2]), "avg_loss": float(avg_loss.iloc[-2])},
+            "support": float(recent["Low"].min()), "resistance": float(recent["High"].max())}
+
+def live_signals(live: dict, price: float, new_bar: bool) -> dict:
+    """
+    Re-scores the daily rule with `price` as the close of the forming bar: either replacing the last bar
+    (same trading day) or as a new bar after it. Support/resistance stretch to include the live price.
+    """
+    closes = live["closes"]; state = live["state"]
+    if new_bar:
+        state = _advance(state, closes[-1], closes[-2]); window = closes[1:] + [price]; prev_close = closes[-1]
+    else:
+        window = closes[:-1] + [price]; prev_close = closes[-2]
+    state = _advance(state, price, prev_close)
+    sma50 = sum(window[-50:]) / 50; sma200 = sum(window) / 200
+    rsi = 100.0 if state["avg_loss"] == 0 else 100 - 100 / (1 + state["avg_gain"] / state["avg_loss"])
+    macd = state["ema12"] - state["ema26"]
+    score = (2 if sma50 > sma200 else -2) + (1 if price > sma50 else -1) + (2 if rsi < 30 else -2 if rsi > 70 else 0) + (1 if macd > state["signal"] else -1)
+    support = min(live["support"], price); resistance = max(live["resistance"], price)
+    return {"price": price, "sma50": sma50, "sma200": sma200, "rsi": rsi, "macd_bullish": macd > state["signal"], "score": score,
+            "recommendation_percent": score_distribution(score), "support": support, "resistance": resistance,
+            "to_support_pct": (price - support) / price * 100, "to_resistance_pct": (resistance - price) / price * 100}
+
+def resample_ohlcv(daily, rule: str) -> pd.DataFrame:
+    """Aggregates daily bars (a CompactHistory or frame) into `rule` bars in memory; the current, still-forming bar is kept."""
+    daily = as_frame(daily)
+    try:
+        bars = daily.resample(rule).agg(OHLCV_AGG)
+    except ValueError:  # pandas < 2.2 only knows the old month-end alias.
+        bars = daily.resample(rule.replace("ME", "M")).agg(OHLCV_AGG)
+    return bars.dropna(subset=["Close"])
+
+def timeframe_signals(bars: pd.DataFrame, fast: int, slow: int) -> dict:
+    """Golden/death cross, price momentum, RSI and MACD on one timeframe, scored like the daily rule."""
+    if len(bars) < max(slow, MIN_MACD_BARS): return {"status": "insufficient", "bars": len(bars)}
+    df = bars.copy()
+    df.ta.sma(length=fast, append=True, col_names=("SMAF",))
+    df.ta.sma(length=slow, append=True, col_names=("SMAS",))
+    df.ta.rsi(length=14, append=True, col_names=("RSI14",))
+    df.ta.macd(append=True, col_names=("MACD", "MACDh", "MACDs"))
+    df.dropna(subset=["SMAF", "SMAS", "RSI14", "MACD", "MACDs"], inplace=True)
+    if df.empty: return {"status": "insufficient", "bars": len(bars)}
+
+    latest = df.iloc[-1]; rsi = float(latest["RSI14"])
+    golden_cross = bool(latest["SMAF"] > latest["SMAS"]); above_fast = bool(latest["Close"] > latest["SMAF"]); macd_bullish = bool(latest["MACD"] > latest["MACDs"])
+    score = (2 if golden_cross else -2) + (1 if above_fast else -1) + (1 if macd_bullish else -1)
+    if rsi < 30: score += 2
+    elif rsi > 70: score -= 2
+    bias = "Bullish" if score >= 2 else "Bearish" if score <= -2 else "Neutral"
+    return {"status": "success", "bars": len(bars), "as_of": df.index[-1].strftime("%Y-%m-%d"), "sma_fast": fast, "sma_slow": slow,
+            "golden_cross": golden_cross, "above_fast_sma": above_fast, "rsi": round(rsi, 1), "macd_bullish": macd_bullish, "score": score, "bias": bias}
+
+def compute_timeframes(daily, timeframes) -> dict:
+    """Signals for each requested timeframe, all derived from the one daily history."""
+    daily = as_frame(daily); results = {}
+    for name in timeframes:
+        rule, fast, slow, _ = TIMEFRAMES[name]
+        results[name] = timeframe_signals(daily if rule is None else resample_ohlcv(daily, rule), fast, slow)
+    return results
+
+def alignment(results: dict) -> dict:
+    """
+    Combines per-timeframe scores into one alignment score from -100 (all timeframes fully bearish)
+    to +100 (all fully bullish), weighted toward higher timeframes, plus how many timeframes agree.
+    """
+    scored = {name: r for name, r in results.items() if r.get("status") == "success"}
+    if not scored: return {"score": 0, "label": "Insufficient data", "agreeing": 0, "timeframes": 0}
+    weights = {name: TIMEFRAMES[name][3] for name in scored}
+    score = round(100 * sum(weights[n] * r["score"] for n, r in scored.items()) / (MAX_TIMEFRAME_SCORE * sum(weights.values())))
+    biases = [r["bias"] for r in scored.values()]
+    dominant = max(("Bullish", "Bearish", "Neutral"), key=biases.count); agreeing = biases.count(dominant)
+    if agreeing == len(biases) and dominant != "Neutral": label = f"Fully aligned {dominant.lower()}"
+    elif agreeing > len(biases) / 2 and dominant != "Neutral": label = f"Mostly {dominant.lower()}"
+    else: label = "Mixed signals"
+    return {"score": score, "label": label, "agreeing": agreeing, "timeframes": len(biases)}
@@ -0,0 +1,128 @@
+import os
+import re
+import logging
+import threading
+from functools import lru_cache
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+ROUTER_THRESHOLD = float(os.environ.get("FN_INTENT_THRESHOLD", 0.5))
+# Score a single intent needs before its confidence saturates at 1.0 (before the margin over other intents is applied).
+FULL_CONFIDENCE_SCORE = 3.0
+
+# intent -> [(synonym pattern, weight)]. Patterns must only use non-capturing groups; they are merged into one regex.
+INTENT_PATTERNS = {
+    "news": [
+        (r"\bnews\b|\bheadlines?\b", 3),
+        (r"\bwhat'?s happening\b|\bannounce\w*|\bpress release\b", 2),
+        (r"\blatest\b|\bupdates?\b|\btoday\b", 1),
+    ],
+    "fundamental": [
+        (r"\bfundamentals?\b", 3),
+        (r"\bp\s*/\s*[ebs]\b|\bpe ratio\b|\bpeg\b|\bprice to (?:earnings|book|sales)\b", 3),
+        (r"\bvaluation\b|\bover ?valued\b|\bunder ?valued\b|\bintrinsic\b|\bbook value\b", 2),
+        (r"\broe\b|\bdebt\b|\bmargins?\b|\bearnings\b|\bbalance sheet\b|\bprofitab\w*|\bmarket cap\w*", 2),
+        (r"\bpeers?\b|\bsector[- ](?:relative|average|median)\b|\bindustry (?:average|peers)\b|\bcompetitors?\b", 2),
+    ],
+    "technical": [
+        (r"\btechnical\w*|\brecommend\w*", 3),
+        (r"\brsi\b|\bmacd\b|\bsma\b|\bmoving averages?\b|\bbollinger\b|\bgolden cross\b|\bdeath cross\b", 3),
+        (r"\bbuy\b|\bsell\b|\bhold\b|\bentry\b|\bexit\b", 2),
+        (r"\bsupport\b|\bresistance\b|\bprice targets?\b|\btarget price\b", 2),
+        (r"\bhow'?s\b.*\bdoing\b|\bhow is\b.*\bdoing\b|\bperform\w*|\btrend\w*|\bmomentum\b|\bchart\w*", 2),
+        (r"\bpredict\w*|\bforecast\w*|\boutlook\b|\banaly[sz]\w*", 2),
+        (r"\bmulti[- ]?time ?frames?\b|\btime ?frames?\b|\bweekly\b|\bmonthly (?:chart|bars?|candles?|trend|close)\b|\bswing\b", 2),
+    ],
+    "full_report": [
+        (r"\b(?:full|complete|detailed|comprehensive) (?:report|analysis|picture|overview)\b|\bdeep dive\b|\bin[- ]depth\b|\beverything\b", 4),
+        (r"\breport\b|\boverview\b", 2),
+    ],
+    "compare": [
+        (r"\bcompar\w*|\bversus\b|\bvs\b\.?", 4),
+        (r"\bbetter\b|\bwhich (?:one|stock|is)\b|\bbetween\b", 2),
+    ],
+    "sip": [
+        (r"\bsip\b|\bsystematic investment\b|\bmutual funds?\b|\bmonthly invest\w*", 4),
+        (r"\bretirement\b|\bcorpus\b|\bchild'?s education\b|\bfinancial goal\b", 2),
+    ],
+}
+# Intents that need at least this many resolved tickers to be served without the agent.
+REQUIRED_TICKERS = {"news": 1, "fundamental": 1, "technical": 1, "full_report": 1, "compare": 2, "sip": 0}
+
+# A technical prompt that asks for higher-timeframe confirmation gets the multi-timeframe view instead of the daily one.
+MULTI_TIMEFRAME_PATTERN = re.compile(r"\bmulti[- ]?time ?frames?\b|\btime ?frames?\b|\bmtf\b|\bweekly\b|\bmonthly\b|\bswing\b|\bhigher time", re.IGNORECASE)
+
+def wants_multi_timeframe(prompt: str) -> bool:
+    return bool(MULTI_TIMEFRAME_PATTERN.search(prompt or ""))
+
+# Likewise, a fundamental prompt that mentions peers, sector or industry is scored against sector peers.
+PEER_PATTERN = re.compile(r"\bpeers?\b|\bsector\b|\bindustry\b|\bcompetitors?\b|\brelative\b|\bpercentile", re.IGNORECASE)
+
+def wants_peer_comparison(prompt: str) -> bool:
+    return bool(PEER_PATTERN.search(prompt or ""))
+
+class IntentMatch(NamedTuple):
+    intent: str
+    confidence: float
+    scores: dict
+
+class IntentRouter:
+    """
+    Keyword/synonym intent classifier. All synonym patterns are compiled into a single alternation
+    so a prompt is scanned once; each pattern contributes its weight to its intent at most once.
+    Confidence combines absolute evidence with the winner's share of the total score.
+    """
+    def __init__(self, patterns: dict = None, threshold: float = ROUTER_THRESHOLD):
+        self.threshold = threshold
+        self._groups = {}
+        alternatives = []
+        for intent, intent_patterns in (patterns or INTENT_PATTERNS).items():
+            for pattern, weight in intent_patterns:
+                name = f"g{len(alternatives)}"
+                self._groups[name] = (intent, weight)
+                alternatives.append(f"(?P<{name}>{pattern})")
+        self._regex = re.compile("|".join(alternatives), re.IGNORECASE)
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.fallbacks = 0
+
+    def classify(self, prompt: str, tickers: list = ()) -> IntentMatch:
+        scores, seen = {}, set()
+        for match in self._regex.finditer(prompt or ""):
+            if match.lastgroup in seen: continue
+            seen.add(match.lastgroup)
+            intent, weight = self._groups[match.lastgroup]
+            scores[intent] = scores.get(intent, 0) + weight
+        # Two or more named stocks and no other strong signal is almost always a comparison.
+        if len(tickers) >= 2 and "sip" not in scores: scores["compare"] = scores.get("compare", 0) + 2
+
+        if not scores: return IntentMatch(None, 0.0, scores)
+        intent = max(scores, key=scores.get)
+        if len(tickers) < REQUIRED_TICKERS[intent]: return IntentMatch(intent, 0.0, scores)
+        confidence = min(1.0, scores[intent] / FULL_CONFIDENCE_SCORE) * scores[intent] / sum(scores.values())
+        return IntentMatch(intent, round(confidence, 3), scores)
+
+    def route(self, prompt: str, tickers: list = ()) -> IntentMatch:
+        """Classifies a prompt and records whether it stays on the fast path (intent is None below the threshold)."""
+        match = self.classify(prompt, tickers)
+        routed = match.intent is not None and match.confidence >= self.threshold
+        with self._lock:
+            if routed: self.routed += 1
+            else: self.fallbacks += 1
+            total = self.routed + self.fallbacks
+            hit_rate = self.routed / total
+        logger.info("Intent router: %s (confidence %.2f) -> %s; hit rate %.1f%% over %d prompts",
+                    match.intent, match.confidence, "fast path" if routed else "agent", hit_rate * 100, total)
+        return match if routed else IntentMatch(None, match.confidence, match.scores)
+
+    @property
+    def hit_rate(self) -> float:
+        with self._lock:
+            total = self.routed + self.fallbacks
+            return self.routed / total if total else 0.0
+
+@lru_cache(maxsize=1)
+def get_intent_router() -> IntentRouter:
+    """Process-wide router, so the compiled automaton and the hit-rate counters are shared by all sessions."""
+    return IntentRouter()
@@ -0,0 +1,117 @@
+import os
+import time
+import logging
+import threading
+import pandas as pd
+import yfinance as yf
+from src.cache import TTLCache
+from src.singleflight import analysis_flight
+from src.history_store import load_history
+from src.indicators import live_state, live_signals
+from src.rate_limit import outbound, lane, BACKGROUND
+from src.snapshot_store import is_market_open
+
+logger = logging.getLogger(__name__)
+
+LIVE_POLL_SECONDS = float(os.environ.get("FN_LIVE_POLL_SECONDS", 15))           # Quote refresh while the market is open.
+LIVE_IDLE_POLL_SECONDS = float(os.environ.get("FN_LIVE_IDLE_POLL_SECONDS", 300))  # ...and while it is closed.
+WATCH_LEASE_SECONDS = float(os.environ.get("FN_LIVE_LEASE_SECONDS", 90))          # A symbol no session has renewed for this long stops being polled.
+QUOTE_BATCH = 100
+_live_states = TTLCache(ttl=6 * 3600, maxsize=2048)  # symbol -> indicator state from the daily history.
+
+class QuotePoller:
+    """
+    One process-wide poller for every symbol any session is watching. Sessions renew a lease per symbol;
+    each cycle fetches all leased symbols in one batched download, so Yahoo traffic grows with the number
+    of distinct symbols, never with the number of open sessions.
+    """
+    def __init__(self):
+        self._lock = threading.Lock(); self._wake = threading.Event()
+        self._leases = {}; self._quotes = {}; self._thread = None
+        self.cycles = 0; self.symbols_polled = 0
+
+    def watch(self, symbol: str, session_id: str):
+        """Renews `session_id`'s interest in `symbol`; starts the poller on first use."""
+        symbol = symbol.upper()
+        with self._lock:
+            new = symbol not in self._leases
+            self._leases.setdefault(symbol, {})[session_id] = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-quotes", daemon=True); self._thread.start()
+        if new: self._wake.set()  # Fetch a newly watched symbol now rather than at the next cycle.
+
+    def quote(self, symbol: str):
+        """Latest (price, timestamp) for a watched symbol, or None before its first fetch."""
+        with self._lock:
+            return self._quotes.get(symbol.upper())
+
+    def _active(self) -> list:
+        cutoff = time.monotonic() - WATCH_LEASE_SECONDS
+        with self._lock:
+            for symbol in list(self._leases):
+                sessions = {s: t for s, t in self._leases[symbol].items() if t >= cutoff}
+                if sessions: self._leases[symbol] = sessions
+                else: del self._leases[symbol]; self._quotes.pop(symbol, None)
+            return sorted(self._leases)
+
+    def _fetch(self, symbols: list) -> dict:
+        frames = outbound("yahoo", yf.download, symbols, period="1d", interval="1m", group_by="ticker", auto_adjust=True, threads=True, progress=False)
+        quotes = {}
+        for symbol in symbols:
+            try:
+                closes = (frames[symbol] if isinstance(frames.columns, pd.MultiIndex) else frames)["Close"].dropna()
+            except KeyError:
+                continue
+            if not closes.empty: quotes[symbol] = (float(closes.iloc[-1]), closes.index[-1])
+        return quotes
+
+    def _run(self):
+        with lane(BACKGROUND):  # Interactive analyses go ahead of quote refreshes for Yahoo capacity.
+            while True:
+                self._wake.clear()  # Before reading the leases, so a symbol watched during the fetch wakes the next wait.
+                symbols = self._active()
+                if symbols:
+                    for start in range(0, len(symbols), QUOTE_BATCH):
+                        try:
+                            quotes = self._fetch(symbols[start:start + QUOTE_BATCH])
+                        except Exception as e:
+                            logger.warning("Live quote refresh failed: %s", e); continue
+                        with self._lock: self._quotes.update(quotes)
+                    self.cycles += 1; self.symbols_polled += len(symbols)
+                self._wake.wait(LIVE_POLL_SECONDS if is_market_open() else LIVE_IDLE_POLL_SECONDS)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"watched_symbols": len(self._leases), "sessions": len({s for sessions in self._leases.values() for s in sessions}),
+                    "cycles": self.cycles, "symbols_polled": self.symbols_polled}
+
+_poller = QuotePoller()
+
+def get_quote_poller() -> QuotePoller:
+    return _poller
+
+def _build_state(symbol: str):
+    try:
+        state = live_state(load_history(symbol, years=2, period="2y"))
+    except Exception as e:
+        logger.warning("No live indicator state for %s: %s", symbol, e); return None
+    if state is not None: _live_states.set(symbol, state)
+    return state
+
+def _state_for(symbol: str):
+    state = _live_states.get(symbol)
+    return state if state is not None else analysis_flight.do(("live_state", symbol, ()), _build_state, symbol)
+
+def live_update(symbol: str, session_id: str):
+    """
+    Registers the session's interest and returns the live re-scored last bar for `symbol`, or None while
+    no quote has arrived yet. Everything here is served from process memory except the once-a-day history.
+    """
+    poller = get_quote_poller(); poller.watch(symbol, session_id)
+    quote = poller.quote(symbol)
+    if quote is None: return None
+    state = _state_for(symbol.upper())
+    if state is None: return None
+    price, at = quote
+    signals = live_signals(state, price, new_bar=at.strftime("%Y-%m-%d") > state["bar_date"])
+    return {**signals, "as_of": at.strftime("%H:%M"), "market_open": is_market_open()}
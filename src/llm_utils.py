@@ -3,43 +3,283 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_groq import ChatGroq
 from langchain_huggingface.chat_models import ChatHuggingFace # For chat models
 from langchain_cohere.chat_models import ChatCohere
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, AIMessageChunk, SystemMessage
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any
+from bisect import bisect_left
+from functools import lru_cache
+from contextlib import AsyncExitStack
 import streamlit as st
+from src.rate_limit import outbound_slot, RateLimitedError
+
+logger = logging.getLogger(__name__)
+
+# Providers tried after the session's own, when their keys are configured in the environment (e.g. "Groq,Gemini").
+FALLBACK_PROVIDERS = [p.strip() for p in os.environ.get("FN_LLM_FALLBACKS", "").split(",") if p.strip()]
+PROVIDER_KEY_ENV = {"Gemini": "GOOGLE_API_KEY", "OpenAI": "OPENAI_API_KEY", "Groq": "GROQ_API_KEY", "HuggingFace": "HUGGINGFACEHUB_API_TOKEN", "Cohere": "COHERE_API_KEY"}
+# Longest wait for a first token before a hedged request goes to the next provider.
+LATENCY_BUDGET = float(os.environ.get("FN_LLM_LATENCY_BUDGET", 4.0))
+MIN_HEDGE_DELAY = 0.25
+HEDGE_QUANTILE = 0.9
+MIN_HISTOGRAM_SAMPLES = 20
+STUB_RESPONSE = os.environ.get("FN_LLM_STUB_RESPONSE", "Final Answer: This is a response from the offline stub model.")
+
+class StubChatModel(BaseChatModel):
+    """Offline provider for tests and demos: streams a fixed reply word by word after a configurable first-token latency."""
+    response: str = STUB_RESPONSE
+    first_token_latency: float = 0.0
+    chunk_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.first_token_latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.first_token_latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_latency)
+        for i, word in enumerate(self.response.split(" ")):
+            if i: await asyncio.sleep(self.chunk_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+@lru_cache(maxsize=32)
+def _build_llm_client(provider: str, api_key: str):
+    """Builds a client once per (provider, key), so its HTTP connection pool is reused across reruns and sessions."""
+    if provider == "Stub":
+        # The stub's "API key" is its first-token latency in seconds, so hedging can be exercised offline.
+        return StubChatModel(first_token_latency=float(api_key or 0))
+    if provider == "Gemini":
+        # For Canvas, key might be provided automatically, but for local consistency, use the input.
+        return ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=api_key, temperature=0.7, convert_system_message_to_human=True)
+    elif provider == "OpenAI":
+        return ChatOpenAI(model="gpt-3.5-turbo", openai_api_key=api_key, temperature=0.7)
+    elif provider == "Groq":
+        return ChatGroq(model="llama3-8b-8192", groq_api_key=api_key, temperature=0.7) # Or other Groq models like "llama3-70b-8192"
+    elif provider == "HuggingFace":
+        # HuggingFace requires a specific endpoint and model.
+        # This is a generic example using a common HF chat model.
+        # You might need to adjust `model_id` for specific tasks.
+        # `HuggingFaceEndpoint` or `HuggingFacePipeline` might be needed for more complex cases.
+        # Using ChatHuggingFace which uses the HuggingFace Inference API with a specified model.
+        # Ensure the model_id corresponds to a chat-compatible model on HF Hub.
+        return ChatHuggingFace(
+            llm=None, # Not using direct LLM, but a model from HF Inference API
+            model_id="HuggingFaceH4/zephyr-7b-beta", # Example chat model, choose one that supports chat
+            huggingfacehub_api_token=api_key,
+            temperature=0.7
+        )
+    elif provider == "Cohere":
+        return ChatCohere(model="command-r", cohere_api_key=api_key, temperature=0.7) # Or 'command-r-plus'
+    raise ValueError(f"Unsupported LLM provider: {provider}")
+
+@lru_cache(maxsize=32)
+def _build_json_client(provider: str, api_key: str):
+    """The same model with the provider's native JSON output mode on; providers without one get the plain client."""
+    if provider == "Gemini":
+        return ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=api_key, temperature=0.7, convert_system_message_to_human=True,
+                                      response_mime_type="application/json")
+    if provider in ("OpenAI", "Groq"):
+        return _build_llm_client(provider, api_key).bind(response_format={"type": "json_object"})
+    return _build_llm_client(provider, api_key)
+
+class LatencyHistogram:
+    """Thread-safe latency histogram over log-spaced buckets (50 ms to ~2 min), cheap enough to update on every call."""
+    BOUNDS = tuple(0.05 * 1.25 ** i for i in range(36))
+
+    def __init__(self):
+        self._counts = [0] * (len(self.BOUNDS) + 1); self._lock = threading.Lock(); self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._counts[bisect_left(self.BOUNDS, seconds)] += 1; self.count += 1
+
+    def quantile(self, q: float):
+        """Upper bound of the bucket holding the q-quantile, or None before any sample."""
+        with self._lock:
+            if not self.count: return None
+            target, seen = q * self.count, 0
+            for i, n in enumerate(self._counts):
+                seen += n
+                if seen >= target: return self.BOUNDS[min(i, len(self.BOUNDS) - 1)]
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+def latency_histogram(provider: str, kind: str) -> LatencyHistogram:
+    """Process-wide histograms per (provider, "first_token" | "total"), so every router learns from every call."""
+    with _histograms_lock:
+        return _histograms.setdefault((provider, kind), LatencyHistogram())
+
+def llm_latency_stats() -> dict:
+    with _histograms_lock:
+        items = list(_histograms.items())
+    return {f"{provider}.{kind}": {"count": h.count, "p50": h.quantile(0.5), "p90": h.quantile(0.9), "p99": h.quantile(0.99)} for (provider, kind), h in items}
+
+def _label(provider: str, api_key: str) -> str:
+    return f"Stub:{api_key}" if provider == "Stub" else provider
+
+class LLMRouter:
+    """
+    Sends a request to the first provider and, if no first token arrives within its hedge delay, hedges to the next
+    one; the first stream to produce a token wins and the others are cancelled. A provider that fails outright is
+    failed over immediately. The hedge delay is the provider's observed p90 time-to-first-token, capped by the budget.
+    """
+    def __init__(self, providers: list, latency_budget: float = LATENCY_BUDGET):
+        self.providers = list(providers)
+        self.latency_budget = latency_budget
+
+    def hedge_delay(self, provider: str, api_key: str) -> float:
+        histogram = latency_histogram(_label(provider, api_key), "first_token")
+        if histogram.count < MIN_HISTOGRAM_SAMPLES: return self.latency_budget
+        return min(self.latency_budget, max(MIN_HEDGE_DELAY, histogram.quantile(HEDGE_QUANTILE)))
+
+    async def _first_chunk(self, provider: str, api_key: str, messages: list, stop, json_mode: bool):
+        started = time.perf_counter()
+        client = _build_json_client(provider, api_key) if json_mode else _build_llm_client(provider, api_key)
+        stream = client.astream(messages, stop=stop).__aiter__()
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = AIMessageChunk(content="")
+        latency_histogram(_label(provider, api_key), "first_token").record(time.perf_counter() - started)
+        return stream, first, started
+
+    async def _open(self, provider: str, api_key: str, messages: list, stop, json_mode: bool):
+        """Takes a provider slot and starts the stream; the slot is returned with it and held until the stream is closed."""
+        slot = AsyncExitStack()
+        await slot.enter_async_context(outbound_slot(f"llm_{provider.lower()}"))
+        try:
+            return (*await self._first_chunk(provider, api_key, messages, stop, json_mode), slot)
+        except BaseException as e:
+            await slot.__aexit__(type(e), e, e.__traceback__)  # Releases the slot; a throttle is re-raised as RateLimitedError.
+            raise
+
+    @staticmethod
+    async def _discard(stream, slot: AsyncExitStack):
+        try:
+            await stream.aclose()
+        finally:
+            await slot.aclose()
+
+    async def _race(self, messages: list, stop, json_mode: bool) -> tuple:
+        """Runs the hedged race; returns (provider, api_key, stream, first chunk, start time, provider slot) for the winner."""
+        candidates = list(self.providers); running = {}; errors = []; winner = None
+        loop = asyncio.get_running_loop()
+
+        def launch():
+            provider, api_key = candidates.pop(0)
+            # No retries here: the next provider is a faster remedy than backing off on this one.
+            task = asyncio.ensure_future(self._open(provider, api_key, messages, stop, json_mode))
+            running[task] = (provider, api_key, loop.time())
+
+        launch()
+        while running and winner is None:
+            newest = max(running.values(), key=lambda item: item[2])
+            timeout = max(0.0, newest[2] + self.hedge_delay(newest[0], newest[1]) - loop.time()) if candidates else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info("LLM router: no first token from %s within %.2fs, hedging to %s", newest[0], self.hedge_delay(newest[0], newest[1]), candidates[0][0])
+                launch(); continue
+            for task in done:
+                provider, api_key, _ = running.pop(task)
+                if task.exception() is None and winner is None: winner = (provider, api_key, *task.result())
+                elif task.exception() is None:  # A second stream started in the same tick: close it and free its slot.
+                    stream, _, _, slot = task.result(); await self._discard(stream, slot)
+                else:
+                    errors.append(f"{provider}: {task.exception()}"); logger.warning("LLM router: %s failed: %s", provider, task.exception())
+            if winner is None and not running and candidates: launch()
+        for loser in running: loser.cancel()
+        if winner is None: raise RateLimitedError("The AI providers are unavailable right now; please try again in a minute.") from None
+        return winner
+
+    async def astream(self, messages: list, stop=None, json_mode: bool = False):
+        """
+        Streams the winning provider's reply as AIMessageChunks; the first carries response_metadata["provider"].
+        With json_mode the provider's native JSON mode is used where it has one. Closing the stream early stops the provider.
+        """
+        provider, api_key, stream, first, started, slot = await self._race(messages, stop, json_mode)
+        async with slot:  # The provider slot is held until the stream is exhausted or closed, not just to the first token.
+            completed = False
+            try:
+                yield AIMessageChunk(content=first.content, response_metadata={"provider": provider})
+                async for chunk in stream: yield AIMessageChunk(content=chunk.content)
+                completed = True
+            finally:
+                if completed: latency_histogram(_label(provider, api_key), "total").record(time.perf_counter() - started)
+                else: await stream.aclose()
+
+    async def ainvoke(self, messages: list, stop=None, json_mode: bool = False) -> AIMessage:
+        chunks = [chunk async for chunk in self.astream(messages, stop, json_mode)]
+        return AIMessage(content="".join(str(chunk.content) for chunk in chunks), response_metadata=chunks[0].response_metadata)
+
+class RoutedChatModel(BaseChatModel):
+    """LangChain chat model backed by an LLMRouter, so the ReAct agent gets hedging and failover transparently."""
+    router: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return asyncio.run(self._agenerate(messages, stop=stop))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=await self.router.ainvoke(messages, stop=stop))])
+
+def provider_chain(provider: str, api_key: str) -> tuple:
+    """The session's provider first, then each FN_LLM_FALLBACKS provider whose key is set in the environment."""
+    chain = [(provider, api_key)]
+    for fallback in FALLBACK_PROVIDERS:
+        key = "0" if fallback == "Stub" else os.environ.get(PROVIDER_KEY_ENV.get(fallback, ""), "")
+        if fallback != provider and key: chain.append((fallback, key))
+    return tuple(chain)
+
+def buildable_chain(provider: str, api_key: str) -> tuple:
+    """
+    provider_chain with the session's provider built strictly (its errors propagate) and any fallback
+    that fails to build logged and dropped, so a misconfigured fallback never takes the primary down.
+    """
+    chain = provider_chain(provider, api_key)
+    _build_llm_client(provider, api_key)
+    usable = [chain[0]]
+    for name, key in chain[1:]:
+        try:
+            _build_llm_client(name, key); usable.append((name, key))
+        except Exception as e:
+            logger.warning("Dropping fallback LLM provider %s: %s", name, e)
+    return tuple(usable)
+
+@lru_cache(maxsize=32)
+def get_llm_router(provider: str, api_key: str) -> LLMRouter:
+    return LLMRouter(buildable_chain(provider, api_key))
 
 def get_llm_client(provider: str, api_key: str):
     """
-    Initializes and returns a LangChain LLM client based on the provider.
+    Initializes and returns a LangChain chat model for the provider, routed with hedging/failover to any fallbacks.
+    Call it from the Streamlit script thread: errors are reported with st.error.
     """
     if not api_key:
         st.error(f"API key for {provider} is missing. Please provide it on the login page.")
         return None
 
     try:
-        if provider == "Gemini":
-            # For Canvas, key might be provided automatically, but for local consistency, use the input.
-            return ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=api_key, temperature=0.7, convert_system_message_to_human=True)
-        elif provider == "OpenAI":
-            return ChatOpenAI(model="gpt-3.5-turbo", openai_api_key=api_key, temperature=0.7)
-        elif provider == "Groq":
-            return ChatGroq(model="llama3-8b-8192", groq_api_key=api_key, temperature=0.7) # Or other Groq models like "llama3-70b-8192"
-        elif provider == "HuggingFace":
-            # HuggingFace requires a specific endpoint and model.
-            # This is a generic example using a common HF chat model.
-            # You might need to adjust `model_id` for specific tasks.
-            # `HuggingFaceEndpoint` or `HuggingFacePipeline` might be needed for more complex cases.
-            # Using ChatHuggingFace which uses the HuggingFace Inference API with a specified model.
-            # Ensure the model_id corresponds to a chat-compatible model on HF Hub.
-            return ChatHuggingFace(
-                llm=None, # Not using direct LLM, but a model from HF Inference API
-                model_id="HuggingFaceH4/zephyr-7b-beta", # Example chat model, choose one that supports chat
-                huggingfacehub_api_token=api_key,
-                temperature=0.7
-            )
-        elif provider == "Cohere":
-            return ChatCohere(model="command-r", cohere_api_key=api_key, temperature=0.7) # Or 'command-r-plus'
-        else:
-            st.error(f"Unsupported LLM provider: {provider}")
-            return None
+        _build_llm_client(provider, api_key)  # Fail fast on a bad primary; fallbacks that fail to build are dropped by the router.
+        return RoutedChatModel(router=get_llm_router(provider, api_key))
+    except ValueError:
+        st.error(f"Unsupported LLM provider: {provider}")
+        return None
     except Exception as e:
         st.error(f"Error initializing {provider} LLM: {e}")
         return None
@@ -62,29 +302,17 @@ def format_messages_for_langchain(chat_history: list) -> list[BaseMessage]:
 async def call_llm_api_direct(prompt: str, chat_history: list, provider: str, api_key: str, is_json_response: bool = False, response_schema: dict = None):
     """
     Directly calls an LLM via LangChain client. Used for non-agentic flows (like SIP).
+    Runs on the shared background event loop, so failures are logged and reported as None rather than via st.error.
     """
-    llm = get_llm_client(provider, api_key)
-    if not llm:
-        return None
-
+    router = get_llm_router(provider, api_key)
     messages = format_messages_for_langchain(chat_history)
     messages.append(HumanMessage(content=prompt))
 
     try:
-        # For JSON responses, we primarily rely on prompt engineering for most models
-        # and on specific features if the LLM/LangChain integration supports it.
-        if is_json_response and provider == "Gemini":
-            # Gemini-specific way to request JSON output if schema is provided
-            # This requires a model that supports structured responses.
-            # The ChatGoogleGenerativeAI class doesn't directly expose response_schema
-            # in its invoke, so prompt engineering is usually relied upon.
-            # A more robust solution might use `with_structured_output` if available and model supports.
-            # For simplicity, we'll continue with prompt engineering for JSON and manual parsing.
-            pass
-
-        response = await llm.ainvoke(messages)
+        # JSON responses use the provider's native JSON mode where it has one; validation is the caller's job
+        # (see src/structured_output.py for streamed validation with a repair call).
+        response = await router.ainvoke(messages, json_mode=is_json_response)
         return response.content
     except Exception as e:
-        st.error(f"Error calling LLM directly: {e}")
+        logger.error("Error calling LLM directly: %s", e)
         return None
-
@@ -0,0 +1,106 @@
+import os
+import time
+import contextvars
+import logging
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from langchain.tools import tool
+from src.cache import TTLCache
+from src.singleflight import analysis_flight
+from src.symbol_master import get_symbol_master
+from src.tools import compute_fundamental, StockSymbolInput
+from src.rendering import fundamental_card
+from src.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+# Sector distributions change slowly, so they are rebuilt at most once a day per (sector, market).
+SECTOR_CACHE_TTL = float(os.environ.get("FN_SECTOR_CACHE_TTL", 24 * 3600))
+PEER_WORKERS = int(os.environ.get("FN_PEER_WORKERS", 8))
+MAX_PEERS = int(os.environ.get("FN_MAX_PEERS", 40))
+MIN_PEERS = 5  # Fewer usable values than this and a metric is not scored against peers.
+_sector_cache = TTLCache(ttl=SECTOR_CACHE_TTL, maxsize=256)
+_peer_pool = ThreadPoolExecutor(max_workers=PEER_WORKERS, thread_name_prefix="peer-fetch")
+
+# metric key in the fundamental result -> (label, lower is better, formatter)
+PEER_METRICS = {
+    "pe": ("P/E", True, "{:.2f}"),
+    "pb": ("P/B", True, "{:.2f}"),
+    "ps": ("P/S", True, "{:.2f}"),
+    "roe": ("ROE", False, "{:.2%}"),
+    "debt_to_equity": ("D/E", True, "{:.2f}"),
+    "profit_margins": ("Profit Margin", False, "{:.2%}"),
+}
+
+def _usable(metric: str, value) -> bool:
+    # A negative P/E (loss-making company) has no meaningful rank against profitable peers.
+    return isinstance(value, (int, float)) and value == value and not (metric == "pe" and value <= 0)
+
+def _build_distribution(sector: str, indian: bool) -> dict:
+    master = get_symbol_master()
+    peers = master.peers(sector, indian)
+    if len(peers) < MIN_PEERS: peers = master.peers(sector)  # Thin local sector: pool both markets.
+    peers = peers[:MAX_PEERS]
+    results = [f.result() for f in [_peer_pool.submit(contextvars.copy_context().run, compute_fundamental, peer, with_trends=False) for peer in peers]]
+    values = {metric: sorted(r["metrics"][metric] for r in results if r["status"] == "success" and _usable(metric, r["metrics"].get(metric)))
+              for metric in PEER_METRICS}
+    fetched = sum(r["status"] == "success" for r in results)
+    logger.info("Built %s peer distribution from %d/%d peers", sector, fetched, len(peers))
+    distribution = {"sector": sector, "peers": fetched, "values": values}
+    if fetched: _sector_cache.set((sector, indian), distribution)
+    return distribution
+
+def sector_distribution(sector: str, indian: bool) -> dict:
+    """Sorted peer values per metric for a sector, fetched concurrently with a bounded pool and cached daily."""
+    cached = _sector_cache.get((sector, indian))
+    if cached is not None: return cached
+    return analysis_flight.do(("sector", sector, (indian,)), _build_distribution, sector, indian)
+
+def percentile(value: float, values: list) -> float:
+    """Mid-rank percentile of `value` within sorted `values` (0-100)."""
+    return 100 * (bisect_left(values, value) + bisect_right(values, value)) / 2 / len(values)
+
+def _ordinal(n: int) -> str:
+    return f"{n}{'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')}"
+
+def compute_peer_relative(symbol: str) -> dict:
+    """
+    Fundamental analysis scored against sector peers instead of absolute cutoffs. Each metric is placed in the
+    peer distribution; the top third (by favourability) adds a point, the bottom third costs one.
+    """
+    base = compute_fundamental(symbol)
+    if base["status"] != "success": return base
+    sector = base.get("sector")
+    if not sector: return {"status": "error", "message": f"No sector is known for {symbol}, so it cannot be compared with peers."}
+    # base["symbol"] is the resolved listing, so a bare "TCS" or "Infosys" is compared with Indian peers.
+    distribution = sector_distribution(sector, base["symbol"].upper().endswith((".NS", ".BO")))
+
+    percentiles, positive_points, caution_points, score, favourable_total = {}, [], [], 0, 0.0
+    for metric, (label, lower_is_better, fmt) in PEER_METRICS.items():
+        value = base["metrics"].get(metric); values = distribution["values"].get(metric, [])
+        if not _usable(metric, value) or len(values) < MIN_PEERS: continue
+        pct = percentile(value, values); favourable = 100 - pct if lower_is_better else pct
+        percentiles[metric] = {"value": value, "percentile": round(pct, 1), "favourable": round(favourable, 1), "peers": len(values)}
+        favourable_total += favourable
+        point = f"• **{label} of {fmt.format(value)}** is in the {_ordinal(round(pct))} percentile of {len(values)} {sector} peers."
+        if favourable >= 200 / 3: positive_points.append(point); score += 1
+        elif favourable <= 100 / 3: caution_points.append(point); score -= 1
+    if not percentiles: return {"status": "error", "message": f"Not enough {sector} peer data to compare {symbol}."}
+
+    average = favourable_total / len(percentiles)
+    if average >= 70: final_verdict = "Very Strong"
+    elif average >= 55: final_verdict = "Strong"
+    elif average >= 40: final_verdict = "Average"
+    else: final_verdict = "Weak"
+    if not positive_points: positive_points.append("• No metric ranks in the top third of its peers.")
+    if not caution_points: caution_points.append("• No metric ranks in the bottom third of its peers.")
+    return {**base, "mode": "peer_relative", "peers": distribution["peers"], "percentiles": percentiles, "favourable_average": round(average, 1),
+            "positive_points": positive_points, "caution_points": caution_points, "score": score, "verdict": final_verdict,
+            "computed_at": time.time()}  # Its own stamp: the card differs from the base result's.
+
+@tool("get_peer_relative_fundamentals", args_schema=StockSymbolInput)
+@profiled
+def get_peer_relative_fundamentals(symbol: str) -> str:
+    """Use this tool when the user asks how a company's valuation, profitability or debt compares with its sector peers or industry."""
+    result = compute_peer_relative(symbol)
+    return fundamental_card(result) if result["status"] == "success" else result["message"]
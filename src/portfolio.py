@@ -0,0 +1,154 @@
+import os
+import io
+import contextvars
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from src.symbol_master import get_symbol_master, resolve_symbol, is_valid_symbol
+from src.history_store import prefetch_histories, cached_history
+from src.indicators import score_frame, score_distribution
+from src.tools import compute_fundamental
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+MAX_POSITIONS = int(os.environ.get("FN_PORTFOLIO_MAX_POSITIONS", 500))
+# Fundamentals need one Yahoo round trip per symbol, so only the largest holdings are covered interactively.
+FUNDAMENTAL_TOP_N = int(os.environ.get("FN_PORTFOLIO_FUNDAMENTAL_TOP", 20))
+MIN_RETURNS = 60  # Positions with less aligned history than this are left out of the risk model.
+SCORE_LOOKBACK = 300  # Daily bars scored per position: the 200-day warm-up plus a margin.
+SYMBOL_COLUMNS = ("symbol", "ticker", "stock")
+QUANTITY_COLUMNS = ("quantity", "qty", "shares", "units")
+FX_SYMBOL = "USDINR=X"  # Listings without an Indian suffix are taken to be USD-priced.
+_fundamental_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="portfolio-fundamentals")
+
+def parse_holdings(data) -> pd.DataFrame:
+    """
+    Reads a holdings CSV (path, bytes or file-like) with a symbol column and a quantity column
+    (`symbol`/`ticker`, `quantity`/`qty`/`shares`). Names are resolved through the symbol master;
+    duplicate lines are summed. Raises ValueError on unusable files.
+    """
+    frame = pd.read_csv(io.BytesIO(data) if isinstance(data, bytes) else data)
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    symbol_col = next((c for c in SYMBOL_COLUMNS if c in frame.columns), None)
+    quantity_col = next((c for c in QUANTITY_COLUMNS if c in frame.columns), None)
+    if symbol_col is None or quantity_col is None:
+        raise ValueError("The CSV needs a 'symbol' column and a 'quantity' (or 'shares') column.")
+    holdings = pd.DataFrame({"input": frame[symbol_col].astype(str).str.strip(), "quantity": pd.to_numeric(frame[quantity_col], errors="coerce")})
+    holdings["symbol"] = [resolve_symbol(s) or s.upper() for s in holdings["input"]]
+    holdings = holdings[(holdings["quantity"] > 0) & holdings["symbol"].map(is_valid_symbol)]
+    if holdings.empty: raise ValueError("No valid holdings found in the file.")
+    holdings = holdings.groupby("symbol", sort=False, as_index=False)["quantity"].sum()
+    if len(holdings) > MAX_POSITIONS: raise ValueError(f"Portfolios are limited to {MAX_POSITIONS} positions.")
+    return holdings
+
+def history_period(years: int) -> str:
+    """Yahoo download window for a `years` risk lookback, with a year of margin for the 200-day score warm-up."""
+    return f"{years + 1}y"
+
+def is_indian(symbol: str) -> bool:
+    return symbol.endswith((".NS", ".BO"))
+
+def is_mixed_currency(symbols: list) -> bool:
+    return len({is_indian(s) for s in symbols}) > 1
+
+def price_matrix(symbols: list, years: int = 1) -> pd.DataFrame:
+    """
+    Aligned daily closes (dates x symbols) from one bulk download of whatever the history cache is missing.
+    A mixed Indian/US portfolio also downloads USDINR in that batch: US closes are converted at each day's rate
+    and the rate itself is kept as the FX_SYMBOL column. Without a rate the US listings are left out, unpriced.
+    """
+    period = history_period(years)
+    mixed = is_mixed_currency(symbols)
+    available = prefetch_histories(symbols + [FX_SYMBOL] if mixed else symbols, period=period)
+    closes = {symbol: cached_history(symbol, float("inf"), period)["Close"] for symbol in available}
+    if mixed and FX_SYMBOL not in closes:
+        logger.warning("No %s history; leaving US listings out of the portfolio", FX_SYMBOL)
+        closes = {symbol: close for symbol, close in closes.items() if is_indian(symbol)}
+    if not closes: return pd.DataFrame()
+    prices = pd.concat(closes, axis=1).sort_index().astype(np.float64)  # Histories hold float32; risk math runs in float64.
+    prices = prices.ffill()  # Carry prices (and the rate) across holidays that differ between listings and the FX market.
+    if FX_SYMBOL in prices:
+        foreign = [s for s in prices.columns if s != FX_SYMBOL and not is_indian(s)]
+        prices[foreign] = prices[foreign].mul(prices[FX_SYMBOL], axis=0)
+    return prices[prices.index >= prices.index[-1] - pd.DateOffset(years=years)]
+
+def _risk(returns: np.ndarray, weights: np.ndarray, confidence: float) -> dict:
+    """Covariance, volatility, historical VaR/CVaR and drawdown for a (days x positions) return matrix."""
+    cov = np.atleast_2d(np.cov(returns, rowvar=False)) * TRADING_DAYS
+    variance = float(weights @ cov @ weights)
+    portfolio = returns @ weights
+    var = -float(np.quantile(portfolio, 1 - confidence))
+    tail = portfolio[portfolio <= -var]
+    equity = np.cumprod(1 + portfolio); drawdown = equity / np.maximum.accumulate(equity) - 1
+    return {"covariance": cov, "volatility": float(np.sqrt(variance)), "var": var, "cvar": -float(tail.mean()) if len(tail) else var,
+            "max_drawdown": float(drawdown.min()), "current_drawdown": float(drawdown[-1]), "period_return": float(equity[-1] - 1),
+            "risk_contribution": weights * (cov @ weights) / variance if variance > 0 else np.zeros_like(weights)}
+
+def _technical_scores(symbols: list, period: str) -> dict:
+    scores = {}
+    for symbol in symbols:
+        hist = cached_history(symbol, float("inf"), period)
+        scored = score_frame(hist.tail(SCORE_LOOKBACK)) if hist is not None else None
+        scores[symbol] = int(scored["score"].iloc[-1]) if scored is not None and not scored.empty else None
+    return scores
+
+def analyze_portfolio(holdings: pd.DataFrame, years: int = 1, confidence: float = 0.95) -> dict:
+    """
+    Weights, sector exposure, weighted technical/fundamental scores and return-based risk for a holdings frame.
+    All risk figures come from one aligned return matrix; daily VaR/CVaR are historical (no distribution assumed).
+    Mixed Indian/US portfolios are valued and modelled in INR.
+    """
+    prices = price_matrix(holdings["symbol"].tolist(), years)
+    if prices.empty: return {"status": "error", "message": "No price history found for any holding."}
+    requested = holdings["symbol"].tolist()
+    fx_rate = float(prices[FX_SYMBOL].iloc[-1]) if FX_SYMBOL in prices else None
+    holdings = holdings[holdings["symbol"].isin(prices.columns)].copy()
+    holdings["price"] = holdings["symbol"].map(prices.iloc[-1])
+    holdings = holdings.dropna(subset=["price"])
+    holdings["value"] = holdings["quantity"] * holdings["price"]
+    total_value = float(holdings["value"].sum())
+    holdings["weight"] = holdings["value"] / total_value
+    master = get_symbol_master()
+    holdings["sector"] = [master.sector_of(s) or "Unclassified" for s in holdings["symbol"]]
+    holdings = holdings.sort_values("weight", ascending=False).reset_index(drop=True)
+
+    # Risk model: positions with enough overlapping history, weights renormalised over them.
+    returns = prices[holdings["symbol"]].pct_change(fill_method=None).iloc[1:]
+    modelled = [s for s in holdings["symbol"] if returns[s].notna().sum() >= MIN_RETURNS]
+    risk = None
+    if modelled:
+        aligned = returns[modelled].dropna()
+        weights = holdings.set_index("symbol").loc[modelled, "weight"].to_numpy(); weights = weights / weights.sum()
+        if len(aligned) >= MIN_RETURNS:
+            risk = _risk(aligned.to_numpy(), weights, confidence)
+            risk["observations"] = len(aligned)
+            risk["covered_weight"] = float(holdings.set_index("symbol").loc[modelled, "weight"].sum())
+            contribution = dict(zip(modelled, risk.pop("risk_contribution")))
+            holdings["risk_contribution"] = holdings["symbol"].map(contribution)
+            risk["correlation"] = aligned.corr()
+            risk["covariance"] = pd.DataFrame(risk["covariance"], index=modelled, columns=modelled)
+
+    holdings["technical_score"] = holdings["symbol"].map(_technical_scores(holdings["symbol"].tolist(), history_period(years)))
+    top = holdings["symbol"].head(FUNDAMENTAL_TOP_N).tolist()
+    futures = [_fundamental_pool.submit(contextvars.copy_context().run, compute_fundamental, symbol, with_trends=False) for symbol in top]
+    fundamentals = dict(zip(top, (future.result() for future in futures)))
+    holdings["fundamental_score"] = holdings["symbol"].map(lambda s: fundamentals[s]["score"] if s in fundamentals and fundamentals[s]["status"] == "success" else None)
+
+    def weighted(column: str):
+        scored = holdings.dropna(subset=[column])
+        return (float((scored[column] * scored["weight"]).sum() / scored["weight"].sum()), float(scored["weight"].sum())) if not scored.empty else (None, 0.0)
+
+    technical_score, technical_weight = weighted("technical_score")
+    fundamental_score, fundamental_weight = weighted("fundamental_score")
+    return {
+        "status": "success", "total_value": total_value, "positions": len(holdings), "as_of": prices.index[-1].strftime("%Y-%m-%d"),
+        "unpriced": [s for s in requested if s not in set(holdings["symbol"])],
+        "mixed_currency": is_mixed_currency(requested), "fx_rate": fx_rate,
+        "holdings": holdings, "sectors": holdings.groupby("sector")["weight"].sum().sort_values(ascending=False),
+        "technical": {"score": technical_score, "covered_weight": technical_weight,
+                      "recommendation_percent": score_distribution(round(technical_score)) if technical_score is not None else None},
+        "fundamental": {"score": fundamental_score, "covered_weight": fundamental_weight},
+        "risk": risk, "confidence": confidence,
+    }
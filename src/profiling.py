@@ -0,0 +1,121 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import itertools
+import functools
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from src.storage import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# FN_PROFILE="rerun", "tools" or "all" (comma-separated). Off by default; nothing below runs unless it is enabled.
+PROFILE_MODES = {mode.strip() for mode in os.environ.get("FN_PROFILE", "").lower().split(",") if mode.strip()}
+if "all" in PROFILE_MODES: PROFILE_MODES |= {"rerun", "tools"}
+ALLOW_QUERY = os.environ.get("FN_PROFILE_ALLOW_QUERY") == "1"  # Lets `?profile=1` profile a single rerun; keep off on public deployments.
+SAMPLE_INTERVAL = float(os.environ.get("FN_PROFILE_INTERVAL", 0.005))
+TOP_N = int(os.environ.get("FN_PROFILE_TOP", 25))
+PROFILE_DIR = os.environ.get("FN_PROFILE_DIR") or os.path.join(DATA_DIR, "profiles")
+# Leaf frames of a parked thread; other threads in this state are skipped so the flamegraph shows only real work.
+IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"), ("threading.py", "_wait_for_tstate_lock")}
+_sequence = itertools.count()
+
+class StackSampler:
+    """
+    Stdlib sampling profiler: a daemon thread snapshots Python stacks every `interval` seconds via sys._current_frames().
+    The target thread is always recorded (time it spends waiting on pools or the LLM loop is part of the story);
+    other threads, when included, only while they are doing work.
+    """
+    def __init__(self, target: int, all_threads: bool = False, interval: float = SAMPLE_INTERVAL):
+        self.target, self.all_threads, self.interval = target, all_threads, interval
+        self.frames = {}; self.samples = defaultdict(list)
+        self._stop = threading.Event(); self._thread = threading.Thread(target=self._run, name="fn-profiler", daemon=True)
+
+    def _frame_id(self, frame) -> int:
+        code = frame.f_code; key = (code.co_name, code.co_filename, code.co_firstlineno)
+        return self.frames.setdefault(key, len(self.frames))
+
+    def _stack(self, frame) -> tuple:
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_id(frame)); frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def _run(self):
+        own, last = threading.get_ident(), time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter(); weight = now - last; last = now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (thread_id != self.target and not self.all_threads): continue
+                if thread_id != self.target and (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES: continue
+                self.samples[thread_id].append((self._stack(frame), weight))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set(); self._thread.join()
+
+def _speedscope(label: str, sampler: StackSampler, duration: float) -> dict:
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    frames = [{"name": name, "file": file, "line": line} for (name, file, line) in sampler.frames]
+    profiles = [{"type": "sampled", "name": f"{names.get(thread_id, thread_id)}" + (" (profiled)" if thread_id == sampler.target else ""),
+                 "unit": "seconds", "startValue": 0, "endValue": duration,
+                 "samples": [list(stack) for stack, _ in samples], "weights": [weight for _, weight in samples]}
+                for thread_id, samples in sorted(sampler.samples.items(), key=lambda item: item[0] != sampler.target)]
+    return {"$schema": "https://www.speedscope.app/file-format-schema.json", "name": label, "exporter": "financial-navigator",
+            "activeProfileIndex": 0, "shared": {"frames": frames}, "profiles": profiles}
+
+def hot_functions(sampler: StackSampler, top: int = TOP_N) -> list:
+    """(function, self seconds, total seconds) for the target thread, hottest self time first."""
+    own, total = defaultdict(float), defaultdict(float)
+    for stack, weight in sampler.samples.get(sampler.target, []):
+        if not stack: continue
+        own[stack[-1]] += weight
+        for frame_id in set(stack): total[frame_id] += weight
+    keys = list(sampler.frames)
+    rows = [(f"{keys[i][0]} ({os.path.relpath(keys[i][1]) if not keys[i][1].startswith('<') else keys[i][1]}:{keys[i][2]})", own[i], total[i]) for i in total]
+    return sorted(rows, key=lambda row: (row[1], row[2]), reverse=True)[:top]
+
+def _write(label: str, sampler: StackSampler, duration: float):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', label)}-{os.getpid()}-{next(_sequence)}")
+    with open(stem + ".speedscope.json", "w", encoding="utf-8") as f: json.dump(_speedscope(label, sampler, duration), f)
+    rows = hot_functions(sampler)
+    with open(stem + ".txt", "w", encoding="utf-8") as f:
+        f.write(f"{label}: {duration:.3f}s wall, {len(sampler.samples.get(sampler.target, []))} samples every {sampler.interval * 1000:.0f}ms\n\n")
+        f.write(f"{'self s':>8}{'total s':>9}  function\n")
+        for name, own, total in rows: f.write(f"{own:8.3f}{total:9.3f}  {name}\n")
+    logger.info("Profiled %s in %.3fs -> %s.speedscope.json (hottest: %s)", label, duration, stem, ", ".join(name for name, _, _ in rows[:3]))
+
+@contextmanager
+def profile(label: str, all_threads: bool = False):
+    """Samples the enclosed block and writes a speedscope flamegraph and a top-N hot function summary to PROFILE_DIR."""
+    sampler = StackSampler(threading.get_ident(), all_threads); started = time.perf_counter()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        try:
+            _write(label, sampler, time.perf_counter() - started)
+        except Exception as e:
+            logger.warning("Could not write the %s profile: %s", label, e)
+
+def rerun_profiling_enabled(query_value=None) -> bool:
+    """True when this rerun should be profiled: FN_PROFILE includes "rerun", or `?profile=` is set and allowed."""
+    return "rerun" in PROFILE_MODES or (ALLOW_QUERY and query_value is not None)
+
+def profiled(fn):
+    """Profiles every call of `fn` when FN_PROFILE includes "tools"; otherwise returns `fn` itself, so disabled costs nothing."""
+    if "tools" not in PROFILE_MODES: return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with profile(f"tool-{fn.__name__}"):
+            return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,239 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes: a waiting interactive request is always granted before any waiting background one.
+INTERACTIVE, BACKGROUND = 0, 1
+LANE_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+_default_lane = INTERACTIVE
+_lane = contextvars.ContextVar("outbound_lane", default=None)
+
+# provider -> (requests per second, burst, max concurrent requests); override with FN_RATE_<PROVIDER>="rate,burst,concurrency".
+PROVIDER_LIMITS = {
+    "yahoo": (4.0, 10, 8),
+    "google_news": (1.0, 3, 2),
+    "news_sites": (2.0, 4, 4),
+    "llm": (2.0, 4, 4),
+}
+PROVIDER_LABELS = {"yahoo": "Yahoo Finance", "google_news": "Google News", "news_sites": "The news site", "llm": "The AI provider"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = int(os.environ.get("FN_OUTBOUND_RETRIES", 4))
+BACKOFF_BASE = float(os.environ.get("FN_OUTBOUND_BACKOFF_BASE", 0.5))
+BACKOFF_CAP = float(os.environ.get("FN_OUTBOUND_BACKOFF_CAP", 20))
+
+class RateLimitedError(Exception):
+    """Raised when a provider keeps throttling or failing after every retry; the message is safe to show users."""
+
+def set_default_lane(lane: int):
+    """Process-wide lane for work with no explicit lane, e.g. BACKGROUND for the precompute job."""
+    global _default_lane
+    _default_lane = lane
+
+def current_lane() -> int:
+    lane = _lane.get()
+    return _default_lane if lane is None else lane
+
+@contextmanager
+def lane(value: int):
+    """Runs the enclosed outbound calls in the given priority lane (propagates to asyncio.to_thread and copied contexts)."""
+    token = _lane.set(value)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+class ProviderLimiter:
+    """
+    Token bucket plus concurrency cap for one provider, with waiters served strictly by (lane, arrival).
+    A throttled response pauses the whole provider, so concurrent callers back off together.
+    """
+    def __init__(self, name: str, rate: float, burst: int, concurrency: int):
+        self.name, self.rate, self.burst, self.concurrency = name, rate, burst, concurrency
+        self._cond = threading.Condition()
+        self._tokens, self._updated = float(burst), time.monotonic()
+        self._in_flight = 0; self._paused_until = 0.0
+        self._waiting = []; self._seq = itertools.count(); self._async_waiters = set()
+        self._waits = {lane: deque(maxlen=1000) for lane in LANE_NAMES}
+        self.granted = 0; self.retries = 0; self.throttled = 0; self.failures = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate); self._updated = now
+
+    def _grant(self, ticket: tuple) -> tuple:
+        """Under the lock: (True, None) once `ticket` got a slot and a token, else (False, seconds to wait or None for a notify)."""
+        now = time.monotonic(); self._refill(now)
+        at_head = self._waiting[0] == ticket; has_slot = self._in_flight < self.concurrency
+        if at_head and has_slot and self._tokens >= 1 and now >= self._paused_until:
+            heapq.heappop(self._waiting); self._tokens -= 1; self._in_flight += 1; self.granted += 1
+            return True, None
+        # Only the head needs a timed wake-up (next token or end of pause); everyone else waits for a notify.
+        return False, max((1 - self._tokens) / self.rate, self._paused_until - now, 0.001) if at_head and has_slot else None
+
+    def _notify(self):
+        self._cond.notify_all()
+        for loop, wake in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:  # The waiter's loop has closed; its ticket is dropped when it unwinds.
+                pass
+
+    def _drop(self, ticket: tuple):
+        if ticket in self._waiting: self._waiting.remove(ticket); heapq.heapify(self._waiting)  # Don't leave a dead ticket blocking the queue.
+
+    def acquire(self, lane: int):
+        ticket = (lane, next(self._seq)); started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    granted, timeout = self._grant(ticket)
+                    if granted: break
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._drop(ticket); raise
+            finally:
+                self._notify()  # The next ticket is now at the head.
+            self._waits[lane].append(time.monotonic() - started)
+
+    async def acquire_async(self, lane: int):
+        """
+        acquire() for coroutines. Queued callers wait on an asyncio event the limiter sets, so no executor thread is held
+        while waiting (LangChain runs sync tools on the loop's default executor, which queued LLM calls must not starve).
+        """
+        ticket = (lane, next(self._seq)); started = time.monotonic()
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            heapq.heappush(self._waiting, ticket); self._async_waiters.add(waiter)
+        try:
+            while True:
+                waiter[1].clear()  # Before checking, so a notify that lands after the check is not lost.
+                with self._cond:
+                    granted, timeout = self._grant(ticket)
+                if granted: break
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond: self._drop(ticket)
+            raise
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter); self._notify()
+        self._waits[lane].append(time.monotonic() - started)
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1; self._notify()
+
+    def pause(self, seconds: float):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds); self.throttled += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = {LANE_NAMES[lane]: sum(1 for waiting_lane, _ in self._waiting if waiting_lane == lane) for lane in LANE_NAMES}
+            waits = {LANE_NAMES[lane]: sorted(samples) for lane, samples in self._waits.items()}
+            return {"queue_depth": depth, "in_flight": self._in_flight, "granted": self.granted, "retries": self.retries,
+                    "throttled": self.throttled, "failures": self.failures,
+                    "wait_seconds": {name: {"p50": round(w[len(w) // 2], 3), "p95": round(w[int(len(w) * 0.95)], 3), "max": round(w[-1], 3)} if w else None
+                                     for name, w in waits.items()}}
+
+def _limits(provider: str) -> tuple:
+    override = os.environ.get(f"FN_RATE_{provider.upper()}")
+    if override:
+        rate, burst, concurrency = override.split(",")
+        return float(rate), int(burst), int(concurrency)
+    return PROVIDER_LIMITS.get(provider) or PROVIDER_LIMITS.get(provider.split("_")[0], (2.0, 4, 4))  # "llm_groq" -> "llm" defaults.
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    with _limiters_lock:
+        if provider not in _limiters: _limiters[provider] = ProviderLimiter(provider, *_limits(provider))
+        return _limiters[provider]
+
+def _status_of(error: Exception):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and (type(error).__name__ == "YFRateLimitError" or "too many requests" in str(error).lower()): status = 429
+    return status
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in ("ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout"):
+        return True
+    return _status_of(error) in RETRY_STATUSES
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def _on_failure(limiter: ProviderLimiter, error: Exception, attempt: int, retries: int):
+    """Returns the delay before the next attempt, or raises when the error is final."""
+    if not _is_retryable(error): raise error
+    if attempt >= retries:
+        limiter.failures += 1
+        label = PROVIDER_LABELS.get(limiter.name) or PROVIDER_LABELS.get(limiter.name.split("_")[0], limiter.name)
+        raise RateLimitedError(f"{label} is throttling or unavailable right now; please try again in a minute.") from error
+    delay = _backoff(attempt); limiter.retries += 1
+    if _status_of(error) == 429: limiter.pause(delay)
+    logger.warning("%s call failed (%s); retry %d/%d in %.1fs", limiter.name, error, attempt + 1, retries, delay)
+    return delay
+
+def outbound(provider: str, fn, *args, retries: int = MAX_RETRIES, **kwargs):
+    """Calls fn(*args, **kwargs) under the provider's rate limit and concurrency cap, retrying 429/5xx and connection errors."""
+    limiter = get_limiter(provider); lane_value = current_lane()
+    for attempt in itertools.count():
+        limiter.acquire(lane_value)
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            error = e
+        finally:
+            limiter.release()
+        time.sleep(_on_failure(limiter, error, attempt, retries))
+
+async def outbound_async(provider: str, fn, *args, retries: int = MAX_RETRIES, **kwargs):
+    """Async variant of `outbound` for coroutine functions; waiting for a slot never blocks the loop or an executor thread."""
+    limiter = get_limiter(provider); lane_value = current_lane()
+    for attempt in itertools.count():
+        await limiter.acquire_async(lane_value)
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            error = e
+        finally:
+            limiter.release()
+        await asyncio.sleep(_on_failure(limiter, error, attempt, retries))
+
+@asynccontextmanager
+async def outbound_slot(provider: str):
+    """
+    Holds one of the provider's slots for the whole enclosed block, e.g. a streamed reply from request to last chunk,
+    so the concurrency cap and in-flight stats cover the full generation. No retries: a throttle, 5xx or connection
+    error raised inside the block surfaces as RateLimitedError.
+    """
+    limiter = get_limiter(provider)
+    await limiter.acquire_async(current_lane())
+    try:
+        yield limiter
+    except Exception as e:
+        _on_failure(limiter, e, 0, 0)
+    finally:
+        limiter.release()
+
+def outbound_stats() -> dict:
+    """Queue depth per lane, in-flight requests, retry/throttle counts and wait-time percentiles per provider."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
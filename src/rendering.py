@@ -0,0 +1,456 @@
+import os
+import re
+import json
+import streamlit as st
+import streamlit.components.v1 as components
+from src.cache import TTLCache
+
+# Set FN_INLINE_CSS=1 to fall back to re-sending the stylesheet inline on every rerun.
+INLINE_CSS = os.environ.get("FN_INLINE_CSS", "0") == "1"
+
+# --- Main app layout (header, tab buttons, chat bubbles) ---
+MAIN_APP_CSS = """
+@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap');
+body {
+    font-family: 'Inter', sans-serif;
+}
+/* General header styling for the entire row of logo and buttons */
+/* Target the main container that Streamlit wraps columns in */
+div[data-testid="stVerticalBlock"] > div:first-child > div[data-testid="stHorizontalBlock"] {
+    background-color: #FFFFFF; /* White header background */
+    color: #333; /* Dark text for header */
+    border-radius: 10px;
+    padding: 10px 20px;
+    margin-bottom: 20px;
+    box-shadow: 0 2px 6px rgba(0, 0, 0, 0.1); /* Subtle shadow */
+    align-items: center; /* Vertically center items in this block */
+}
+
+/* Logo styling; this and the button/column rules below are scoped to the main app's keyed container. */
+.st-key-main-app h1 { /* Targeting Streamlit's default h1 for st.markdown with bold text */
+    font-size: 8em;
+    font-weight: bold;
+    color: #333333;
+    margin: 0; /* Remove default margin */
+    padding: 0; /* Remo1.ve default padding */
+    display: flex; /* Make it a flex container to align content */
+    align-items: center; /* Vertically center text and emoji */
+    gap: 10px; /* Space between emoji and text */
+    flex-shrink: 0; /* Prevent logo from shrinking */
+}
+
+/* Style for the actual <button> element within Streamlit's wrapper */
+.st-key-main-app .stButton > button {
+    border-radius: 4px; /* Rectangular look */
+    padding: 8px 18px;
+    font-weight: bold;
+    border: 1px solid #ccc; /* Subtle border */
+    box-shadow: 0 2px 4px rgba(0,0,0,0.2);
+    transition: all 0.2s ease;
+    cursor: pointer;
+    width: auto; /* Allow buttons to size based on content */
+    line-height: normal; /* Ensure text sits correctly */
+    flex-shrink: 0; /* Prevent buttons from shrinking */
+    margin: 0 !important; /* Remove any default margins that push buttons apart */
+    display: inline-flex !important; /* Make buttons display inline-flex for side-by-side */
+    align-items: center; /* Center text vertically within the button */
+    justify-content: center; /* Center text horizontally within the button */
+}
+.st-key-main-app .stButton > button:hover {
+    transform: translateY(-1px);
+    box-shadow: 0 3px 6px rgba(0,0,0,0.3);
+}
+/* Active tab style (for primary type button) */
+.st-key-main-app .stButton > button[data-testid*="stButton-primary"] {
+    background-color: #28a745; /* Green for active Stocks */
+    color: white;
+    border-color: #28a745; /* Match border to background */
+}
+/* Inactive tab style (for secondary type button) */
+.st-key-main-app .stButton > button[data-testid*="stButton-secondary"] {
+    background-color: #ffc107; /* Yellow for inactive SIP or vice-versa */
+    color: #333;
+    border-color: #ffc107; /* Match border to background */
+}
+
+/* Adjust spacing and alignment within the columns for buttons */
+.st-key-main-app div[data-testid="stColumn"] {
+    display: flex; /* Make columns flex containers */
+    align-items: center; /* Vertically center content */
+    padding: 0 !important; /* Remove all default padding from columns */
+    margin: 0 !important; /* Remove all default margin from columns */
+    gap: 10px; /* Explicit gap between button columns */
+}
+/* For the column that contains the buttons, align them to the end (right) */
+.st-key-main-app div[data-testid="stColumn"]:nth-child(2) {
+    justify-content: flex-end; /* Align contents of this column to the right */
+    flex-grow: 1; /* Allow this column to take up remaining space */
+}
+/* For the button columns themselves (within the button-containing column) */
+.st-key-main-app div[data-testid="stColumn"]:nth-child(2) > div[data-testid="stVerticalBlock"] > div > div[data-testid^="stColumn"] {
+    flex-grow: 0; /* Prevent individual button columns from growing too much */
+    flex-shrink: 0; /* Prevent them from shrinking */
+    width: auto; /* Allow buttons to dictate their column width */
+}
+/* Remove padding between the button columns if they were separated by default */
+.st-key-main-app div[data-testid="stColumn"]:nth-child(2) > div[data-testid="stVerticalBlock"] > div > div[data-testid^="stColumn"]:first-child {
+    padding-right: 5px !important; /* Small gap between buttons */
+}
+.st-key-main-app div[data-testid="stColumn"]:nth-child(2) > div[data-testid="stVerticalBlock"] > div > div[data-testid^="stColumn"]:nth-child(2) {
+    padding-left: 5px !important; /* Small gap between buttons */
+}
+
+
+/* Chat message styling (general app styles) */
+.stChatMessage {
+    background-color: #f8f9fa; /* Light background for chat area */
+    border-radius: 10px;
+    padding: 15px;
+    margin-bottom: 15px;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.05);
+}
+/* Style for user messages */
+.stChatMessage[data-testid="chat-message-container"]:nth-child(odd) { /* Odd children for user, assuming user is first */
+    background-color: #e6f7ff; /* Light blue */
+    align-self: flex-end;
+    margin-left: auto;
+    text-align: right;
+}
+/* Style for assistant messages */
+.stChatMessage[data-testid="chat-message-container"]:nth-child(even) { /* Even children for assistant */
+    background-color: #f0f0f0; /* Light gray */
+    align-self: flex-start;
+    margin-right: auto;
+    text-align: left;
+}
+/* Ensure chat input stays at the bottom */
+.stChatInput {
+    position: sticky;
+    bottom: 0;
+    background-color: white;
+    padding: 10px 0;
+    box-shadow: 0 -2px 10px rgba(0,0,0,0.1);
+    z-index: 1000;
+}
+"""
+
+# --- Stock chat analysis cards ---
+ANALYSIS_CARD_CSS = """
+.analysis-container { border: 1px solid #e9ecef; border-radius: 12px; padding: 25px; background-color: #ffffff; margin-top: 1em; box-shadow: 0 4px 12px rgba(0,0,0,0.08); }
+.analysis-container h4 { color: #0d6efd; border-bottom: 2px solid #f0f2f6; padding-bottom: 10px; margin-top: 0; }
+.analysis-container h5 { margin-top: 20px; margin-bottom: 10px; color: #495057; font-size: 1.1em; }
+.rec-percent { font-size: 1.1em; font-weight: 600; padding: 8px 12px; border-radius: 8px; text-align: center; display: inline-block; margin: 3px; }
+.buy { background-color: #d1e7dd; color: #0f5132; }
+.hold { background-color: #fff3cd; color: #664d03; }
+.sell { background-color: #f8d7da; color: #842029; }
+.verdict-verystrong, .verdict-strong { color: #0f5132; font-weight: 700; }
+.verdict-average { color: #664d03; font-weight: 700; }
+.verdict-weak { color: #842029; font-weight: 700; }
+.mtf-table { width: 100%; border-collapse: collapse; margin-top: 8px; }
+.mtf-table th, .mtf-table td { padding: 6px 8px; border-bottom: 1px solid #f0f2f6; text-align: left; }
+.live-strip { border: 1px dashed #0d6efd; border-radius: 10px; padding: 8px 14px; margin-top: 6px; font-size: 0.95em; background-color: #f8fbff; }
+.live-strip .live-dot { color: #dc3545; font-weight: 700; }
+"""
+
+# --- SIP planner ---
+SIP_PLANNER_CSS = """
+.input-container { background-color: #f8f9fa; border-radius: 10px; padding: 25px; box-shadow: 0 4px 8px rgba(0,0,0,0.1); border: 1px solid #e9ecef; margin-bottom: 2em; }
+.results-container { margin-top: 2em; }
+.phase-card { background-color: #ffffff; border-radius: 10px; padding: 20px; margin-bottom: 15px; border-left: 5px solid #0d6efd; box-shadow: 0 2px 4px rgba(0,0,0,0.05); }
+.phase-card h4 { color: #0d6efd; margin-bottom: 5px; }
+.phase-card em { color: #6c757d; font-size: 0.9em; }
+.fund-example { background-color: #e9f5ff; border-left: 3px solid #007bff; padding: 10px; margin-top: 15px; border-radius: 5px; }
+"""
+
+# --- Intro page ---
+INTRO_CSS = """
+.intro-container {
+    display: flex;
+    flex-direction: column;
+    justify-content: center; /* Center vertically */
+    align-items: center; /* Center horizontally */
+    min-height: 6vh; /* Full viewport height */
+    background: linear-gradient(135deg, #6DD5ED 0%, #2193B0 100%); /* Blue gradient */
+    color: white;
+    text-align: center;
+    padding: 20px; /* Padding around content */
+    font-family: 'Inter', sans-serif;
+}
+.intro-title {
+    font-size: 3.5em;
+    font-weight: bold;
+    margin-bottom: 0.5em;
+    text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+}
+.intro-tagline {
+    font-size: 1.5em;
+    margin-bottom: 2em; /* Space between tagline and button */
+    max-width: 800px;
+    line-height: 1.6;
+}
+/* The "Get Started" button; scoped to the page's keyed container so it never styles the main app's buttons. */
+.st-key-intro-page div.stButton > button:first-child {
+    background-color: #FF6B6B; /* Reddish button */
+    color: white;
+    border-radius: 25px;
+    padding: 10px 30px;
+    font-size: 1.2em;
+    border: none;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.2);
+    transition: all 0.3s ease;
+    cursor: pointer;
+    margin-top: 20px; /* Space above button after tagline */
+    margin-bottom: 50px; /* Space below button, before cards */
+}
+.st-key-intro-page div.stButton > button:first-child:hover {
+    background-color: #FF4A4A;
+    transform: translateY(-2px);
+    box-shadow: 0 6px 8px rgba(0,0,0,0.3);
+}
+
+/* Styles for the new feature highlight cards */
+.feature-card-wrapper { /* Wrapper to control max-width of columns */
+    display: flex;
+    flex-direction: column; /* Stack columns within this wrapper */
+    align-items: center;
+    width: 100%;
+}
+.feature-card-row {
+    display: flex;
+    flex-wrap: wrap; /* Allow cards to wrap to next line on smaller screens */
+    justify-content: center;
+    gap: 20px; /* Space between cards */
+    width: 100%; /* Take full width of its parent (column) */
+    max-width: 900px; /* Max width for cards section */
+}
+.feature-card {
+    background-color: rgba(255, 255, 255, 0.15); /* Subtle transparent background */
+    border-radius: 15px;
+    padding: 25px;
+    flex: 1; /* Allow cards to grow and shrink */
+    min-width: 280px; /* Minimum width before wrapping */
+    max-width: 350px; /* Maximum width for individual card */
+    box-shadow: 0 4px 15px rgba(0,0,0,0.2);
+    text-align: center;
+    transition: transform 0.3s ease, box-shadow 0.3s ease;
+    backdrop-filter: blur(5px); /* Slightly blur background for a modern look */
+    border: 1px solid rgba(255, 255, 255, 0.3); /* Light border */
+}
+.feature-card:hover {
+    transform: translateY(-8px); /* Lift effect on hover */
+    box-shadow: 0 8px 25px rgba(0,0,0,0.3);
+}
+.feature-card h4 {
+    font-size: 1.4em;
+    color: #FFD700; /* Gold heading */
+    margin-bottom: 10px;
+    font-weight: bold;
+}
+.feature-card p {
+    font-size: 1em;
+    line-height: 1.5;
+    color: #f0f0f0; /* Light text for description */
+    margin-bottom: 15px;
+}
+.feature-card .icon {
+    font-size: 2.5em;
+    margin-bottom: 15px;
+    color: white; /* White icon */
+}
+
+"""
+
+# --- Login page ---
+LOGIN_CSS = """
+.login-container {
+    display: flex;
+    flex-direction: column;
+    justify-content: center;
+    align-items: center;
+    min-height: 50vh;
+    background: #f0f2f6; /* Light grey background */
+    font-family: 'Inter', sans-serif;
+}
+.login-box {
+    background: white;
+    padding: 40px;
+    border-radius: 15px;
+    box-shadow: 0 10px 25px rgba(0,0,0,0.1);
+    text-align: center;
+    width: 100%;
+    max-width: 450px;
+    box-sizing: border-box;
+}
+.login-title {
+    font-size: 2em;
+    font-weight: bold;
+    margin-bottom: 1.5em;
+    color: #333;
+}
+/* Widget rules are scoped to the page's keyed container, so they never reach the main app's widgets. */
+.st-key-login-page .stTextInput>div>div>input {
+    border-radius: 10px;
+    border: 1px solid #ccc;
+    padding: 12px;
+    width: 100%;
+    box-sizing: border-box;
+}
+.st-key-login-page .stRadio>label {
+    font-weight: bold;
+    margin-right: 15px;
+}
+.st-key-login-page .stRadio>div {
+    justify-content: center;
+    margin-bottom: 20px;
+    display: flex;
+    flex-wrap: wrap; /* Allow radio buttons to wrap */
+    gap: 10px; /* Space between radio buttons */
+}
+.st-key-login-page .stRadio div[role="radio"] { /* Target individual radio buttons */
+    background-color: #e9e9e9;
+    padding: 8px 15px;
+    border-radius: 20px;
+    cursor: pointer;
+    transition: background-color 0.2s ease;
+}
+.st-key-login-page .stRadio div[role="radio"]:hover {
+    background-color: #dcdcdc;
+}
+.st-key-login-page .stRadio div[aria-selected="true"] { /* Style for selected radio button */
+    background-color: #4CAF50;
+    color: white;
+}
+.st-key-login-page .stButton>button {
+    background-color: #4CAF50; /* Green button */
+    color: white;
+    border-radius: 10px;
+    padding: 12px 30px;
+    font-size: 1.1em;
+    border: none;
+    box-shadow: 0 3px 5px rgba(0,0,0,0.2);
+    transition: all 0.3s ease;
+    cursor: pointer;
+}
+.st-key-login-page .stButton>button:hover {
+    background-color: #45a049;
+    transform: translateY(-1px);
+    box-shadow: 0 4px 6px rgba(0,0,0,0.3);
+}
+
+"""
+
+def _minify(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};:,>])\s*", r"\1", css).strip()
+
+APP_STYLESHEET = _minify(MAIN_APP_CSS + ANALYSIS_CARD_CSS + SIP_PLANNER_CSS + INTRO_CSS + LOGIN_CSS)
+
+def inject_stylesheet():
+    """
+    Adds the consolidated app stylesheet to the page <head> once per session. A <style> element in the
+    Streamlit body would be dropped on the next rerun unless re-sent, whereas one in <head> survives reruns.
+    """
+    if INLINE_CSS:
+        st.markdown(f"<style>{APP_STYLESHEET}</style>", unsafe_allow_html=True)
+        return
+    if st.session_state.get("_stylesheet_injected"): return
+    components.html(f"""<script>
+    const doc = window.parent.document;
+    if (!doc.getElementById("fn-app-stylesheet")) {{
+        const style = doc.createElement("style");
+        style.id = "fn-app-stylesheet";
+        style.textContent = {json.dumps(APP_STYLESHEET)};
+        doc.head.appendChild(style);
+    }}
+    </script>""", height=0)
+    st.session_state._stylesheet_injected = True
+
+# Rendered cards keyed on (kind, symbol, computed_at): a result never changes after it is computed, so its stamp identifies it.
+_card_memo = TTLCache(ttl=3600, maxsize=1024)
+
+def _memoized(key: tuple, stamp, render, *args) -> str:
+    """Card HTML memoized on a small identity; results without a computed_at stamp are rendered directly."""
+    if stamp is None: return render(*args)
+    html = _card_memo.get((*key, stamp))
+    if html is None:
+        html = render(*args); _card_memo.set((*key, stamp), html)
+    return html
+
+def technical_card(ticker: str, tool_output: dict) -> str:
+    """HTML card for a successful technical result, memoized on (ticker, computed_at)."""
+    return _memoized(("technical", ticker), tool_output.get("computed_at"), _technical_card, ticker, tool_output)
+
+def _technical_card(ticker: str, tool_output: dict) -> str:
+    text_analysis = tool_output.get("text_analysis", "")
+    rec_percent = tool_output.get("recommendation_percent", {})
+    targets = tool_output.get("price_targets", {})
+    final_answer = f'<div class="analysis-container">'
+    final_answer += f"<h4>📈 Technical Snapshot for {ticker}</h4>"
+    final_answer += f"<h5>Key Signals</h5><p>{text_analysis.replace('•', '<br>•')}</p><hr>"
+    final_answer += f"<h5>Key Price Levels</h5><p><strong>Current:</strong> {targets.get('current', 'N/A')}<br><strong>Support:</strong> {targets.get('support', 'N/A')}<br><strong>Resistance:</strong> {targets.get('resistance', 'N/A')}</p><hr>"
+    final_answer += "<h5>Recommendation</h5>"
+    rec_html = " ".join([f'<span class="rec-percent {cat.lower()}">{cat}: {val}%</span>' for cat, val in rec_percent.items()])
+    final_answer += f"<p>{rec_html}</p>"
+    final_answer += "</div>"
+    return final_answer
+
+TECHNICAL_CARD_TITLE = re.compile(r"Technical Snapshot for ([^<]+)</h4>")
+
+def technical_card_tickers(html: str) -> list:
+    """Tickers of the technical cards inside a rendered chat message."""
+    return TECHNICAL_CARD_TITLE.findall(html)
+
+def live_strip(ticker: str, update) -> str:
+    """One-line live refresh shown under a technical card: price, distance to support/resistance and the re-scored last bar."""
+    if update is None: return f'<div class="live-strip"><span class="live-dot">●</span> Waiting for a live quote for {ticker}...</div>'
+    status = f"live {update['as_of']}" if update["market_open"] else f"market closed, last trade {update['as_of']}"
+    split = " ".join(f'<span class="rec-percent {cat.lower()}">{cat} {val}%</span>' for cat, val in update["recommendation_percent"].items())
+    return (f'<div class="live-strip"><span class="live-dot">●</span> <strong>{ticker} ₹{update["price"]:,.2f}</strong> ({status})'
+            f' · {update["to_support_pct"]:.1f}% above support ₹{update["support"]:,.2f} · {update["to_resistance_pct"]:.1f}% below resistance ₹{update["resistance"]:,.2f}'
+            f'<br>RSI {update["rsi"]:.1f} · MACD {"bullish" if update["macd_bullish"] else "bearish"} · price {"above" if update["price"] > update["sma50"] else "below"} SMA50'
+            f' · score {update["score"]:+d} {split}</div>')
+
+TREND_VERDICT_CLASSES = {"Improving": "verdict-strong", "Stable": "verdict-average", "Deteriorating": "verdict-weak"}
+
+def fundamental_card(result: dict) -> str:
+    """HTML card for a successful fundamental result, memoized on (symbol, mode, computed_at)."""
+    return _memoized(("fundamental", result.get("symbol"), result.get("mode")), result.get("computed_at"), _fundamental_card, result)
+
+def _fundamental_card(result: dict) -> str:
+    final_verdict = result["verdict"]
+    response_html = f'<div class="analysis-container">'
+    response_html += f"<h4>Fundamental Snapshot for {result['company_name']}</h4>"
+    if result.get("mode") == "peer_relative": response_html += f"<p><em>Scored against {result['peers']} {result['sector']} peers (average favourable percentile {result['favourable_average']:.0f}).</em></p>"
+    response_html += "<hr>"
+    response_html += "<h6>Positive Points:</h6>"; response_html += f"<p>{'<br>'.join(result['positive_points'])}</p>"
+    response_html += "<h6>Points of Caution:</h6>"; response_html += f"<p>{'<br>'.join(result['caution_points'])}</p><hr>"
+    verdict_class = f"verdict-{final_verdict.lower().replace(' ', '')}"
+    response_html += f'<h5>Final Verdict: <span class="{verdict_class}">{final_verdict} Fundamentals</span></h5>'
+    if result.get("trend_verdict"):
+        trend_class = TREND_VERDICT_CLASSES[result["trend_verdict"]]
+        response_html += f'<h6>Multi-Year Trend: <span class="{trend_class}">{result["trend_verdict"]} ({result["trend_score"]:+d})</span></h6>'
+    response_html += '</div>'
+    return response_html
+
+def multi_timeframe_card(ticker: str, result: dict) -> str:
+    """HTML card for a successful multi-timeframe result, memoized on (ticker, each timeframe's computed_at)."""
+    stamps = tuple(tf.get("computed_at") for tf in result["timeframes"].values())
+    return _memoized(("multi_timeframe", ticker), None if None in stamps else stamps, _multi_timeframe_card, ticker, result)
+
+def _multi_timeframe_card(ticker: str, result: dict) -> str:
+    aligned = result["alignment"]
+    bias_class = {"Bullish": "buy", "Bearish": "sell", "Neutral": "hold"}
+    rows = ""
+    for name, tf in result["timeframes"].items():
+        if tf["status"] != "success":
+            rows += f"<tr><td>{name.title()}</td><td colspan='4'>Not enough history ({tf.get('bars', 0)} bars)</td></tr>"; continue
+        cross = f"{'Golden' if tf['golden_cross'] else 'Death'} ({tf['sma_fast']}/{tf['sma_slow']})"
+        rows += (f"<tr><td>{name.title()}</td><td>{cross}</td><td>{tf['rsi']}</td><td>{'Bullish' if tf['macd_bullish'] else 'Bearish'}</td>"
+                 f"<td><span class='rec-percent {bias_class[tf['bias']]}'>{tf['bias']}</span></td></tr>")
+    card = f'<div class="analysis-container">'
+    card += f"<h4>🧭 Multi-Timeframe View for {ticker}</h4>"
+    card += f"<table class='mtf-table'><tr><th>Timeframe</th><th>SMA Cross</th><th>RSI</th><th>MACD</th><th>Bias</th></tr>{rows}</table><hr>"
+    card += f"<h5>Alignment Score: {aligned['score']:+d} / 100</h5><p>{aligned['label']} ({aligned['agreeing']} of {aligned['timeframes']} timeframes agree)</p>"
+    card += "</div>"
+    return card
@@ -0,0 +1,61 @@
+import threading
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Process-wide request coalescing. Concurrent callers asking for the same key while a computation
+    is in flight wait for that one computation and all receive its result (or its exception).
+    Keys are (tool, symbol, params) tuples; counters are kept per tool for the coalescing ratio.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._calls = {}
+        self._executions = {}
+
+    def do(self, key: tuple, fn, *args, **kwargs):
+        tool = key[0]
+        with self._lock:
+            self._calls[tool] = self._calls.get(tool, 0) + 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self._executions[tool] = self._executions.get(tool, 0) + 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None: raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.event.set()
+
+    def stats(self) -> dict:
+        """Per-tool call/execution counts; coalescing_ratio is the share of calls served by another caller's computation."""
+        with self._lock:
+            stats = {}
+            for tool, calls in self._calls.items():
+                executions = self._executions.get(tool, 0)
+                stats[tool] = {"calls": calls, "executions": executions, "coalesced": calls - executions,
+                               "coalescing_ratio": round((calls - executions) / calls, 4) if calls else 0.0}
+            stats["in_flight"] = len(self._in_flight)
+            return stats
+
+# Shared by every Streamlit session, the agent's tools and the headless service.
+analysis_flight = SingleFlight()
@@ -0,0 +1,40 @@
+import re
+from pydantic import BaseModel, Field, field_validator
+
+YEAR_RANGE = re.compile(r"^\s*years?\s+(\d+)\s*(?:(?:-|–|—|to)\s*(\d+))?\s*$", re.IGNORECASE)
+
+class FundRecommendation(BaseModel):
+    fund_category: str = Field(min_length=1, description="Mutual fund category, e.g. 'Equity Flexi Cap Fund'.")
+    fund_examples: list[str] = Field(min_length=1, max_length=5, description="Well-known Indian mutual funds in the category.")
+
+class SIPPhase(BaseModel):
+    phase_name: str = Field(min_length=1, description="e.g. 'Phase 1: Aggressive Growth'.")
+    phase_duration: str = Field(description="The years the phase covers, written as 'Years X-Y'.")
+    phase_description: str = Field(min_length=1, description="What the phase focuses on.")
+    recommended_funds: list[FundRecommendation] = Field(min_length=1)
+
+    @field_validator("phase_duration")
+    @classmethod
+    def _year_range(cls, value: str) -> str:
+        if not YEAR_RANGE.match(value): raise ValueError(f"must be written as 'Years X-Y', got {value!r}")
+        return value
+
+class SIPPlan(BaseModel):
+    strategy_summary: str = Field(min_length=1, description="A brief, one-sentence summary of the overall plan.")
+    phases: list[SIPPhase] = Field(min_length=1)
+
+def year_range(phase_duration: str) -> tuple:
+    start, end = YEAR_RANGE.match(phase_duration).groups()
+    return int(start), int(end or start)
+
+def horizon_problems(plan: SIPPlan, horizon_years: int) -> list:
+    """Checks that the phases run back to back from year 1 to the end of the horizon."""
+    problems, expected_start = [], 1
+    for i, phase in enumerate(plan.phases):
+        start, end = year_range(phase.phase_duration)
+        if start != expected_start: problems.append(f"phases.{i}.phase_duration: should start at year {expected_start}, not year {start}")
+        if end < start: problems.append(f"phases.{i}.phase_duration: ends before it starts")
+        expected_start = max(end, start) + 1
+    if expected_start - 1 != horizon_years:
+        problems.append(f"phases: must together cover exactly {horizon_years} years, but they end at year {expected_start - 1}")
+    return problems
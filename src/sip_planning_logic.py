@@ -300,18 +300,50 @@
 
 # src/sip_planning_logic.py - DEFINITIVE FINAL VERSION
 import streamlit as st
-import json
-from src.llm_utils import call_llm_api_direct
-
-def calculate_sip_future_value(monthly_investment, annual_rate, years):
-    """Calculates the future value of a Systematic Investment Plan."""
-    if annual_rate <= 0: return monthly_investment * 12 * years
-    monthly_rate = (annual_rate / 100) / 12
-    months = years * 12
-    future_value = monthly_investment * (((1 + monthly_rate) ** months - 1) / monthly_rate) * (1 + monthly_rate)
-    return future_value
-
-async def show_sip_planner():
+import logging
+import pandas as pd
+from langchain_core.messages import HumanMessage
+from src.llm_utils import get_llm_client, get_llm_router
+from src.async_runtime import run_sync
+from src.rate_limit import RateLimitedError
+from src.structured_output import generate_structured
+from src.sip_plan_schema import SIPPlan, horizon_problems
+from src.sip_simulation import calculate_sip_future_value, simulate_glide_path
+
+logger = logging.getLogger(__name__)
+
+def show_glide_path_projection(plan_data, monthly_investment, investment_horizon):
+    """Renders the phase-aware corpus projection for the strategy the AI just returned."""
+    simulation = simulate_glide_path(plan_data, monthly_investment, investment_horizon)
+    if simulation is None: return
+
+    with st.container(border=True):
+        st.subheader("Phase-Aware Projection")
+        final_expected = simulation["expected"][-1]; total_invested = simulation["invested"][-1]
+        g_col1, g_col2, g_col3 = st.columns(3)
+        g_col1.metric("Expected Wealth (This Plan)", f"₹{final_expected:,.0f}")
+        g_col2.metric("Likely Range (10th-90th pct.)", f"₹{simulation['p10'][-1]:,.0f} - ₹{simulation['p90'][-1]:,.0f}")
+        g_col3.metric("Wealth Gained", f"₹{final_expected - total_invested:,.0f}")
+
+        chart_df = pd.DataFrame({
+            "Expected": simulation["expected"], "Pessimistic (10th pct.)": simulation["p10"],
+            "Optimistic (90th pct.)": simulation["p90"], "Invested": simulation["invested"],
+        }, index=pd.Index(simulation["months"] / 12, name="Year"))
+        st.line_chart(chart_df)
+
+        phase_rows = []
+        for phase in simulation["phases"]:
+            months = phase["months"]
+            phase_rows.append({
+                "Phase": phase["phase_name"],
+                "Months": f"{months[0]}-{months[1]}" if months else "Inherited",
+                "Assumed Return (%)": round(phase["annual_return"], 2) if phase["annual_return"] is not None else None,
+                "Assumed Volatility (%)": round(phase["volatility"], 2) if phase["volatility"] is not None else None,
+            })
+        st.dataframe(pd.DataFrame(phase_rows), hide_index=True, use_container_width=True)
+        st.caption("Returns and volatility are category-level assumptions blended per phase, not fund-specific forecasts.")
+
+def show_sip_planner():
     """
     Manages the Streamlit UI and logic for the SIP plan recommendations.
     This version features an enhanced UI and a multi-phase strategy output.
@@ -319,17 +351,6 @@ async def show_sip_planner():
     st.title("💰 Personalized SIP Strategy Planner")
     st.markdown("Define your goal, and I'll recommend a phased SIP strategy and project your potential wealth.")
 
-    st.markdown("""
-    <style>
-        .input-container { background-color: #f8f9fa; border-radius: 10px; padding: 25px; box-shadow: 0 4px 8px rgba(0,0,0,0.1); border: 1px solid #e9ecef; margin-bottom: 2em; }
-        .results-container { margin-top: 2em; }
-        .phase-card { background-color: #ffffff; border-radius: 10px; padding: 20px; margin-bottom: 15px; border-left: 5px solid #0d6efd; box-shadow: 0 2px 4px rgba(0,0,0,0.05); }
-        .phase-card h4 { color: #0d6efd; margin-bottom: 5px; }
-        .phase-card em { color: #6c757d; font-size: 0.9em; }
-        .fund-example { background-color: #e9f5ff; border-left: 3px solid #007bff; padding: 10px; margin-top: 15px; border-radius: 5px; }
-    </style>
-    """, unsafe_allow_html=True)
-
     with st.container(border=False):
         st.markdown('<div class="input-container">', unsafe_allow_html=True)
         col1, col2 = st.columns(2)
@@ -363,13 +384,15 @@ async def show_sip_planner():
 
         with st.spinner(f"Crafting your personalized plan..."):
             llm_prompt = f"""
-            You are an expert financial advisor. Based on the user's preferences, create a multi-phase SIP strategy. Your entire output must be a single, well-formed JSON object. Do not add any text before or after the JSON object.
+            You are an expert financial advisor. Based on the user's preferences, create a multi-phase SIP strategy. Your entire output must be a single, well-formed JSON object that follows the JSON Schema below. Do not add any text before or after the JSON object.
 
             User Preferences:
             - Goal: {investment_goal}
             - Risk Appetite: {risk_appetite}
             - Investment Horizon: {investment_horizon} years
 
+            Write every "phase_duration" as "Years X-Y", and make the phases together cover all {investment_horizon} years.
+
             JSON Schema:
             {{
               "strategy_summary": "A brief, one-sentence summary of the overall plan.",
@@ -388,51 +411,46 @@ async def show_sip_planner():
               ]
             }}
             """
-            raw_response = await call_llm_api_direct(llm_prompt, [], current_llm_provider, current_api_key)
-
-            if raw_response is None:
+            if get_llm_client(current_llm_provider, current_api_key) is None: return  # Reports key/provider problems on the script thread.
+            try:
+                plan, raw_response = run_sync(generate_structured(get_llm_router(current_llm_provider, current_api_key), [HumanMessage(content=llm_prompt)],
+                                                                  SIPPlan, check=lambda p: horizon_problems(p, investment_horizon)))
+            except RateLimitedError as e:
+                st.error(str(e))
+                return
+            except Exception as e:
+                logger.error("SIP plan generation failed: %s", e)
                 st.error("Failed to get a response from the AI.")
                 return
 
-            try:
+            if plan is None:
+                st.warning("Could not parse a structured plan from the AI. Displaying its full response:")
+                st.markdown(raw_response)
+            else:
+                plan_data = plan.model_dump()
                 st.subheader("Your AI-Powered Investment Strategy")
-                
-                # --- THIS IS THE FIX ---
-                # Find the first '{' and the last '}' to correctly extract the JSON object.
-                json_start = raw_response.find('{')
-                json_end = raw_response.rfind('}') + 1
+                st.info(plan_data["strategy_summary"])
 
-                if json_start == -1: # If no JSON object is found
-                    raise json.JSONDecodeError("No JSON object found in response.", raw_response, 0)
-                
-                json_str = raw_response[json_start:json_end]
-                plan_data = json.loads(json_str)
-                
-                if plan_data.get("strategy_summary"):
-                    st.info(plan_data["strategy_summary"])
-
-                for phase in plan_data.get("phases", []):
+                for phase in plan_data["phases"]:
                     st.markdown(f"""
                     <div class="phase-card">
-                        <h4>{phase.get('phase_name', 'N/A')}</h4>
-                        <em>Duration: {phase.get('phase_duration', 'N/A')}</em>
-                        <p>{phase.get('phase_description', '')}</p>
+                        <h4>{phase['phase_name']}</h4>
+                        <em>Duration: {phase['phase_duration']}</em>
+                        <p>{phase['phase_description']}</p>
                     """, unsafe_allow_html=True)
                     
-                    for fund in phase.get("recommended_funds", []):
+                    for fund in phase["recommended_funds"]:
                         st.markdown(f"""
                         <div class="fund-example">
-                            <strong>Recommended Category: {fund.get('fund_category', 'N/A')}</strong>
+                            <strong>Recommended Category: {fund['fund_category']}</strong>
                             <ul>
-                                {"".join(f"<li>{example}</li>" for example in fund.get('fund_examples', []))}
+                                {"".join(f"<li>{example}</li>" for example in fund['fund_examples'])}
                             </ul>
                         </div>
                         """, unsafe_allow_html=True)
                     st.markdown("</div>", unsafe_allow_html=True)
 
-            except (json.JSONDecodeError, IndexError):
-                st.warning("Could not parse a structured plan from the AI. Displaying its full response:")
-                st.markdown(raw_response)
+                show_glide_path_projection(plan_data, monthly_investment, investment_horizon)
             
             st.caption("""
             **Disclaimer:** The fund names mentioned are illustrative examples based on the AI's training data and are not live, personalized financial advice or endorsements. 
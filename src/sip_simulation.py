@@ -0,0 +1,157 @@
+import re
+import json
+from functools import lru_cache
+import numpy as np
+
+# (keywords, expected annual return %, annual volatility %) - first keyword match wins, so specific categories go first.
+CATEGORY_ASSUMPTIONS = [
+    (("liquid", "overnight", "money market", "ultra short"), 6.0, 0.5),
+    (("arbitrage",), 6.5, 1.0),
+    (("gilt",), 7.5, 4.0),
+    (("corporate bond", "banking and psu", "banking & psu", "short duration", "debt", "bond", "fixed income"), 7.0, 2.5),
+    (("conservative hybrid",), 8.5, 5.0),
+    (("equity savings",), 8.0, 5.0),
+    (("balanced advantage", "dynamic asset", "multi asset", "multi-asset"), 10.0, 9.0),
+    (("aggressive hybrid", "equity hybrid", "hybrid", "balanced"), 11.0, 12.0),
+    (("gold", "silver", "commodit"), 8.0, 14.0),
+    (("international", "global", "us equity", "nasdaq", "fof"), 11.0, 18.0),
+    (("small cap", "smallcap"), 15.0, 24.0),
+    (("sector", "thematic"), 14.0, 24.0),
+    (("mid cap", "midcap"), 14.0, 20.0),
+    (("elss", "tax saver"), 13.0, 18.0),
+    (("flexi", "multi cap", "multicap", "large & mid", "large and mid", "focused", "value", "contra"), 13.0, 17.0),
+    (("large cap", "largecap", "bluechip", "index", "nifty", "sensex", "etf"), 12.0, 15.0),
+    (("equity",), 12.0, 16.0),
+]
+DEFAULT_ASSUMPTION = (10.0, 10.0)
+SIMULATION_PATHS = 1000
+
+def calculate_sip_future_value(monthly_investment, annual_rate, years):
+    """Calculates the future value of a Systematic Investment Plan."""
+    if annual_rate <= 0: return monthly_investment * 12 * years
+    monthly_rate = (annual_rate / 100) / 12
+    months = years * 12
+    future_value = monthly_investment * (((1 + monthly_rate) ** months - 1) / monthly_rate) * (1 + monthly_rate)
+    return future_value
+
+def get_category_assumption(fund_category: str, assumptions=None):
+    """Maps a free-text fund category to its (annual return %, volatility %) assumption."""
+    category = (fund_category or "").lower()
+    for keywords, annual_return, volatility in (assumptions or CATEGORY_ASSUMPTIONS):
+        if any(keyword in category for keyword in keywords):
+            return annual_return, volatility
+    return DEFAULT_ASSUMPTION
+
+def parse_phase_duration(phase_duration: str, horizon_months: int):
+    """
+    Parses a phase duration such as "Years 1-7", "Year 8 onwards", "First 5 years" or "Months 1-24"
+    into an inclusive (start_month, end_month) range. Returns None if the text cannot be understood.
+    """
+    text = (phase_duration or "").lower()
+    unit = 1 if "month" in text else 12
+    numbers = [int(n) for n in re.findall(r"\d+", text)]
+    if not numbers: return None
+
+    if re.search(r"\d+\s*(?:-|–|—|to)\s*\d+", text) and len(numbers) >= 2:
+        start, end = (numbers[0] - 1) * unit + 1, numbers[1] * unit
+    elif "first" in text:
+        start, end = 1, numbers[0] * unit
+    elif "last" in text or "final" in text:
+        start, end = horizon_months - numbers[0] * unit + 1, horizon_months
+    elif "+" in text or "onward" in text or "till" in text or "until" in text or "end" in text:
+        start, end = (numbers[0] - 1) * unit + 1, horizon_months
+    else:
+        start, end = (numbers[0] - 1) * unit + 1, numbers[0] * unit
+
+    start, end = max(start, 1), min(end, horizon_months)
+    return (start, end) if start <= end else None
+
+def build_phase_schedule(phases: list, horizon_months: int, assumptions=None):
+    """
+    Builds per-month arrays of blended annual return and volatility (in %) for the plan's phases.
+    Funds inside a phase are blended equally. Months no phase claims inherit the previous phase
+    (or the first phase, before any phase starts); if no duration parses, phases split the horizon evenly.
+    """
+    blended = []
+    for phase in phases:
+        funds = phase.get("recommended_funds") or [{}]
+        pairs = [get_category_assumption(fund.get("fund_category", ""), assumptions) for fund in funds]
+        blended.append((float(np.mean([p[0] for p in pairs])), float(np.mean([p[1] for p in pairs]))))
+
+    ranges = [parse_phase_duration(phase.get("phase_duration", ""), horizon_months) for phase in phases]
+    if not any(ranges):
+        bounds = np.linspace(0, horizon_months, len(phases) + 1).round().astype(int)
+        ranges = [(int(bounds[i]) + 1, int(bounds[i + 1])) if bounds[i] < bounds[i + 1] else None for i in range(len(phases))]
+
+    phase_index = np.full(horizon_months, -1, dtype=np.int64)
+    for i, month_range in enumerate(ranges):
+        if month_range: phase_index[month_range[0] - 1:month_range[1]] = i
+
+    # Forward-fill unclaimed months from the previous phase, then back-fill any leading gap.
+    claimed = np.where(phase_index >= 0, np.arange(horizon_months), -1)
+    np.maximum.accumulate(claimed, out=claimed)
+    first_claimed = phase_index[phase_index >= 0][0] if (phase_index >= 0).any() else 0
+    phase_index = np.where(claimed >= 0, phase_index[np.maximum(claimed, 0)], first_claimed)
+
+    table = np.array(blended, dtype=np.float64).reshape(-1, 2)
+    return phase_index, table[phase_index, 0], table[phase_index, 1], ranges
+
+def _corpus_paths(monthly_investment: float, monthly_growth: np.ndarray) -> np.ndarray:
+    """
+    Vectorized SIP corpus for growth factors of shape (..., months), with contributions at the start of each month:
+    V_t = G_t * sum_{k<=t} c / G_{k-1}, where G is the cumulative growth factor.
+    """
+    growth = np.cumprod(monthly_growth, axis=-1)
+    previous = np.concatenate([np.ones_like(growth[..., :1]), growth[..., :-1]], axis=-1)
+    return growth * np.cumsum(monthly_investment / previous, axis=-1)
+
+@lru_cache(maxsize=128)
+def _simulate_cached(phases_key: str, monthly_investment: float, horizon_years: int, assumptions_key: str, paths: int, seed: int):
+    phases = json.loads(phases_key)
+    assumptions = json.loads(assumptions_key) if assumptions_key else None
+    horizon_months = int(horizon_years) * 12
+    phase_index, annual_return, volatility, ranges = build_phase_schedule(phases, horizon_months, assumptions)
+
+    # Same monthly compounding convention as calculate_sip_future_value, so a single-phase plan matches it exactly.
+    monthly_rate = annual_return / 100 / 12
+    expected = _corpus_paths(monthly_investment, 1 + monthly_rate)
+
+    # Lognormal monthly returns with the phase's volatility, all paths and months in one pass.
+    monthly_sigma = volatility / 100 / np.sqrt(12)
+    drift = np.log1p(monthly_rate) - 0.5 * monthly_sigma ** 2
+    shocks = np.random.default_rng(seed).standard_normal((paths, horizon_months))
+    simulated = _corpus_paths(monthly_investment, np.exp(drift + monthly_sigma * shocks))
+    p10, p50, p90 = np.percentile(simulated, [10, 50, 90], axis=0)
+
+    result = {
+        "months": np.arange(1, horizon_months + 1),
+        "expected": expected, "p10": p10, "p50": p50, "p90": p90,
+        "invested": monthly_investment * np.arange(1, horizon_months + 1, dtype=np.float64),
+        "annual_return": annual_return, "volatility": volatility, "phase_index": phase_index,
+        "phases": [
+            {"phase_name": phase.get("phase_name") or f"Phase {i + 1}", "months": ranges[i],
+             "annual_return": float(annual_return[phase_index == i].mean()) if (phase_index == i).any() else None,
+             "volatility": float(volatility[phase_index == i].mean()) if (phase_index == i).any() else None}
+            for i, phase in enumerate(phases)
+        ],
+    }
+    for value in result.values():
+        if isinstance(value, np.ndarray): value.flags.writeable = False  # Cached and shared, so keep it read-only.
+    return result
+
+def simulate_glide_path(plan: dict, monthly_investment: float, horizon_years: int, assumptions=None, paths: int = SIMULATION_PATHS, seed: int = 42):
+    """
+    Simulates the corpus path of a multi-phase SIP plan, switching the blended return/volatility per phase.
+    Returns a dict of read-only month-by-month arrays (expected path, 10th/50th/90th percentiles, invested amount)
+    plus per-phase assumptions, or None if the plan has no phases. Results are cached per plan and inputs.
+    """
+    phases = [phase for phase in (plan or {}).get("phases", []) if isinstance(phase, dict)]
+    if not phases or horizon_years <= 0: return None
+    relevant = [
+        {"phase_name": phase.get("phase_name"), "phase_duration": phase.get("phase_duration"),
+         "recommended_funds": [{"fund_category": fund.get("fund_category", "")} for fund in phase.get("recommended_funds", []) if isinstance(fund, dict)]}
+        for phase in phases
+    ]
+    phases_key = json.dumps(relevant, sort_keys=True)
+    assumptions_key = json.dumps(assumptions) if assumptions else ""
+    return _simulate_cached(phases_key, float(monthly_investment), int(horizon_years), assumptions_key, int(paths), int(seed))
@@ -0,0 +1,45 @@
+import os
+import json
+import time
+from datetime import datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+from src.storage import connect_sqlite
+
+SNAPSHOT_DB = "snapshots.db"
+# A snapshot is served if it is younger than this, or if the market has not reopened since it was taken.
+SNAPSHOT_MAX_AGE = float(os.environ.get("FN_SNAPSHOT_MAX_AGE", 45 * 60))
+MARKET_TZ = ZoneInfo(os.environ.get("FN_MARKET_TZ", "Asia/Kolkata"))
+MARKET_OPEN = dtime.fromisoformat(os.environ.get("FN_MARKET_OPEN", "09:15"))
+MARKET_CLOSE = dtime.fromisoformat(os.environ.get("FN_MARKET_CLOSE", "15:30"))
+
+def _connect():
+    conn = connect_sqlite(SNAPSHOT_DB)
+    conn.execute("CREATE TABLE IF NOT EXISTS snapshots (tool TEXT NOT NULL, symbol TEXT NOT NULL, payload TEXT NOT NULL, computed_at REAL NOT NULL, PRIMARY KEY (tool, symbol))")
+    return conn
+
+def is_market_open(now: datetime = None) -> bool:
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+def last_market_close(now: datetime = None) -> datetime:
+    """The most recent weekday close at or before `now` (exchange holidays are not modelled)."""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    close = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TZ)
+    if close > now: close -= timedelta(days=1)
+    while close.weekday() >= 5: close -= timedelta(days=1)
+    return close
+
+def save_snapshot(tool: str, symbol: str, payload: dict, computed_at: float = None):
+    conn = _connect()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO snapshots (tool, symbol, payload, computed_at) VALUES (?, ?, ?, ?)",
+                     (tool, symbol.upper(), json.dumps(payload), computed_at or time.time()))
+
+def load_snapshot(tool: str, symbol: str, max_age: float = SNAPSHOT_MAX_AGE):
+    """Returns the stored payload if it is still fresh enough to serve, otherwise None."""
+    row = _connect().execute("SELECT payload, computed_at FROM snapshots WHERE tool = ? AND symbol = ?", (tool, symbol.upper())).fetchone()
+    if row is None: return None
+    payload, computed_at = row
+    age = time.time() - computed_at
+    fresh = age <= max_age or (not is_market_open() and computed_at >= last_market_close().timestamp())
+    return json.loads(payload) if fresh else None
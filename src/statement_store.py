@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import logging
+import pandas as pd
+import yfinance as yf
+from src.cache import TTLCache
+from src.storage import connect_sqlite
+from src.singleflight import analysis_flight
+from src.rate_limit import outbound
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_DB = "statements.db"
+# A company's next period is not expected before its latest period end plus the period length plus the filing lag
+# (SEBI allows 45 days for quarterly results and 60 for annual ones); until then the stored statements are served as they are.
+QUARTERLY_FILING_LAG_DAYS = int(os.environ.get("FN_QUARTERLY_FILING_LAG_DAYS", 45))
+ANNUAL_FILING_LAG_DAYS = int(os.environ.get("FN_ANNUAL_FILING_LAG_DAYS", 60))
+RECHECK_SECONDS = float(os.environ.get("FN_STATEMENT_RECHECK_HOURS", 24)) * 3600  # Once a period is due, Yahoo is asked at most this often.
+EMPTY_RECHECK_SECONDS = 7 * 86400  # Symbols with no statements at all (ETFs, indices).
+_memory = TTLCache(ttl=3600, maxsize=2048)
+
+# Canonical item -> Yahoo row labels in order of preference, per statement.
+INCOME_ITEMS = {"revenue": ("Total Revenue", "Operating Revenue"), "net_income": ("Net Income", "Net Income Common Stockholders"),
+                "eps": ("Diluted EPS", "Basic EPS")}
+BALANCE_ITEMS = {"total_debt": ("Total Debt",), "equity": ("Stockholders Equity", "Common Stock Equity")}
+# frequency -> (income statement attribute, balance sheet attribute, period length in months, filing lag in days)
+FREQUENCIES = {"quarterly": ("quarterly_income_stmt", "quarterly_balance_sheet", 3, QUARTERLY_FILING_LAG_DAYS),
+               "annual": ("income_stmt", "balance_sheet", 12, ANNUAL_FILING_LAG_DAYS)}
+
+def _connect():
+    conn = connect_sqlite(STATEMENT_DB)
+    conn.execute("CREATE TABLE IF NOT EXISTS statements (symbol TEXT PRIMARY KEY, payload TEXT NOT NULL, fetched_at REAL NOT NULL, checked_at REAL NOT NULL)")
+    return conn
+
+def _items(frame: pd.DataFrame, items: dict) -> dict:
+    """{item: {period end: value}} for the canonical items present in a Yahoo statement frame (rows are labels, columns periods)."""
+    out = {}
+    if frame is None or frame.empty: return out
+    for item, labels in items.items():
+        label = next((label for label in labels if label in frame.index), None)
+        if label is None: continue
+        series = frame.loc[label].dropna()
+        if not series.empty: out[item] = {pd.Timestamp(period).strftime("%Y-%m-%d"): float(value) for period, value in series.items()}
+    return out
+
+def _download(symbol: str) -> dict:
+    ticker = yf.Ticker(symbol); payload = {}
+    for frequency, (income, balance, _, _) in FREQUENCIES.items():
+        payload[frequency] = {**_items(outbound("yahoo", lambda: getattr(ticker, income)), INCOME_ITEMS),
+                              **_items(outbound("yahoo", lambda: getattr(ticker, balance)), BALANCE_ITEMS)}
+    return payload
+
+def latest_period(payload: dict, frequency: str):
+    periods = [period for series in payload.get(frequency, {}).values() for period in series]
+    return max(periods) if periods else None
+
+def next_period_due(payload: dict) -> float:
+    """Epoch seconds from which a newer quarterly or annual period can have been published."""
+    due = []
+    for frequency, (_, _, months, lag_days) in FREQUENCIES.items():
+        latest = latest_period(payload, frequency)
+        if latest: due.append((pd.Timestamp(latest) + pd.DateOffset(months=months) + pd.Timedelta(days=lag_days)).timestamp())
+    return min(due) if due else 0.0
+
+def _needs_refresh(payload: dict, checked_at: float, now: float) -> bool:
+    if not any(payload.values()): return now - checked_at >= EMPTY_RECHECK_SECONDS
+    return now >= next_period_due(payload) and now - checked_at >= RECHECK_SECONDS
+
+def _refresh(symbol: str, stored) -> dict:
+    now = time.time()
+    try:
+        payload = _download(symbol)
+    except Exception as e:
+        if stored is None: raise
+        logger.warning("Statement refresh for %s failed, serving stored statements: %s", symbol, e)
+        _memory.set(symbol, (stored[0], now))  # Back off until the next recheck instead of retrying on every query.
+        return stored[0]
+    conn = _connect()
+    with conn:
+        if stored is not None and payload == stored[0]:  # Nothing new yet: only remember that we looked.
+            conn.execute("UPDATE statements SET checked_at = ? WHERE symbol = ?", (now, symbol))
+        else:
+            conn.execute("INSERT OR REPLACE INTO statements (symbol, payload, fetched_at, checked_at) VALUES (?, ?, ?, ?)", (symbol, json.dumps(payload), now, now))
+            logger.info("Stored statements for %s (latest quarter %s, latest year %s)", symbol, latest_period(payload, "quarterly"), latest_period(payload, "annual"))
+    _memory.set(symbol, (payload, now))
+    return payload
+
+def load_statements(symbol: str) -> dict:
+    """
+    Quarterly and annual statement items for a Yahoo symbol: {"quarterly"|"annual": {item: {period end: value}}}.
+    Served from memory or the local store; Yahoo is only asked again once a new reporting period can exist.
+    """
+    symbol = symbol.strip().upper(); now = time.time()
+    stored = _memory.get(symbol)
+    if stored is None:
+        row = _connect().execute("SELECT payload, checked_at FROM statements WHERE symbol = ?", (symbol,)).fetchone()
+        if row is not None: stored = (json.loads(row[0]), row[1]); _memory.set(symbol, stored)
+    if stored is not None and not _needs_refresh(stored[0], stored[1], now): return stored[0]
+    return analysis_flight.do(("statements", symbol, ()), _refresh, symbol, stored)
@@ -1,68 +1,197 @@
+import os
+import hashlib
 import streamlit as st
-import json
-import re
+from concurrent.futures import ThreadPoolExecutor
 from src.agents import LangchainStockAgent
-from src.tools import get_technical_recommendation as direct_get_recommendation
+from src.symbol_master import extract_tickers
+from src.intent_router import get_intent_router, wants_multi_timeframe, wants_peer_comparison
+from src.rendering import technical_card, multi_timeframe_card, technical_card_tickers, live_strip
+from src.live_quotes import live_update, LIVE_POLL_SECONDS
+from src.warmup import SpeculativePrefetch, start_agent_warmup, warmed_agent, last_discussed
+from src.async_runtime import run_sync
+from src.rate_limit import RateLimitedError
+from src.portfolio import parse_holdings, analyze_portfolio
+from src.peers import get_peer_relative_fundamentals
+from src.tools import compute_technical, compute_multi_timeframe, fetch_news, canonical_symbol
 from src.tools import get_fundamental_analysis as direct_get_fundamentals
-from src.tools import get_latest_news_for_summary as direct_get_news
-from langchain_community.chat_message_histories import StreamlitChatMessageHistory
+from src.chat_store import SQLiteChatMessageHistory, PAGE_SIZE, new_browser_id, user_id_for, resolve_session_id, maybe_compact_chat_store
 from langchain_core.messages import AIMessage
 
+# Blocking fetch/compute work fanned out from a single chat turn (full reports, comparisons).
+_analysis_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chat-analysis")
+MAX_LIVE_CARDS = int(os.environ.get("FN_LIVE_MAX_CARDS", 5))  # Live strips are shown under the most recent card of up to this many tickers.
+BROWSER_ID_PARAM = "cid"  # Query parameter holding the per-browser chat id, so a reload or bookmark resumes this browser's chats.
+
 def extract_ticker(prompt: str) -> str:
-    """Extracts a stock ticker reliably from a prompt."""
-    # This corrected regex finds words that are all caps, potentially with a dot.
-    matches = re.findall(r'\b[A-Z][A-Z0-9-]{1,9}(?:\.NS|\.BO)?\b', prompt.upper())
-    if not matches: return None
-    
-    # Exclude common non-ticker uppercase words
-    non_tickers = ["ANALYSIS", "TECHNICAL", "NEWS", "FUNDAMENTAL", "RECOMMENDATION", "PLEASE", "FOR"]
-    matches = [m for m in matches if m not in non_tickers]
-    
-    if not matches: return None
-
-    # Prefer matches with a '.' as they are explicitly tickers.
-    for match in matches:
-        if '.' in match:
-            return match
-            
-    # If no ticker with a '.', pick the shortest remaining all-caps word.
-    matches.sort(key=len)
-    return matches[0]
-
-async def show_stocks_chatbot():
-    """Manages the UI using the final HYBRID approach with all features and bug fixes."""
-    if "stock_chat_messages" not in st.session_state:
-        st.session_state.stock_chat_messages = []
+    """Extracts the first known stock ticker (or company name) from a prompt via the symbol master."""
+    tickers = extract_tickers(prompt)
+    return tickers[0] if tickers else None
+
+def build_technical_answer(ticker: str) -> str:
+    """Runs the technical analysis directly and renders its result as an HTML card."""
+    tool_output = compute_technical(ticker)
+    if tool_output.get("status") != "success": return f"Sorry, an error occurred: {tool_output.get('message', 'Unknown error')}"
+    return technical_card(tool_output.get("symbol") or canonical_symbol(ticker), tool_output)
+
+def build_multi_timeframe_answer(ticker: str) -> str:
+    """Daily, weekly and monthly signals from one daily fetch, rendered with their alignment score."""
+    tool_output = compute_multi_timeframe(ticker)
+    if tool_output.get("status") != "success": return f"Sorry, an error occurred: {tool_output.get('message', 'Unknown error')}"
+    return multi_timeframe_card(canonical_symbol(ticker), tool_output)
+
+def ask_agent(agent, prompt: str) -> dict:
+    """Runs the agent on the shared loop; a provider that stays throttled after retries becomes a polite answer."""
+    try:
+        return run_sync(agent.run_agent_with_history(prompt))
+    except RateLimitedError as e:
+        return {"output": f"⏳ {e}"}
+
+def build_news_answer(ticker: str, agent) -> str:
+    """Fetches the latest news for a ticker and asks the LLM for a short summary of the top article."""
+    tool_output = fetch_news(ticker)
+    if tool_output.get("status") != "success": return f"Sorry, an error occurred: {tool_output.get('message', 'Unknown error')}"
+
+    scraped_text = tool_output.get("scraped_text", "")
+    company_name = tool_output.get("company_name")
+    google_link = tool_output.get("google_news_link")
+    if "Could not scrape" not in scraped_text and scraped_text:
+        summary_prompt = f"Provide a concise, 4-5 line summary of the key points from the following news article text about {company_name}:\n\n---\n{scraped_text}\n---"
+        response_obj = ask_agent(agent, summary_prompt)
+        summary = response_obj.get("output", "Could not summarize the news.")
+        return f"**AI News Summary for {company_name}:**\n\n{summary}\n\n---\n\nFor more details, [view the latest news on Google]({google_link})."
+    return f"I couldn't retrieve the full article for a summary, but here is a reliable link to the latest news for {company_name}:\n\n[Click here to view on Google News]({google_link})"
+
+def browser_id() -> str:
+    """This browser's chat identity, kept in the URL; a browser without one gets a fresh random id."""
+    value = st.query_params.get(BROWSER_ID_PARAM)
+    if not value or len(value) != 32 or not value.isalnum():
+        value = new_browser_id(); st.query_params[BROWSER_ID_PARAM] = value
+    return value
+
+def get_chat_history(provider: str, api_key: str) -> SQLiteChatMessageHistory:
+    """This session's persistent chat history; a returning browser resumes its latest recent session."""
+    user_id = user_id_for(browser_id(), provider, api_key)
+    if st.session_state.get("chat_user_id") != user_id:
+        maybe_compact_chat_store()
+        st.session_state.chat_user_id = user_id
+        st.session_state.chat_session_id = resolve_session_id(user_id)
+        st.session_state.chat_visible = PAGE_SIZE
+    return SQLiteChatMessageHistory(st.session_state.chat_session_id, user_id)
+
+def session_prefetch() -> SpeculativePrefetch:
+    return st.session_state.setdefault("speculative_prefetch", SpeculativePrefetch())
+
+def warm_up_session(provider: str, api_key: str):
+    """
+    Called when login succeeds: starts building the agent and LLM clients in the background, and prefetches the
+    tickers a resumed chat last asked about, so the first prompt does not pay for either.
+    """
+    msgs = get_chat_history(provider, api_key)
+    st.session_state.agent_warmup = start_agent_warmup(provider, api_key, msgs)
+    session_prefetch().predict(last_discussed(msgs.recent(PAGE_SIZE)), background=True)
+
+def session_agent(provider: str, api_key: str, msgs: SQLiteChatMessageHistory) -> LangchainStockAgent:
+    """The session's agent: the current one, else the one the warm-up built, else built now."""
+    agent = st.session_state.get("langchain_stock_agent")
+    if agent is not None and agent.provider == provider and agent.msgs.session_id == msgs.session_id: return agent
+    agent = warmed_agent(st.session_state.pop("agent_warmup", None), provider, msgs.session_id)
+    if agent is None:
+        with st.spinner("Initializing agent..."): agent = LangchainStockAgent(provider, api_key, msgs)
+    st.session_state.langchain_stock_agent = agent
+    return agent
+
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def show_live_strip(ticker: str):
+    """Re-renders on its own timer, reading the shared poller's latest quote; the rest of the page is not rerun."""
+    ticker = canonical_symbol(ticker)  # Cards saved before titles carried the resolved listing may hold a bare spelling.
+    st.markdown(live_strip(ticker, live_update(ticker, st.session_state.chat_session_id)), unsafe_allow_html=True)
+
+def _live_cards(messages: list) -> set:
+    """(message index, ticker) for the most recent card of each ticker, newest first, up to MAX_LIVE_CARDS tickers."""
+    chosen, seen = set(), set()
+    for i in range(len(messages) - 1, -1, -1):
+        for ticker in technical_card_tickers(str(messages[i].content)):
+            if ticker not in seen and len(seen) < MAX_LIVE_CARDS: seen.add(ticker); chosen.add((i, ticker))
+    return chosen
 
+def show_chat_messages(msgs: SQLiteChatMessageHistory):
+    """Renders only the most recent page(s) of the chat, with a control to reveal earlier messages."""
+    messages, has_earlier = msgs.page(st.session_state.chat_visible)
+    if has_earlier and st.button("⬆️ Load earlier messages", key="chat_load_earlier"):
+        st.session_state.chat_visible += PAGE_SIZE
+        messages, has_earlier = msgs.page(st.session_state.chat_visible)
+    live = _live_cards(messages) if st.session_state.get("live_mode") else set()
+    for i, msg in enumerate(messages):
+        with st.chat_message(msg.type):
+            st.markdown(str(msg.content), unsafe_allow_html=True)
+            for ticker in technical_card_tickers(str(msg.content)) if live else ():
+                if (i, ticker) in live: show_live_strip(ticker)
+
+def show_portfolio_analysis(analysis: dict):
+    holdings = analysis["holdings"]; risk = analysis["risk"]; confidence = int(analysis["confidence"] * 100)
+    if analysis["unpriced"]: st.warning(f"No price history for: {', '.join(analysis['unpriced'])}")
+    if analysis["mixed_currency"] and analysis["fx_rate"]: st.info(f"US listings are converted to INR at each day's USDINR rate (latest {analysis['fx_rate']:.2f}).")
+    elif analysis["mixed_currency"]: st.warning("No USDINR rate was available, so the US listings are left out.")
+    cols = st.columns(4)
+    cols[0].metric("Portfolio Value", f"{analysis['total_value']:,.0f}")
+    cols[1].metric("Positions", analysis["positions"])
+    technical = analysis["technical"]; fundamental = analysis["fundamental"]
+    cols[2].metric("Weighted Technical Score", f"{technical['score']:+.1f}" if technical["score"] is not None else "N/A", help="Built-in daily rule, -6 to +6, weighted by position value.")
+    cols[3].metric("Weighted Fundamental Score", f"{fundamental['score']:.1f}" if fundamental["score"] is not None else "N/A", help=f"Covers the largest holdings ({fundamental['covered_weight']:.0%} of value).")
+    if risk:
+        cols = st.columns(4)
+        cols[0].metric("Annualized Volatility", f"{risk['volatility']:.1%}")
+        cols[1].metric(f"1-Day VaR ({confidence}%)", f"{risk['var']:.2%}", help="Historical: the daily loss exceeded on the worst days in the window.")
+        cols[2].metric(f"1-Day CVaR ({confidence}%)", f"{risk['cvar']:.2%}", help="Average loss on the days beyond the VaR.")
+        cols[3].metric("Max Drawdown", f"{risk['max_drawdown']:.1%}", delta=f"{risk['current_drawdown']:.1%} now", delta_color="off")
+        st.caption(f"Risk model: {risk['observations']} aligned daily returns up to {analysis['as_of']}, covering {risk['covered_weight']:.0%} of portfolio value.")
+    else:
+        st.info("Not enough overlapping price history to estimate portfolio risk.")
+    table = holdings.assign(weight=holdings["weight"] * 100)
+    if "risk_contribution" in table: table["risk_contribution"] *= 100
+    st.dataframe(table, hide_index=True, use_container_width=True,
+                 column_config={"weight": st.column_config.NumberColumn("Weight", format="%.2f%%"), "risk_contribution": st.column_config.NumberColumn("Risk Share", format="%.2f%%")})
+    st.bar_chart(analysis["sectors"])
+    if risk:
+        top = holdings["symbol"].head(25); top = [s for s in top if s in risk["correlation"].index]
+        st.markdown("**Correlation of the largest positions**")
+        st.dataframe(risk["correlation"].loc[top, top].round(2), use_container_width=True)
+
+def show_portfolio_mode():
+    """Holdings CSV upload; results are kept per file content so reruns don't recompute them."""
+    with st.expander("📁 Portfolio analysis (upload holdings CSV)"):
+        upload = st.file_uploader("Holdings CSV with `symbol` and `quantity` columns", type=["csv"], key="portfolio_upload")
+        if upload is None: return
+        data = upload.getvalue(); digest = hashlib.sha1(data).hexdigest()
+        if st.session_state.get("portfolio_digest") != digest:
+            try:
+                holdings = parse_holdings(data)
+            except ValueError as e:
+                st.error(str(e)); return
+            with st.spinner(f"Analyzing {len(holdings)} positions..."):
+                st.session_state.portfolio_analysis = analyze_portfolio(holdings)
+            st.session_state.portfolio_digest = digest
+        analysis = st.session_state.portfolio_analysis
+        if analysis["status"] != "success": st.error(analysis["message"]); return
+        show_portfolio_analysis(analysis)
+
+def show_stocks_chatbot():
+    """Manages the UI using the final HYBRID approach with all features and bug fixes."""
     st.title("📊 Financial Navigator Chatbot")
-    st.markdown("Ask for a recommendation, fundamentals, or news.")
-
-    st.markdown("""
-    <style>
-        .analysis-container { border: 1px solid #e9ecef; border-radius: 12px; padding: 25px; background-color: #ffffff; margin-top: 1em; box-shadow: 0 4px 12px rgba(0,0,0,0.08); }
-        .analysis-container h4 { color: #0d6efd; border-bottom: 2px solid #f0f2f6; padding-bottom: 10px; margin-top: 0; }
-        .analysis-container h5 { margin-top: 20px; margin-bottom: 10px; color: #495057; font-size: 1.1em; }
-        .rec-percent { font-size: 1.1em; font-weight: 600; padding: 8px 12px; border-radius: 8px; text-align: center; display: inline-block; margin: 3px; }
-        .buy { background-color: #d1e7dd; color: #0f5132; }
-        .hold { background-color: #fff3cd; color: #664d03; }
-        .sell { background-color: #f8d7da; color: #842029; }
-        .verdict-verystrong, .verdict-strong { color: #0f5132; font-weight: 700; }
-        .verdict-average { color: #664d03; font-weight: 700; }
-        .verdict-weak { color: #842029; font-weight: 700; }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown("Ask for a recommendation, fundamentals, news, a full report, or compare stocks.")
 
     current_api_key = st.session_state.get("api_key", ""); current_llm_provider = st.session_state.get("llm_provider", "Groq")
     if not current_api_key: st.warning("Please enter your API key on the login page."); return
-    msgs = StreamlitChatMessageHistory(key="stock_chat_messages")
+    show_portfolio_mode()
+    msgs = get_chat_history(current_llm_provider, current_api_key)
 
-    if "langchain_stock_agent" not in st.session_state or st.session_state.langchain_stock_agent.provider != current_llm_provider:
-        with st.spinner("Initializing agent..."):
-            st.session_state.langchain_stock_agent = LangchainStockAgent(current_llm_provider, current_api_key)
+    # The agent is only needed by some prompts, so it is built in the background and awaited when a prompt needs it.
+    agent = st.session_state.get("langchain_stock_agent")
+    if (agent is None or agent.provider != current_llm_provider or agent.msgs.session_id != msgs.session_id) and "agent_warmup" not in st.session_state:
+        st.session_state.agent_warmup = start_agent_warmup(current_llm_provider, current_api_key, msgs)
 
-    for msg in msgs.messages:
-        with st.chat_message(msg.type):
-            st.markdown(str(msg.content), unsafe_allow_html=True)
+    st.toggle("🔴 Live prices", key="live_mode", help="Keep the technical cards below updated with live quotes while this tab is open.")
+    show_chat_messages(msgs)
 
     if prompt := st.chat_input("e.g., recommendation for AAPL"):
         msgs.add_user_message(prompt)
@@ -70,55 +199,48 @@ async def show_stocks_chatbot():
 
         with st.chat_message("assistant"):
             with st.spinner("Analyzing..."):
-                final_answer = ""; prompt_lower = prompt.lower()
-                ticker = extract_ticker(prompt); agent = st.session_state.langchain_stock_agent
-                
-                if ticker and "news" in prompt_lower:
+                tickers = extract_tickers(prompt)
+                route = get_intent_router().route(prompt, tickers)
+                # Direct routes fetch right away; for the agent, start its likely tool fetches while it is still reasoning.
+                prefetch = session_prefetch()
+                if route.intent is None and tickers: prefetch.predict(tickers)
+                else: prefetch.cancel()
+                agent = session_agent(current_llm_provider, current_api_key, msgs) if route.intent in (None, "news", "full_report") else None
+
+                if route.intent == "news":
                     st.info("Getting latest news and AI summary...")
-                    tool_output_str = direct_get_news.invoke({"symbol": ticker})
-                    tool_output = json.loads(tool_output_str)
-
-                    if tool_output.get("status") == "success":
-                        scraped_text = tool_output.get("scraped_text", "")
-                        company_name = tool_output.get("company_name")
-                        google_link = tool_output.get("google_news_link")
-
-                        if "Could not scrape" not in scraped_text and scraped_text:
-                            summary_prompt = f"Provide a concise, 4-5 line summary of the key points from the following news article text about {company_name}:\n\n---\n{scraped_text}\n---"
-                            response_obj = await agent.run_agent_with_history(summary_prompt)
-                            summary = response_obj.get("output", "Could not summarize the news.")
-                            final_answer = f"**AI News Summary for {company_name}:**\n\n{summary}\n\n---\n\nFor more details, [view the latest news on Google]({google_link})."
-                        else:
-                            final_answer = f"I couldn't retrieve the full article for a summary, but here is a reliable link to the latest news for {company_name}:\n\n[Click here to view on Google News]({google_link})"
-                    else: final_answer = f"Sorry, an error occurred: {tool_output.get('message', 'Unknown error')}"
-                
-                elif ticker and "fundamental" in prompt_lower:
+                    final_answer = build_news_answer(tickers[0], agent)
+                elif route.intent == "fundamental" and wants_peer_comparison(prompt):
+                    st.info("Comparing fundamentals with sector peers...")
+                    final_answer = get_peer_relative_fundamentals.invoke({"symbol": tickers[0]})
+                elif route.intent == "fundamental":
                     st.info("Using direct fundamental analysis tool...")
-                    final_answer = direct_get_fundamentals.invoke({"symbol": ticker})
-
-                elif ticker and any(word in prompt_lower for word in ["recommend", "analysis", "analyze", "prediction", "technical"]):
+                    final_answer = direct_get_fundamentals.invoke({"symbol": tickers[0]})
+                elif route.intent == "technical" and wants_multi_timeframe(prompt):
+                    st.info("Checking daily, weekly and monthly timeframes...")
+                    final_answer = build_multi_timeframe_answer(tickers[0])
+                elif route.intent == "technical":
                     st.info("Using direct technical analysis tool...")
-                    tool_output_str = direct_get_recommendation.invoke({"symbol": ticker})
-                    tool_output = json.loads(tool_output_str)
-                    if tool_output.get("status") == "success":
-                        text_analysis = tool_output.get("text_analysis", "")
-                        rec_percent = tool_output.get("recommendation_percent", {})
-                        targets = tool_output.get("price_targets", {})
-                        final_answer = f'<div class="analysis-container">'
-                        final_answer += f"<h4>📈 Technical Snapshot for {ticker}</h4>"
-                        final_answer += f"<h5>Key Signals</h5><p>{text_analysis.replace('•', '<br>•')}</p><hr>"
-                        final_answer += f"<h5>Key Price Levels</h5><p><strong>Current:</strong> {targets.get('current', 'N/A')}<br><strong>Support:</strong> {targets.get('support', 'N/A')}<br><strong>Resistance:</strong> {targets.get('resistance', 'N/A')}</p><hr>"
-                        final_answer += "<h5>Recommendation</h5>"
-                        rec_html = " ".join([f'<span class="rec-percent {cat.lower()}">{cat}: {val}%</span>' for cat, val in rec_percent.items()])
-                        final_answer += f"<p>{rec_html}</p>"
-                        final_answer += "</div>"
-                    else: final_answer = f"Sorry, an error occurred: {tool_output.get('message', 'Unknown error')}"
-                
+                    final_answer = build_technical_answer(tickers[0])
+                elif route.intent == "full_report":
+                    st.info("Building a full report: technicals, fundamentals and news...")
+                    technical = _analysis_pool.submit(build_technical_answer, tickers[0])
+                    fundamental = _analysis_pool.submit(direct_get_fundamentals.invoke, {"symbol": tickers[0]})
+                    news = build_news_answer(tickers[0], agent)
+                    final_answer = "\n\n".join([technical.result(), fundamental.result(), news])
+                elif route.intent == "compare":
+                    st.info(f"Comparing {', '.join(tickers)}...")
+                    final_answer = "\n\n".join(_analysis_pool.map(build_technical_answer, tickers))
+                elif route.intent == "sip":
+                    final_answer = "That sounds like a SIP planning question. Open the **SIP Plan** tab above to get a personalized, phase-wise SIP strategy and a wealth projection."
                 else: # Fallback
                     st.info("Using AI Agent for conversational response...")
-                    response_obj = await agent.run_agent_with_history(prompt)
+                    response_obj = ask_agent(agent, prompt)
                     final_answer = response_obj.get("output", "I'm not sure how to help with that.")
                 
+                prefetch.cancel()  # Predictions the agent never needed and that have not started yet.
                 st.markdown(final_answer, unsafe_allow_html=True)
+                if st.session_state.get("live_mode"):
+                    for ticker in list(dict.fromkeys(technical_card_tickers(final_answer)))[:MAX_LIVE_CARDS]: show_live_strip(ticker)
                 st.markdown("\n*Disclaimer: This information is for educational purposes only.*")
                 msgs.add_message(AIMessage(content=final_answer))
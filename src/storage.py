@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import threading
+
+# Local, per-deployment state (snapshots, chat history, cached market data) lives under one directory.
+DATA_DIR = os.environ.get("FN_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".fn_data"))
+
+def data_path(*parts: str) -> str:
+    """Returns a path inside DATA_DIR, creating its parent directory."""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+_connections = threading.local()
+
+def connect_sqlite(name: str) -> sqlite3.Connection:
+    """
+    Returns this thread's connection to DATA_DIR/<name>, opened in WAL mode so readers
+    (Streamlit sessions, the API) never block on the writer (precompute job, chat inserts).
+    """
+    cache = getattr(_connections, "by_name", None)
+    if cache is None: cache = _connections.by_name = {}
+    conn = cache.get(name)
+    if conn is None:
+        conn = sqlite3.connect(data_path(name), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        cache[name] = conn
+    return conn
@@ -0,0 +1,142 @@
+import os
+import json
+import logging
+import threading
+from pydantic import ValidationError
+from langchain_core.messages import AIMessage, HumanMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_STRUCTURED_CHARS = int(os.environ.get("FN_STRUCTURED_MAX_CHARS", 20000))
+MAX_LEAD_CHARS = 200  # Preamble tolerated before the opening brace, e.g. a ```json fence or "Here is your plan:".
+REPAIR_PROMPT = """Your previous reply is not a valid JSON object for the required schema.
+
+Problems found:
+{errors}
+
+Required JSON Schema:
+{schema}
+
+Reply with only the corrected JSON object. Keep everything that was already valid and fix only the problems above."""
+
+class JSONStreamValidator:
+    """
+    Incremental syntax check for a streamed JSON object. It tracks strings, escapes and bracket nesting chunk by chunk,
+    so a reply that goes wrong (prose instead of JSON, a mismatched bracket, runaway length) is caught mid-stream
+    and the rest of it is never paid for. `complete` turns True as soon as the top-level object closes.
+    """
+    def __init__(self, max_chars: int = MAX_STRUCTURED_CHARS):
+        self.max_chars = max_chars; self._chunks = []; self.length = 0
+        self.start = None; self.end = None; self._stack = []; self._in_string = False; self._escaped = False
+        self.error = None
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    @property
+    def json_text(self) -> str:
+        return self.text[self.start:self.end] if self.start is not None else ""
+
+    def feed(self, chunk: str) -> bool:
+        """Consumes a chunk; returns False once the stream should stop (object complete or an error found)."""
+        offset = self.length; self._chunks.append(chunk); self.length += len(chunk)
+        for i, ch in enumerate(chunk):
+            position = offset + i
+            if self.start is None:
+                if ch == "{": self.start = position; self._stack.append("}")
+                elif position >= MAX_LEAD_CHARS: self.error = f"No JSON object starts within the first {MAX_LEAD_CHARS} characters."
+            elif self._in_string:
+                if self._escaped: self._escaped = False
+                elif ch == "\\": self._escaped = True
+                elif ch == '"': self._in_string = False
+                elif ch in "\n\r": self.error = f"Unescaped line break inside a string at character {position - self.start}."
+            elif ch == '"': self._in_string = True
+            elif ch in "{[": self._stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                expected = self._stack.pop()
+                if ch != expected: self.error = f"Expected '{expected}' but found '{ch}' at character {position - self.start}."
+                elif not self._stack: self.end = position + 1; return False
+            elif not (ch.isspace() or ch.isalnum() or ch in ",:.+-"):
+                self.error = f"Unexpected character {ch!r} at character {position - self.start}."
+            if self.error: return False
+        if self.length > self.max_chars:
+            self.error = f"The reply exceeded {self.max_chars} characters without completing the JSON object."
+            return False
+        return True
+
+_stats = {"requests": 0, "valid_first_try": 0, "repaired": 0, "failed": 0, "early_stops": 0, "streamed_tokens": 0, "wasted_tokens": 0}
+_stats_lock = threading.Lock()
+
+def _count(**deltas):
+    with _stats_lock:
+        for name, delta in deltas.items(): _stats[name] += delta
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4  # ~4 characters per token; close enough to compare runs.
+
+def structured_output_stats() -> dict:
+    """Request counts, regeneration rate (share of requests needing the repair call) and estimated tokens streamed vs discarded."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["regeneration_rate"] = round((stats["repaired"] + stats["failed"]) / stats["requests"], 3) if stats["requests"] else None
+    stats["wasted_token_share"] = round(stats["wasted_tokens"] / stats["streamed_tokens"], 3) if stats["streamed_tokens"] else None
+    return stats
+
+async def _stream_json(router, messages: list) -> JSONStreamValidator:
+    validator = JSONStreamValidator()
+    stream = router.astream(messages, json_mode=True)
+    try:
+        async for chunk in stream:
+            if not validator.feed(str(chunk.content)): break
+    finally:
+        await stream.aclose()  # Stops the provider once the object is complete or known to be broken.
+    _count(streamed_tokens=_estimate_tokens(validator.text), early_stops=int(validator.error is not None))
+    return validator
+
+def _validate(model, draft: JSONStreamValidator, check=None) -> tuple:
+    """Returns (parsed model, []) for a valid draft, else (None, readable problems with their JSON locations)."""
+    if draft.error: return None, [draft.error]
+    if not draft.complete: return None, ["The reply ended before the JSON object was closed."]
+    try:
+        data = json.loads(draft.json_text)
+    except json.JSONDecodeError as e:
+        return None, [f"Invalid JSON: {e.msg} at character {e.pos}."]
+    try:
+        parsed = model.model_validate(data)
+    except ValidationError as e:
+        return None, [f"{'.'.join(str(part) for part in error['loc']) or '(root)'}: {error['msg']}" for error in e.errors()]
+    problems = check(parsed) if check else []
+    return (None, problems) if problems else (parsed, [])
+
+async def generate_structured(router, messages: list, model, check=None) -> tuple:
+    """
+    Streams a JSON reply (native JSON mode where the provider has one) and validates it as it arrives against the
+    pydantic `model` plus the optional `check(parsed) -> [problems]`. An invalid draft gets exactly one targeted
+    repair call carrying the problems and the schema, instead of a blind regeneration.
+    Returns (parsed model or None, raw text of the last attempt).
+    """
+    _count(requests=1)
+    draft = await _stream_json(router, messages)
+    parsed, problems = _validate(model, draft, check)
+    if parsed is not None:
+        _count(valid_first_try=1)
+        return parsed, draft.text
+
+    logger.info("Structured output invalid after %d characters (%s); sending one repair call", draft.length, "; ".join(problems[:3]))
+    _count(wasted_tokens=_estimate_tokens(draft.text))
+    repair_messages = [*messages, AIMessage(content=draft.text),
+                       HumanMessage(content=REPAIR_PROMPT.format(errors="\n".join(f"- {p}" for p in problems), schema=json.dumps(model.model_json_schema())))]
+    repaired = await _stream_json(router, repair_messages)
+    parsed, problems = _validate(model, repaired, check)
+    if parsed is None:
+        _count(failed=1, wasted_tokens=_estimate_tokens(repaired.text))
+        logger.warning("Structured output still invalid after repair: %s", "; ".join(problems[:3]))
+    else:
+        _count(repaired=1)
+    logger.info("Structured output stats: %s", structured_output_stats())
+    return parsed, repaired.text
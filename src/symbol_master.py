@@ -0,0 +1,162 @@
+import os
+import re
+import csv
+import sys
+from bisect import bisect_left
+from functools import lru_cache
+
+DEFAULT_SYMBOL_FILE = os.path.join(os.path.dirname(__file__), "data", "symbols.csv")
+SYMBOL_FILE = os.environ.get("FN_SYMBOL_MASTER", DEFAULT_SYMBOL_FILE)
+
+# Exchange codes in the master file map to Yahoo Finance suffixes; earlier codes are the preferred listing.
+EXCHANGE_SUFFIXES = {"NS": ".NS", "BO": ".BO", "US": ""}
+NAME_SUFFIXES = {"limited", "ltd", "inc", "incorporated", "corporation", "corp", "company", "co", "plc", "the", "group", "holdings"}
+MAX_NAME_TOKENS = 6
+# Capitalised words that are far more likely to be jargon than a ticker in a stock-analysis chat.
+AMBIGUOUS_TOKENS = {"MA", "ALL", "IT", "ON", "NOW", "ARE", "SO", "AI", "US", "FOR", "PLEASE", "NEWS", "ANALYSIS", "TECHNICAL",
+                    "FUNDAMENTAL", "RECOMMENDATION", "SIP", "ETF", "IPO", "NSE", "BSE", "EPS", "PE", "ROE", "RSI", "MACD", "SMA",
+                    "EMA", "CAGR", "INR", "USD", "YOY", "QOQ", "FY", "AND", "OR", "THE", "VS"}
+
+_VALID_SYMBOL = re.compile(r"^[A-Z0-9&^][A-Z0-9&^-]{0,14}(?:\.[A-Z]{1,3})?$")
+_TICKER_TOKEN = re.compile(r"[A-Za-z0-9&^-]+(?:\.[A-Za-z]{2}\b)?")
+_NAME_TOKEN = re.compile(r"[a-z0-9&]+")
+
+def is_valid_symbol(symbol: str) -> bool:
+    """Cheap syntactic check so obviously malformed symbols never reach Yahoo Finance."""
+    return bool(symbol) and bool(_VALID_SYMBOL.match(symbol.strip().upper()))
+
+def _normalize_name(text: str) -> str:
+    return " ".join(_NAME_TOKEN.findall(text.lower().replace("'", "").replace(".", "")))
+
+class SymbolMaster:
+    """
+    Compact in-memory index over the local symbol master file.
+    Rows are kept in parallel tuples; every index maps a key to a row number, so exact
+    ticker and name lookups are single dict probes and prefix search is a bisect over sorted names.
+    """
+    __slots__ = ("symbols", "names", "sectors", "listings", "_by_symbol", "_by_alias", "_sorted_names", "_sorted_rows", "_by_sector")
+
+    def __init__(self, rows):
+        symbols, names, sectors, listings = [], [], [], []
+        by_symbol, by_alias = {}, {}
+        for row_id, row in enumerate(rows):
+            base = row["symbol"].strip().upper()
+            codes = [code for code in row.get("exchanges", "US").split("|") if code in EXCHANGE_SUFFIXES] or ["US"]
+            symbols.append(sys.intern(base)); names.append(row["name"].strip())
+            sectors.append(sys.intern(row.get("sector", "").strip()))
+            listings.append(tuple(sys.intern(base + EXCHANGE_SUFFIXES[code]) for code in codes))
+
+            for listed in listings[-1]: by_symbol.setdefault(listed, row_id)
+            by_symbol.setdefault(base, row_id)  # A bare base symbol resolves to the preferred listing.
+
+            name = _normalize_name(row["name"])
+            tokens = name.split()
+            while tokens and tokens[-1] in NAME_SUFFIXES: tokens.pop()
+            while tokens and tokens[0] in NAME_SUFFIXES: tokens.pop(0)
+            short_name = " ".join(tokens)
+            for alias in (name, short_name):
+                if alias and (len(alias) >= 4 or " " in alias): by_alias.setdefault(alias, row_id)
+            for alias in filter(None, (row.get("aliases") or "").split("|")):
+                by_alias.setdefault(_normalize_name(alias), row_id)
+
+        self.symbols, self.names, self.sectors, self.listings = tuple(symbols), tuple(names), tuple(sectors), tuple(listings)
+        self._by_symbol, self._by_alias = by_symbol, by_alias
+        ordered = sorted(by_alias.items())
+        self._sorted_names = tuple(alias for alias, _ in ordered)
+        self._sorted_rows = tuple(row_id for _, row_id in ordered)
+        by_sector = {}
+        for row_id, sector in enumerate(self.sectors):
+            if sector: by_sector.setdefault(sector, []).append(row_id)
+        self._by_sector = {sector: tuple(rows) for sector, rows in by_sector.items()}
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(csv.DictReader(f))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _preferred(self, row_id: int) -> str:
+        return self.listings[row_id][0]
+
+    def lookup(self, symbol: str):
+        """Exact ticker lookup. Returns the Yahoo symbol ('TCS' -> 'TCS.NS', 'TCS.BO' -> 'TCS.BO') or None."""
+        if not symbol: return None
+        key = symbol.strip().upper()
+        row_id = self._by_symbol.get(key)
+        if row_id is None: return None
+        return key if key in self.listings[row_id] else self._preferred(row_id)
+
+    def lookup_name(self, name: str):
+        """Exact company-name or alias lookup ('Tata Motors' -> 'TATAMOTORS.NS')."""
+        row_id = self._by_alias.get(_normalize_name(name))
+        return None if row_id is None else self._preferred(row_id)
+
+    def search(self, prefix: str, limit: int = 10) -> list:
+        """Returns up to `limit` (symbol, company name) pairs whose name or alias starts with `prefix`."""
+        prefix = _normalize_name(prefix)
+        if not prefix: return []
+        results, seen = [], set()
+        for i in range(bisect_left(self._sorted_names, prefix), len(self._sorted_names)):
+            if not self._sorted_names[i].startswith(prefix) or len(results) >= limit: break
+            row_id = self._sorted_rows[i]
+            if row_id not in seen:
+                seen.add(row_id); results.append((self._preferred(row_id), self.names[row_id]))
+        return results
+
+    def sector_of(self, symbol: str):
+        row_id = self._by_symbol.get((symbol or "").strip().upper())
+        return None if row_id is None else self.sectors[row_id] or None
+
+    def peers(self, sector: str, indian: bool = None) -> list:
+        """Preferred listings of every company in `sector`, optionally only Indian (True) or only US (False) ones."""
+        listings = [self._preferred(row_id) for row_id in self._by_sector.get(sector, ())]
+        if indian is None: return listings
+        return [symbol for symbol in listings if symbol.endswith((".NS", ".BO")) == indian]
+
+    def resolve(self, text: str):
+        """Resolves a ticker or a company name to a Yahoo symbol, or None if it is not in the master."""
+        return self.lookup(text) or self.lookup_name(text)
+
+    def extract(self, prompt: str) -> list:
+        """
+        Extracts every known symbol from a free-text prompt, in order of appearance.
+        Company names are matched greedily on the longest word n-gram; ticker-like tokens only
+        count when written in capitals or with an exchange suffix, so words like "is" or "buy" never match.
+        Capitalised tickers outside the master are kept as unresolved candidates for the caller to probe.
+        """
+        raw_tokens = _TICKER_TOKEN.findall(prompt or "")
+        name_tokens = [_normalize_name(token) for token in raw_tokens]
+        found, i = [], 0
+        while i < len(raw_tokens):
+            match, width = None, 1
+            for n in range(min(MAX_NAME_TOKENS, len(raw_tokens) - i), 0, -1):
+                row_id = self._by_alias.get(" ".join(t for t in name_tokens[i:i + n] if t))
+                if row_id is not None: match, width = self._preferred(row_id), n; break
+            token = raw_tokens[i]
+            if "." in token or (token.isupper() and len(token) >= 2 and token not in AMBIGUOUS_TOKENS):
+                # An explicit ticker wins over a name match on the same token. Suffixed symbols outside
+                # the master are still honoured, since the user was explicit about the listing.
+                listed = self.lookup(token)
+                if listed: match, width = listed, 1
+                elif token.upper().endswith((".NS", ".BO")) and is_valid_symbol(token): match, width = token.upper(), 1
+                elif match is None and token.isupper() and is_valid_symbol(token): match = token
+            if match and match not in found: found.append(match)
+            i += width
+        return found
+
+@lru_cache(maxsize=1)
+def get_symbol_master() -> SymbolMaster:
+    """Loads the symbol master once per process."""
+    return SymbolMaster.from_file(SYMBOL_FILE)
+
+def resolve_symbol(text: str):
+    return get_symbol_master().resolve(text)
+
+def is_known_symbol(symbol: str) -> bool:
+    """True for symbols the master resolves or that name an exchange explicitly; bare unknown tokens may just be words."""
+    return bool(get_symbol_master().lookup(symbol)) or (symbol or "").upper().endswith((".NS", ".BO"))
+
+def extract_tickers(prompt: str) -> list:
+    return get_symbol_master().extract(prompt)
@@ -1,4 +1,9 @@
+import os
 import json
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import yfinance as yf
 import pandas_ta as ta
@@ -7,120 +12,267 @@ from pydantic import BaseModel, Field
 import urllib.parse
 import requests
 from bs4 import BeautifulSoup
+from src.symbol_master import is_valid_symbol, resolve_symbol
+from src.cache import TTLCache
+from src.singleflight import analysis_flight
+from src.snapshot_store import load_snapshot
+from src.rate_limit import outbound, RateLimitedError, RETRY_STATUSES
+from src.rendering import fundamental_card
+from src.indicators import TIMEFRAMES, compute_timeframes, alignment, score_frame, score_distribution
+from src.profiling import profiled
+from src.compact_history import CompactHistory
+from src.fundamental_trends import trends_for, trend_points, trend_verdict
+
+logger = logging.getLogger(__name__)
+
+# Process-wide symbol caches, shared by every session and tool. Bad symbols are remembered for their own
+# (shorter) TTL so a retried FOO / FOO.NS / FOO.BO fails without another Yahoo round trip.
+NEGATIVE_CACHE_TTL = float(os.environ.get("FN_NEGATIVE_CACHE_TTL", 900))
+RESOLVED_CACHE_TTL = float(os.environ.get("FN_RESOLVED_CACHE_TTL", 3600))
+_invalid_symbols = TTLCache(ttl=NEGATIVE_CACHE_TTL, maxsize=4096)
+_resolved_symbols = TTLCache(ttl=RESOLVED_CACHE_TTL, maxsize=4096)
+# Successful analyses are cached process-wide too, so the Streamlit app and the headless service share results.
+ANALYSIS_CACHE_TTL = float(os.environ.get("FN_ANALYSIS_CACHE_TTL", 300))
+_technical_cache = TTLCache(ttl=ANALYSIS_CACHE_TTL, maxsize=1024)
+_fundamental_cache = TTLCache(ttl=ANALYSIS_CACHE_TTL, maxsize=1024)
+_timeframe_cache = TTLCache(ttl=ANALYSIS_CACHE_TTL, maxsize=2048)  # (symbol, timeframe) -> signals, so each timeframe expires on its own.
+MULTI_TIMEFRAME_PERIOD = "5y"  # Enough daily bars to resample into ~60 monthly bars.
+_probe_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix="symbol-probe")
 
 class StockSymbolInput(BaseModel):
     """Input model for tools that require a stock symbol."""
     symbol: str = Field(description="The stock ticker symbol. For Indian stocks, use a suffix like .NS. For US stocks, use the ticker directly.")
 
+def _symbol_variants(symbol: str) -> list:
+    """A bare symbol may be listed as-is, on NSE or on BSE; a suffixed one is probed as given."""
+    return [symbol] if "." in symbol else [symbol, f"{symbol}.NS", f"{symbol}.BO"]
+
+def _probe_symbol(symbol: str):
+    """Returns a Ticker if Yahoo has recent data for the symbol, remembering misses in the negative cache."""
+    ticker = yf.Ticker(symbol)
+    try:
+        if outbound("yahoo", ticker.history, period="1d").empty:
+            _invalid_symbols.set(symbol, True)
+            return None
+    except RateLimitedError: raise  # Throttling is not "no data": the caller reports it instead of an invalid symbol.
+    except Exception as e:
+        logger.warning("Probe for %s failed: %s", symbol, e)  # Transient failures are not negatively cached.
+        return None
+    return ticker
+
+def _find_listed_ticker(symbol: str):
+    """
+    Probes the not-known-bad suffix variants of a symbol concurrently and picks by a fixed preference (as given,
+    then .NS, then .BO), so a symbol listed in several places always resolves to the same listing.
+    Raises RateLimitedError when no listing was found but Yahoo throttled at least one probe.
+    """
+    resolved = _resolved_symbols.get(symbol)
+    if resolved: return yf.Ticker(resolved)
+    variants = [variant for variant in _symbol_variants(symbol) if variant not in _invalid_symbols]
+    if not variants: return None
+
+    # Each probe runs in a copy of the caller's context, so it keeps the caller's rate-limit lane.
+    futures = [_probe_pool.submit(contextvars.copy_context().run, _probe_symbol, variant) for variant in variants]
+    throttled = None
+    for future in futures:  # In preference order: a later listing only wins once every earlier one has no data.
+        try:
+            ticker = future.result()
+        except RateLimitedError as e:
+            throttled = e; continue
+        if ticker is not None:
+            for pending in futures: pending.cancel()
+            # A throttled preferred listing may still exist, so only an unambiguous choice is remembered.
+            if throttled is None: _resolved_symbols.set(symbol, ticker.ticker)
+            return ticker
+    if throttled is not None: raise throttled  # Some listing could not be checked: report throttling, not an invalid symbol.
+    return None
+
+def canonical_symbol(symbol: str) -> str:
+    """
+    The key every analysis cache, single-flight and snapshot uses: the master's listing ("tcs" / "TCS" -> "TCS.NS"),
+    else a listing already found by probing, else the upper-cased input. Spellings of one stock then share one result.
+    """
+    symbol = (symbol or "").strip().upper()
+    return resolve_symbol(symbol) or _resolved_symbols.get(symbol) or symbol
+
 def _get_ticker(symbol: str):
     """Helper to get ticker and check for valid data."""
-    ticker = yf.Ticker(symbol)
-    if ticker.history(period="1d").empty:
-        return None, None
-    info = ticker.info
+    # Resolve names/bare tickers through the local symbol master and reject malformed input before any network call.
+    symbol = resolve_symbol(symbol) or (symbol or "").strip().upper()
+    if not is_valid_symbol(symbol): return None, None
+    ticker = _find_listed_ticker(symbol)
+    if ticker is None: return None, None
+    info = outbound("yahoo", lambda: ticker.info)
     return ticker, info
 
-@tool("get_technical_recommendation", args_schema=StockSymbolInput)
-def get_technical_recommendation(symbol: str) -> str:
-    """Use this tool for a full, deep technical analysis and buy/sell/hold recommendation for a SINGLE stock."""
+def _technical_from_history(symbol: str, hist: CompactHistory) -> dict:
+    """Scores the built-in technical rule on a daily history and returns the structured result."""
+    if hist.empty or len(hist) < 200: return {"status": "error", "message": f"Not enough data for {symbol}."}
+
+    # --- 1. Calculate All Technical Indicators (the same vectorized rule the backtester replays) ---
+    df = score_frame(hist)
+    if df.empty: return {"status": "error", "message": "Error calculating indicators."}
+    
+    latest = df.iloc[-1]; score = int(latest['score']); reasons = []
+
+    # --- 2. Explain the Indicators Behind the Score ---
+    if latest['SMA50'] > latest['SMA200']: reasons.append("• **Trend is Bullish:** A 'Golden Cross' is active.")
+    else: reasons.append("• **Trend is Bearish:** A 'Death Cross' is active.")
+    if latest['Close'] > latest['SMA50']: reasons.append("• **Momentum is Positive:** Price is above the 50-day average.")
+    else: reasons.append("• **Momentum is Negative:** Price is below the 50-day average.")
+    if latest['RSI14'] < 30: reasons.append(f"• **Potentially Oversold:** RSI is {latest['RSI14']:.1f}.")
+    elif latest['RSI14'] > 70: reasons.append(f"• **Potentially Overbought:** RSI is {latest['RSI14']:.1f}.")
+    if latest['MACD'] > latest['MACDs']: reasons.append("• **MACD indicates Bullish momentum.**")
+    else: reasons.append("• **MACD indicates Bearish momentum.**")
+    
+    avg_volume = df['Volume'].tail(20).mean()
+    if latest['Volume'] > avg_volume * 1.5: reasons.append(f"• **Volume is High:** Recent volume confirms trend strength.")
+    
+    text_analysis = "\n".join(reasons)
+    dist = score_distribution(score)
+    
+    recent_data = df.tail(90); support_level = recent_data['Low'].min(); resistance_level = recent_data['High'].max()
+    price_targets = {"support": f"₹{support_level:,.2f}", "resistance": f"₹{resistance_level:,.2f}", "current": f"₹{latest['Close']:,.2f}"}
+
+    return {"status": "success", "symbol": symbol, "text_analysis": text_analysis, "recommendation_percent": dist, "price_targets": price_targets,
+            "score": score, "computed_at": time.time()}
+
+def _compute_technical_uncached(symbol: str, cache_key: str) -> dict:
     try:
         ticker, info = _get_ticker(symbol)
-        if ticker is None: return json.dumps({"status": "error", "message": f"Invalid symbol: '{symbol}'."})
-        hist = ticker.history(period="1y")
-        if hist.empty or len(hist) < 200: return json.dumps({"status": "error", "message": f"Not enough data for {symbol}."})
-
-        # --- 1. Calculate All Technical Indicators ---
-        df = hist.copy()
-        df.ta.sma(length=50, append=True, col_names=('SMA50',))
-        df.ta.sma(length=200, append=True, col_names=('SMA200',))
-        df.ta.rsi(length=14, append=True, col_names=('RSI14',))
-        df.ta.macd(append=True, col_names=('MACD', 'MACDh', 'MACDs'))
-        df.ta.bbands(append=True, col_names=('BBL', 'BBM', 'BBU', 'BBB', 'BBP'))
-        df.dropna(inplace=True)
-        if df.empty: return json.dumps({"status": "error", "message": "Error calculating indicators."})
-        
-        latest = df.iloc[-1]; score = 0; reasons = []
-
-        # --- 2. Analyze Indicators with More Detail ---
-        if latest['SMA50'] > latest['SMA200']: score += 2; reasons.append("• **Trend is Bullish:** A 'Golden Cross' is active.")
-        else: score -= 2; reasons.append("• **Trend is Bearish:** A 'Death Cross' is active.")
-        if latest['Close'] > latest['SMA50']: score += 1; reasons.append("• **Momentum is Positive:** Price is above the 50-day average.")
-        else: score -= 1; reasons.append("• **Momentum is Negative:** Price is below the 50-day average.")
-        if latest['RSI14'] < 30: score += 2; reasons.append(f"• **Potentially Oversold:** RSI is {latest['RSI14']:.1f}.")
-        elif latest['RSI14'] > 70: score -= 2; reasons.append(f"• **Potentially Overbought:** RSI is {latest['RSI14']:.1f}.")
-        if latest['MACD'] > latest['MACDs']: score += 1; reasons.append("• **MACD indicates Bullish momentum.**")
-        else: score -=1; reasons.append("• **MACD indicates Bearish momentum.**")
-        
-        avg_volume = df['Volume'].tail(20).mean()
-        if latest['Volume'] > avg_volume * 1.5: reasons.append(f"• **Volume is High:** Recent volume confirms trend strength.")
-        
-        text_analysis = "\n".join(reasons)
+        if ticker is None: return {"status": "error", "message": f"Invalid symbol: '{symbol}'."}
+        # The resolved listing, not the caller's spelling: it titles the card the live poller reads its symbol from.
+        result = _technical_from_history(ticker.ticker, CompactHistory.from_frame(ticker.ticker, outbound("yahoo", ticker.history, period="1y")))
+    except RateLimitedError as e: return {"status": "error", "message": str(e)}
+    except Exception as e: return {"status": "error", "message": f"An unexpected error occurred: {e}"}
+    if result["status"] == "success": _technical_cache.set(cache_key, result)
+    return result
 
-        if score >= 5: dist = {"Buy": 80, "Hold": 15, "Sell": 5}
-        elif score >= 3: dist = {"Buy": 70, "Hold": 25, "Sell": 5}
-        elif score >= 1: dist = {"Buy": 60, "Hold": 30, "Sell": 10}
-        else: dist = {"Buy": 20, "Hold": 60, "Sell": 20}
-        
-        recent_data = df.tail(90); support_level = recent_data['Low'].min(); resistance_level = recent_data['High'].max()
-        price_targets = {"support": f"₹{support_level:,.2f}", "resistance": f"₹{resistance_level:,.2f}", "current": f"₹{latest['Close']:,.2f}"}
+def compute_technical(symbol: str, allow_snapshot: bool = True) -> dict:
+    """
+    Structured technical analysis for a symbol; shared by the chat tool, the agent and the headless service.
+    Serves the precomputed watchlist snapshot when it is fresh enough (the precompute job itself passes allow_snapshot=False).
+    """
+    cache_key = canonical_symbol(symbol)
+    cached = _technical_cache.get(cache_key) or (load_snapshot("technical", cache_key) if allow_snapshot else None)
+    if cached is not None: return cached
+    # Concurrent requests for the same symbol (e.g. a trending stock across sessions) share one fetch and compute.
+    return analysis_flight.do(("technical", cache_key, ()), _compute_technical_uncached, symbol, cache_key)
 
-        return json.dumps({"status": "success", "text_analysis": text_analysis, "recommendation_percent": dist, "price_targets": price_targets})
-    except Exception as e: return json.dumps({"status": "error", "message": f"An unexpected error occurred: {e}"})
+def _compute_timeframes_uncached(symbol: str, cache_key: str, timeframes: tuple) -> dict:
+    try:
+        ticker, info = _get_ticker(symbol)
+        if ticker is None: return {"status": "error", "message": f"Invalid symbol: '{symbol}'."}
+        hist = CompactHistory.from_frame(ticker.ticker, outbound("yahoo", ticker.history, period=MULTI_TIMEFRAME_PERIOD))
+        if hist.empty: return {"status": "error", "message": f"Not enough data for {symbol}."}
+        results = compute_timeframes(hist, timeframes)
+    except RateLimitedError as e: return {"status": "error", "message": str(e)}
+    except Exception as e: return {"status": "error", "message": f"An unexpected error occurred: {e}"}
+    computed_at = time.time()
+    for name, result in results.items():
+        result["computed_at"] = computed_at
+        _timeframe_cache.set((cache_key, name), result)  # "insufficient" too, so short histories are not refetched.
+    return {"status": "success", "timeframes": results}
 
-@tool("get_fundamental_analysis", args_schema=StockSymbolInput)
-def get_fundamental_analysis(symbol: str) -> str:
-    """Use this tool to get a full, detailed fundamental analysis report for a company, including many key metrics."""
+def compute_multi_timeframe(symbol: str, timeframes: tuple = tuple(TIMEFRAMES)) -> dict:
+    """
+    Daily, weekly and monthly signals plus a combined alignment score. One daily fetch is resampled in memory
+    for every timeframe that is not already cached; cached timeframes are reused as they are.
+    """
+    cache_key = canonical_symbol(symbol)
+    results = {name: _timeframe_cache.get((cache_key, name)) for name in timeframes}
+    missing = tuple(name for name, result in results.items() if result is None)
+    if missing:
+        fetched = analysis_flight.do(("multi_timeframe", cache_key, missing), _compute_timeframes_uncached, symbol, cache_key, missing)
+        if fetched["status"] != "success": return fetched
+        results.update(fetched["timeframes"])
+    if not any(result["status"] == "success" for result in results.values()):
+        return {"status": "error", "message": f"Not enough data for {symbol}."}
+    return {"status": "success", "symbol": cache_key, "timeframes": results, "alignment": alignment(results)}
+
+def _fundamental_from_info(symbol: str, info: dict, trends: dict = None) -> dict:
+    """
+    Scores the fundamental ratios in a Yahoo `info` dict and returns the structured result. Multi-year statement trends,
+    when known, get their own score and verdict so the ratio verdict means the same with or without statements.
+    """
+    pe = info.get("trailingPE"); roe = info.get("returnOnEquity"); de = info.get("debtToEquity")
+    ps = info.get("priceToSalesTrailing12Months"); peg = info.get("pegRatio"); sector = info.get("sector", "")
+    pb = info.get("priceToBook"); margins = info.get("profitMargins")
+    
+    positive_points = []; caution_points = []; score = 0
+    if info.get('marketCap'): positive_points.append(f"• **Market Cap:** A large cap of {info.get('marketCap', 0):,} indicates a stable business.")
+    if pe is not None and pe < 25: positive_points.append(f"• **Valuation (P/E of {pe:.2f}):** Appears reasonably valued."); score += 1
+    elif pe is not None: caution_points.append(f"• **Valuation (P/E of {pe:.2f}):** P/E ratio is high."); score -= 1
+    if peg is not None and 0 < peg < 1: positive_points.append(f"• **Growth vs. Price (PEG of {peg:.2f}):** Excellent PEG ratio suggests potential undervaluation."); score += 2
+    if roe is not None and roe > 0.15: positive_points.append(f"• **Profitability (ROE of {roe:.2%}):** Strong ROE indicates efficient profit generation."); score += 2
+    else: caution_points.append(f"• **Profitability (ROE of {roe if roe is not None else 'N/A'}):** ROE is on the lower side.")
+    if de is not None and de < 1.0: positive_points.append(f"• **Financial Health (D/E of {de:.2f}):** Has a manageable level of debt."); score += 1
+    else: caution_points.append(f"• **Financial Health (D/E of {de if de is not None else 'N/A'}):** Holds a significant level of debt."); score -= 1
+    if pb is not None and pb < 3: positive_points.append(f"• **Book Value (P/B of {pb:.2f}):** A P/B ratio under 3 can indicate good value."); score += 1
+    if ps is not None and ps < 2: positive_points.append(f"• **Sales Valuation (P/S of {ps:.2f}):** A low Price-to-Sales ratio is a positive sign."); score += 1
+    if margins is not None and margins > 0.1: positive_points.append(f"• **Margins (Profit Margin of {margins:.2%}):** Healthy profit margins show a strong business model."); score += 1
+    trend_score = None
+    if trends:
+        trend_score, trend_positive, trend_caution = trend_points(trends)
+        positive_points += trend_positive; caution_points += trend_caution
+    
+    if not positive_points: positive_points.append("• No specific positive indicators found.")
+    if not caution_points: caution_points.append("• No specific points of caution found.")
+    
+    if score >= 5: final_verdict = "Very Strong"
+    elif score >= 3: final_verdict = "Strong"
+    elif score >= 1: final_verdict = "Average"
+    else: final_verdict = "Weak"
+
+    metrics = {"market_cap": info.get("marketCap"), "pe": pe, "peg": peg, "pb": pb, "ps": ps, "roe": roe, "debt_to_equity": de, "profit_margins": margins}
+    return {"status": "success", "symbol": symbol, "company_name": info.get('longName', symbol), "sector": sector, "metrics": metrics, "trends": trends,
+            "positive_points": positive_points, "caution_points": caution_points, "score": score, "verdict": final_verdict,
+            "trend_score": trend_score, "trend_verdict": trend_verdict(trend_score) if trends else None, "computed_at": time.time()}
+
+def _compute_fundamental_uncached(symbol: str, cache_key, with_trends: bool) -> dict:
     try:
         ticker, info = _get_ticker(symbol)
-        if ticker is None: return "Error: Invalid or delisted symbol."
-        
-        pe = info.get("trailingPE"); roe = info.get("returnOnEquity"); de = info.get("debtToEquity")
-        ps = info.get("priceToSalesTrailing12Months"); peg = info.get("pegRatio"); sector = info.get("sector", "")
-        pb = info.get("priceToBook"); margins = info.get("profitMargins")
-        
-        positive_points = []; caution_points = []; score = 0
-        if info.get('marketCap'): positive_points.append(f"• **Market Cap:** A large cap of {info.get('marketCap', 0):,} indicates a stable business.")
-        if pe is not None and pe < 25: positive_points.append(f"• **Valuation (P/E of {pe:.2f}):** Appears reasonably valued."); score += 1
-        elif pe is not None: caution_points.append(f"• **Valuation (P/E of {pe:.2f}):** P/E ratio is high."); score -= 1
-        if peg is not None and 0 < peg < 1: positive_points.append(f"• **Growth vs. Price (PEG of {peg:.2f}):** Excellent PEG ratio suggests potential undervaluation."); score += 2
-        if roe is not None and roe > 0.15: positive_points.append(f"• **Profitability (ROE of {roe:.2%}):** Strong ROE indicates efficient profit generation."); score += 2
-        else: caution_points.append(f"• **Profitability (ROE of {roe if roe is not None else 'N/A'}):** ROE is on the lower side.")
-        if de is not None and de < 1.0: positive_points.append(f"• **Financial Health (D/E of {de:.2f}):** Has a manageable level of debt."); score += 1
-        else: caution_points.append(f"• **Financial Health (D/E of {de if de is not None else 'N/A'}):** Holds a significant level of debt."); score -= 1
-        if pb is not None and pb < 3: positive_points.append(f"• **Book Value (P/B of {pb:.2f}):** A P/B ratio under 3 can indicate good value."); score += 1
-        if ps is not None and ps < 2: positive_points.append(f"• **Sales Valuation (P/S of {ps:.2f}):** A low Price-to-Sales ratio is a positive sign."); score += 1
-        if margins is not None and margins > 0.1: positive_points.append(f"• **Margins (Profit Margin of {margins:.2%}):** Healthy profit margins show a strong business model."); score += 1
-        
-        if not positive_points: positive_points.append("• No specific positive indicators found.")
-        if not caution_points: caution_points.append("• No specific points of caution found.")
-        
-        if score >= 5: final_verdict = "Very Strong"
-        elif score >= 3: final_verdict = "Strong"
-        elif score >= 1: final_verdict = "Average"
-        else: final_verdict = "Weak"
-        
-        response_html = f'<div class="analysis-container">'
-        response_html += f"<h4>Fundamental Snapshot for {info.get('longName', symbol)}</h4><hr>"
-        response_html += "<h6>Positive Points:</h6>"; response_html += f"<p>{'<br>'.join(positive_points)}</p>"
-        response_html += "<h6>Points of Caution:</h6>"; response_html += f"<p>{'<br>'.join(caution_points)}</p><hr>"
-        verdict_class = f"verdict-{final_verdict.lower().replace(' ', '')}"
-        response_html += f'<h5>Final Verdict: <span class="{verdict_class}">{final_verdict} Fundamentals</span></h5>'
-        response_html += '</div>'
-        return response_html
-    except Exception as e: return f"An error occurred during fundamental analysis for {symbol}: {e}"
+        if ticker is None: return {"status": "error", "message": "Error: Invalid or delisted symbol."}
+        trends = trends_for(ticker.ticker) if with_trends else None
+        result = _fundamental_from_info(ticker.ticker, info, trends)  # The resolved listing, e.g. "TCS" -> "TCS.NS".
+    except RateLimitedError as e: return {"status": "error", "message": str(e)}
+    except Exception as e: return {"status": "error", "message": f"An error occurred during fundamental analysis for {symbol}: {e}"}
+    _fundamental_cache.set(cache_key, result)
+    return result
 
-@tool("get_latest_news_for_summary", args_schema=StockSymbolInput)
-def get_latest_news_for_summary(symbol: str) -> str:
-    """Gets the latest news for a stock, scrapes the top article, and returns its content for an AI to summarize."""
+def compute_fundamental(symbol: str, allow_snapshot: bool = True, with_trends: bool = True) -> dict:
+    """
+    Structured fundamental analysis for a symbol; shared by the chat tool, the agent and the headless service.
+    Aggregate callers (peer distributions, portfolios) pass with_trends=False to skip the statement downloads;
+    they still reuse a full result when one is cached.
+    """
+    cache_key = canonical_symbol(symbol)
+    cached = _fundamental_cache.get(cache_key) or (load_snapshot("fundamental", cache_key) if allow_snapshot else None)
+    if cached is None and not with_trends: cached = _fundamental_cache.get((cache_key, "ratios"))
+    if cached is not None: return cached
+    target = cache_key if with_trends else (cache_key, "ratios")
+    return analysis_flight.do(("fundamental", cache_key, (with_trends,)), _compute_fundamental_uncached, symbol, target, with_trends)
+
+def _http_get(url: str, **kwargs) -> requests.Response:
+    """requests.get that raises on throttling/5xx responses, so the outbound scheduler retries them."""
+    response = requests.get(url, **kwargs)
+    if response.status_code in RETRY_STATUSES: response.raise_for_status()
+    return response
+
+def fetch_news(symbol: str) -> dict:
+    """Finds the latest Google News article for a stock and scrapes its text for summarization."""
+    return analysis_flight.do(("news", canonical_symbol(symbol), ()), _fetch_news_uncached, symbol)
+
+def _fetch_news_uncached(symbol: str) -> dict:
     try:
         ticker, info = _get_ticker(symbol)
-        if ticker is None: return json.dumps({"status": "error", "message": "Invalid symbol."})
+        if ticker is None: return {"status": "error", "message": "Invalid symbol."}
         company_name = info.get('longName', symbol)
         
         query = f"{company_name} stock news"; encoded_query = urllib.parse.quote_plus(query)
         google_url = f"https://news.google.com/search?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
         headers = { 'User-Agent': 'Mozilla/5.0' }
-        r = requests.get(google_url, headers=headers)
+        r = outbound("google_news", _http_get, google_url, headers=headers, timeout=10)
         soup = BeautifulSoup(r.text, 'lxml')
         
         article_text = "Could not scrape the full article content."
@@ -129,17 +281,43 @@ def get_latest_news_for_summary(symbol: str) -> str:
         if first_link_tag and first_link_tag.get('href'):
             article_url = urllib.parse.urljoin("https://news.google.com", first_link_tag['href'])
             try:
-                article_r = requests.get(article_url, headers=headers, timeout=5)
+                article_r = outbound("news_sites", _http_get, article_url, headers=headers, timeout=5, retries=1)
                 article_soup = BeautifulSoup(article_r.text, 'lxml')
                 paragraphs = article_soup.find_all('p')
                 full_text = " ".join([p.text for p in paragraphs])
                 article_text = full_text[:2500] + "..." if len(full_text) > 2500 else full_text
             except Exception as e:
-                print(f"DEBUG: Failed to scrape article content: {e}")
+                logger.warning("Failed to scrape article content for %s: %s", symbol, e)
 
-        return json.dumps({
+        return {
             "status": "success", "google_news_link": google_url,
             "company_name": company_name, "scraped_text": article_text
-        })
+        }
+    except RateLimitedError as e: return {"status": "error", "message": str(e)}
     except Exception as e:
-        return json.dumps({"status": "error", "message": f"An error occurred while fetching news: {e}"})
+        return {"status": "error", "message": f"An error occurred while fetching news: {e}"}
+
+@tool("get_technical_recommendation", args_schema=StockSymbolInput)
+@profiled
+def get_technical_recommendation(symbol: str) -> str:
+    """Use this tool for a full, deep technical analysis and buy/sell/hold recommendation for a SINGLE stock."""
+    return json.dumps(compute_technical(symbol))
+
+@tool("get_multi_timeframe_analysis", args_schema=StockSymbolInput)
+@profiled
+def get_multi_timeframe_analysis(symbol: str) -> str:
+    """Use this tool when the user wants weekly/monthly confirmation or a multi-timeframe view of a SINGLE stock's trend, RSI and MACD."""
+    return json.dumps(compute_multi_timeframe(symbol))
+
+@tool("get_fundamental_analysis", args_schema=StockSymbolInput)
+@profiled
+def get_fundamental_analysis(symbol: str) -> str:
+    """Use this tool to get a full, detailed fundamental analysis report for a company, including many key metrics."""
+    result = compute_fundamental(symbol)
+    return fundamental_card(result) if result["status"] == "success" else result["message"]
+
+@tool("get_latest_news_for_summary", args_schema=StockSymbolInput)
+@profiled
+def get_latest_news_for_summary(symbol: str) -> str:
+    """Gets the latest news for a stock, scrapes the top article, and returns its content for an AI to summarize."""
+    return json.dumps(fetch_news(symbol))
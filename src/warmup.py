@@ -0,0 +1,92 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from src.agents import LangchainStockAgent
+from src.symbol_master import extract_tickers, is_known_symbol
+from src.rate_limit import lane, BACKGROUND
+from src.tools import compute_technical, compute_fundamental
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_PREFETCH = os.environ.get("FN_SPECULATIVE_PREFETCH", "1") == "1"
+PREFETCH_MAX_SYMBOLS = int(os.environ.get("FN_PREFETCH_MAX_SYMBOLS", 2))
+AGENT_WARMUP_TIMEOUT = float(os.environ.get("FN_AGENT_WARMUP_TIMEOUT", 30))
+# Speculative work is bounded separately from the chat's analysis pool, so a burst of logins cannot delay real requests.
+_warmup_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("FN_WARMUP_WORKERS", 4)), thread_name_prefix="warmup")
+PREFETCHERS = (("technical", compute_technical), ("fundamental", compute_fundamental))
+_stats = {"predicted": 0, "completed": 0, "cancelled": 0}
+_stats_lock = threading.Lock()
+
+def _count(name: str):
+    with _stats_lock: _stats[name] += 1
+
+def _build_agent(provider: str, api_key: str, history):
+    started = time.perf_counter()
+    agent = LangchainStockAgent(provider, api_key, history)
+    logger.info("Warmed up the %s agent in %.2fs", provider, time.perf_counter() - started)
+    return agent
+
+def start_agent_warmup(provider: str, api_key: str, history) -> tuple:
+    """Builds the session's LLM clients and agent in the background; returns the handle warmed_agent() takes."""
+    return provider, history.session_id, _warmup_pool.submit(_build_agent, provider, api_key, history)
+
+def warmed_agent(warmup: tuple, provider: str, session_id: str):
+    """The agent from a warm-up started for this provider and chat session, or None (the caller then builds it itself)."""
+    if warmup is None: return None
+    warmed_provider, warmed_session, future = warmup
+    if (warmed_provider, warmed_session) != (provider, session_id):
+        future.cancel(); return None
+    try:
+        return future.result(timeout=AGENT_WARMUP_TIMEOUT)
+    except Exception as e:
+        logger.warning("Agent warm-up for %s failed, building it inline: %s", provider, e)
+        return None
+
+def last_discussed(messages: list, limit: int = PREFETCH_MAX_SYMBOLS) -> list:
+    """Tickers the user asked about most recently, newest first: the best guess for what a resumed chat asks next."""
+    tickers = []
+    for message in reversed(messages):
+        if message.type == "human": tickers += [t for t in extract_tickers(str(message.content)) if t not in tickers]
+        if len(tickers) >= limit: break
+    return tickers[:limit]
+
+def _prefetch(kind: str, compute, symbol: str, priority):
+    with lane(priority) if priority is not None else nullcontext():
+        result = compute(symbol)  # Through the shared caches and single-flight, so the real request reuses or joins it.
+    _count("completed")
+    logger.debug("Speculative %s prefetch for %s: %s", kind, symbol, result.get("status"))
+
+class SpeculativePrefetch:
+    """
+    One session's speculative fetches. Each predicted symbol gets its technical and fundamental analyses started in
+    the background; a new prediction cancels the previous one's fetches that have not started yet.
+    """
+    def __init__(self):
+        self._futures = {}; self._lock = threading.Lock()
+
+    def predict(self, symbols: list, background: bool = False):
+        if not SPECULATIVE_PREFETCH: return
+        # Unknown bare tokens ("OK", "HI") are left to the agent: guessing on them would spend Yahoo capacity on small talk.
+        symbols = list(dict.fromkeys(s.upper() for s in symbols if is_known_symbol(s)))[:PREFETCH_MAX_SYMBOLS]
+        with self._lock:
+            for (kind, symbol), future in list(self._futures.items()):
+                if symbol not in symbols and future.cancel(): _count("cancelled")
+                if future.done(): del self._futures[(kind, symbol)]
+            for symbol in symbols:
+                for kind, compute in PREFETCHERS:
+                    if (kind, symbol) in self._futures: continue
+                    # The prompt path runs in the caller's (interactive) lane; login-time guesses yield to real requests.
+                    job = (_prefetch, kind, compute, symbol, BACKGROUND if background else None)
+                    self._futures[(kind, symbol)] = _warmup_pool.submit(contextvars.copy_context().run, *job); _count("predicted")
+
+    def cancel(self):
+        """Drops every prediction that has not started; running fetches finish and stay cached."""
+        self.predict([])
+
+def prefetch_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)